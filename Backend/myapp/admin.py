@@ -18,6 +18,7 @@ class_names = [
     TimeTable,
     Message,
     FacultyTimeTable,
+    CalendarJob,
 ]
 
 
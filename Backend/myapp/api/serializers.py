@@ -66,4 +66,17 @@ class  ResultSerializer(serializers.ModelSerializer):
 class TimeTableSerializer(serializers.ModelSerializer):
     class Meta:
         model = TimeTable
-        fields = ['semester','department','day','slot_1','slot_2','slot_3','slot_4','slot_5','slot_6','slot_7']
\ No newline at end of file
+        fields = ['semester','department','day','slot_1','slot_2','slot_3','slot_4','slot_5','slot_6','slot_7']
+
+    # checkTimetableClashes (context redefine) checks proposals that replace stored days,
+    # everywhere else an existing (semester, department, day) is a validation error
+    def get_validators(self):
+        if self.context.get('redefine'):
+            return []
+        return super().get_validators()
+
+    def validate_day(self, value):
+        day = value.strip().lower()
+        if day not in ["monday", "tuesday", "wednesday", "thursday", "friday"]:
+            raise serializers.ValidationError('Day must be a weekday.')
+        return day
@@ -0,0 +1,80 @@
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .models import Absentees, AttendanceSummary, CurrentCourses, StudentInfo
+
+_caller = threading.local()
+
+
+# the attendance sync writes Absentees in bulk and applies the summary changes itself,
+# the Absentees signals skip the rows deleted while this is active
+@contextmanager
+def summaryKeptByCaller():
+    _caller.active = True
+    try:
+        yield
+    finally:
+        _caller.active = False
+
+
+def keptByCaller():
+    return getattr(_caller, 'active', False)
+
+
+# Absentees has no department, it is taken from the course in CurrentCourses
+# (or the student's department when several departments run the course)
+def summaryDepartment(departments, student_department):
+    if len(departments) == 1:
+        return departments[0]
+    return next((d for d in departments if d.lower() == student_department.lower()), student_department)
+
+
+# applies {roll_no: change in absences} to AttendanceSummary, one UPDATE per distinct change.
+# counts never go below zero
+def updateAttendanceSummary(course_code, department, deltas):
+    deltas = {roll_no: delta for roll_no, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    summaries = AttendanceSummary.objects.filter(course_code=course_code, department=department)
+    stored = set(summaries.filter(roll_no__in=deltas.keys()).values_list('roll_no', flat=True))
+    AttendanceSummary.objects.bulk_create([
+        AttendanceSummary(roll_no=roll_no, course_code=course_code, department=department, absent_count=delta)
+        for roll_no, delta in deltas.items() if roll_no not in stored and delta > 0])
+    by_delta = {}
+    for roll_no in stored:
+        by_delta.setdefault(deltas[roll_no], []).append(roll_no)
+    for delta, roll_nos in by_delta.items():
+        summaries.filter(roll_no__in=roll_nos).update(absent_count=Greatest(F('absent_count') + delta, 0))
+
+
+# one absence added or removed outside the attendance sync (admin, the api/ viewset)
+def adjustAttendanceSummary(roll_no, course_code, delta):
+    departments = list(CurrentCourses.objects.filter(course_code=course_code).values_list('department', flat=True))
+    student_department = ''
+    if len(departments) != 1:
+        student_department = StudentInfo.objects.filter(roll_no=roll_no).values_list('department', flat=True).first() or ''
+    updateAttendanceSummary(course_code, summaryDepartment(departments, student_department), {roll_no: delta})
+
+
+# recomputes AttendanceSummary from the Absentees log
+def rebuildAttendanceSummary():
+    course_departments = {}
+    for course_code, department in CurrentCourses.objects.values_list('course_code', 'department'):
+        course_departments.setdefault(course_code, []).append(department)
+    student_departments = dict(StudentInfo.objects.values_list('roll_no', 'department'))
+
+    summaries = []
+    counts = Absentees.objects.values('roll_no', 'course_code').annotate(absent_count=Count('id')).order_by()
+    for row in counts:
+        department = summaryDepartment(course_departments.get(row['course_code'], []),
+                                       student_departments.get(row['roll_no'], ''))
+        summaries.append(AttendanceSummary(roll_no=row['roll_no'], course_code=row['course_code'],
+                                           department=department, absent_count=row['absent_count']))
+    with transaction.atomic():
+        AttendanceSummary.objects.all().delete()
+        AttendanceSummary.objects.bulk_create(summaries, batch_size=1000)
+    return len(summaries)
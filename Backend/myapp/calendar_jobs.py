@@ -0,0 +1,102 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from .models import CalendarJob
+
+
+# queues a google calendar change, the timetable views return right away with the job id
+def enqueueCalendarJob(action, payload):
+    return CalendarJob.objects.create(action=action, payload=payload,
+                                      max_attempts=getattr(settings, 'CALENDAR_JOB_MAX_ATTEMPTS', 5))
+
+
+# key names the events the job creates (see views.calendarEventId), so a retry does not create them twice
+def runCalendarJobAction(action, payload, key=None, retry=False):
+    from . import views
+
+    if action == 'add_timetable':
+        result = views.calenderWeekTableAdd(payload['joining_yr'], payload['department'], payload['days'], key=key)
+        if result['errors']:
+            # the job is retried for the failed events, the created ones are skipped then
+            raise RuntimeError(f"{len(result['errors'])} events failed: {result['errors'][0]['error']}")
+        return {'created': result['created'], 'existing': result['existing'], 'errors': []}
+    elif action == 'reschedule':
+        views.rescheduleEvent(payload['from_date'], payload['from_time_slot'], payload['to_date'],
+                              payload['to_time_slot'], payload['joining_yr'], payload['department'], key=key)
+    elif action == 'add_or_change':
+        views.addOrChangeEvent(payload['date'], payload['time_slot'], payload['course_code'],
+                               payload['joining_yr'], payload['department'], key=key)
+    elif action == 'cancel':
+        views.cancelEvent(payload['date'], payload['time_slot'], payload['joining_yr'], payload['department'],
+                          missing_ok=retry)
+    else:
+        raise ValueError('Unknown calendar job action ' + action)
+    return {}
+
+
+# seconds to wait before the given retry: CALENDAR_JOB_BACKOFF, doubled per attempt, at most an hour
+def retryDelay(attempts):
+    base = getattr(settings, 'CALENDAR_JOB_BACKOFF', 30)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), 3600))
+
+
+# jobs of a worker that stopped while running them: after CALENDAR_JOB_LEASE seconds they are
+# queued again, or failed when they have no attempts left
+def reclaimStaleCalendarJobs(now):
+    lease = timedelta(seconds=getattr(settings, 'CALENDAR_JOB_LEASE', 600))
+    stale = CalendarJob.objects.filter(status='running', started_at__lt=now - lease)
+    error = 'the worker stopped while running the job'
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(status='failed', finished_at=now, last_error=error)
+    return failed + stale.update(status='pending', run_after=now, last_error=error)
+
+
+# claims the oldest due job and runs it, returns the job or None when nothing is due.
+# the claim is a conditional update so two workers never run the same job
+def runNextCalendarJob():
+    now = timezone.now()
+    reclaimStaleCalendarJobs(now)
+    for job in CalendarJob.objects.filter(status='pending', run_after__lte=now).order_by('run_after', 'id')[:5]:
+        claimed = CalendarJob.objects.filter(id=job.id, status='pending').update(
+            status='running', started_at=now, attempts=job.attempts + 1)
+        if claimed:
+            job.refresh_from_db()
+            break
+    else:
+        return None
+
+    try:
+        job.result = runCalendarJobAction(job.action, job.payload, key=f'job{job.id}', retry=job.attempts > 1)
+        job.status = 'done'
+        job.last_error = ''
+    except Exception as e:
+        job.last_error = str(e)
+        if job.attempts >= job.max_attempts:
+            job.status = 'failed'
+        else:
+            job.status = 'pending'
+            job.run_after = timezone.now() + retryDelay(job.attempts)
+    if job.status != 'pending':
+        job.finished_at = timezone.now()
+    job.save()
+    return job
+
+
+# queue depth per status and how many jobs finished in the last minute / hour
+def calendarJobMetrics():
+    now = timezone.now()
+    depth = {status: 0 for status, _ in CalendarJob.STATUSES}
+    for row in CalendarJob.objects.values('status').annotate(count=Count('id')):
+        depth[row['status']] = row['count']
+    oldest = CalendarJob.objects.filter(status='pending').aggregate(oldest=Min('created_at'))['oldest']
+    finished = CalendarJob.objects.filter(finished_at__isnull=False)
+    return {
+        'queue_depth': depth,
+        'due': CalendarJob.objects.filter(status='pending', run_after__lte=now).count(),
+        'oldest_pending_seconds': (now - oldest).total_seconds() if oldest else 0,
+        'finished_last_minute': finished.filter(finished_at__gte=now - timedelta(minutes=1)).count(),
+        'finished_last_hour': finished.filter(finished_at__gte=now - timedelta(hours=1)).count(),
+        'failed_last_hour': finished.filter(status='failed', finished_at__gte=now - timedelta(hours=1)).count(),
+    }
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import math
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache, caches
+
+from .models import LabResult, Result
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+PERCENTILES = [10, 25, 50, 75, 90]
+
+# model, mark columns and the column pairs to correlate of each result kind
+STAT_COLUMNS = {
+    'theory': (Result, ['ct_1', 'ct_2', 'assignments', 'end_sem'], [('ct_1', 'ct_2'), ('ct_1', 'end_sem'), ('ct_2', 'end_sem')]),
+    'lab': (LabResult, ['internal_marks', 'end_lab'], [('internal_marks', 'end_lab')]),
+}
+
+
+def rounded(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return round(float(value), 4)
+
+
+# the marks of the courses as columns (one tuple per mark, plus their total) and the grades
+def loadColumns(kind, course_codes):
+    model, names, pairs = STAT_COLUMNS[kind]
+    rows = list(model.objects.filter(course_code__in=course_codes).values_list(*names, 'grade'))
+    if not rows:
+        return {}, []
+    values = list(zip(*rows))
+    columns = dict(zip(names, values[:-1]))
+    columns['total'] = tuple(map(sum, zip(*values[:-1])))
+    return columns, values[-1]
+
+
+def numpyColumnStats(columns, pairs):
+    arrays = {name: numpy.asarray(values, dtype=float) for name, values in columns.items()}
+    stats = {}
+    for name, array in arrays.items():
+        percentiles = numpy.percentile(array, PERCENTILES)
+        stats[name] = {'mean': rounded(array.mean()), 'median': rounded(percentiles[PERCENTILES.index(50)]),
+                       'std': rounded(array.std()), 'min': rounded(array.min()), 'max': rounded(array.max()),
+                       'percentiles': {str(p): rounded(v) for p, v in zip(PERCENTILES, percentiles)}}
+    correlations = {}
+    for a, b in pairs:
+        x, y = arrays[a], arrays[b]
+        correlations[f'{a}/{b}'] = rounded(numpy.corrcoef(x, y)[0, 1]) if len(x) > 1 and x.std() and y.std() else None
+    return stats, correlations
+
+
+# same linear interpolation as numpy.percentile
+def percentile(ordered, p):
+    rank = p / 100 * (len(ordered) - 1)
+    low = math.floor(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def pythonColumnStats(columns, pairs):
+    stats = {}
+    means = {}
+    stds = {}
+    for name, values in columns.items():
+        n = len(values)
+        ordered = sorted(values)
+        means[name] = mean = sum(values) / n
+        stds[name] = std = math.sqrt(sum((v - mean) ** 2 for v in values) / n)
+        stats[name] = {'mean': rounded(mean), 'median': rounded(percentile(ordered, 50)), 'std': rounded(std),
+                       'min': rounded(ordered[0]), 'max': rounded(ordered[-1]),
+                       'percentiles': {str(p): rounded(percentile(ordered, p)) for p in PERCENTILES}}
+    correlations = {}
+    for a, b in pairs:
+        x, y = columns[a], columns[b]
+        if len(x) > 1 and stds[a] and stds[b]:
+            covariance = sum((xv - means[a]) * (yv - means[b]) for xv, yv in zip(x, y)) / len(x)
+            correlations[f'{a}/{b}'] = rounded(covariance / (stds[a] * stds[b]))
+        else:
+            correlations[f'{a}/{b}'] = None
+    return stats, correlations
+
+
+# mean, median, standard deviation, percentiles, grade histogram and mark correlations of the
+# results of the given courses, computed with numpy when it is installed
+def computeCourseStats(kind, course_codes, use_numpy=None):
+    use_numpy = numpy is not None if use_numpy is None else use_numpy and numpy is not None
+    model, names, pairs = STAT_COLUMNS[kind]
+    columns, grades = loadColumns(kind, course_codes)
+    data = {'kind': kind, 'course_codes': sorted(course_codes), 'count': len(grades),
+            'grades': dict(sorted(Counter(grades).items())), 'columns': {}, 'correlations': {},
+            'backend': 'numpy' if use_numpy else 'python'}
+    if grades:
+        data['columns'], data['correlations'] = (numpyColumnStats if use_numpy else pythonColumnStats)(columns, pairs)
+    return data
+
+
+def statsVersionKey(kind, course_code):
+    return f'course_stats_version:{kind}:{course_code}'
+
+
+# the versions live in a cache every worker reads, so an upload in one drops the statistics in all
+def versionCache():
+    return caches[getattr(settings, 'COURSE_STATS_CACHE_BACKEND', 'shared')]
+
+
+# cached per set of courses (in each process). each course has a version that a result upload drops,
+# so the statistics of every set containing that course are recomputed on the next request
+def cachedCourseStats(kind, course_codes):
+    version_keys = [statsVersionKey(kind, code) for code in sorted(set(course_codes))]
+    versions = versionCache().get_many(version_keys)
+    missing = {key: time.time_ns() for key in version_keys if key not in versions}
+    if missing:
+        versionCache().set_many(missing, getattr(settings, 'COURSE_STATS_CACHE_TIMEOUT', None))
+        versions.update(missing)
+    key = 'course_stats:' + hashlib.md5(json.dumps([versions[key] for key in version_keys] + version_keys).encode()).hexdigest()
+    data = cache.get(key)
+    if data is None:
+        data = computeCourseStats(kind, course_codes)
+        cache.set(key, data, getattr(settings, 'COURSE_STATS_CACHE_TIMEOUT', None))
+    return data
+
+
+def invalidateCourseStats(kind, course_codes):
+    versionCache().delete_many([statsVersionKey(kind, code) for code in set(course_codes)])
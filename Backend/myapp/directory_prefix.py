@@ -0,0 +1,124 @@
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .search_index import KINDS, kindOf
+
+VERSION_KEY = 'directory_prefix:version'
+
+
+# in-process prefix index over the names, name words, ids and emails of students, faculty and staff:
+# one sorted list of (term, kind, key), so the people whose term starts with a prefix sit next to each
+# other and a lookup is one binary search. built from the database on first use, then kept current by
+# the signals in signals.py. each process holds its own copy; the signals also bump a version in the
+# shared cache, and a process whose copy is older rebuilds it on its next lookup. changes that skip
+# the signals (e.g. a bulk import from the shell) show up after reset() or a restart
+class DirectoryPrefixIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._terms = None
+        self._people = {}
+        self._version = None
+
+    @property
+    def shared(self):
+        return caches[getattr(settings, 'DIRECTORY_PREFIX_CACHE_BACKEND', 'shared')]
+
+    def sharedVersion(self):
+        return self.shared.get_or_set(VERSION_KEY, time.time_ns, None)
+
+    # tells the other processes their copy is stale. this copy stays current when it already
+    # had every earlier change, i.e. the version moved on by exactly this bump
+    def bump(self):
+        try:
+            version = self.shared.incr(VERSION_KEY)
+        except ValueError:
+            self.shared.set(VERSION_KEY, time.time_ns(), None)
+            return
+        if self._version is not None and version == self._version + 1:
+            self._version = version
+
+    def terms(self, person):
+        terms = set((person['name'] or '').lower().split())
+        terms.update(value.lower() for value in (person['name'], person['id'], (person['email'] or '').split('@')[0]) if value)
+        return terms
+
+    def build(self):
+        version = self.sharedVersion()
+        people = {}
+        terms = []
+        for kind, (model, key_field, ident_field) in KINDS.items():
+            for key, name, ident, email in model.objects.values_list(key_field, 'name', ident_field, 'email').iterator(chunk_size=5000):
+                person = personEntry(kind, key, name, ident, email)
+                people[(kind, person['key'])] = person
+                terms.extend((term, kind, person['key']) for term in self.terms(person))
+        terms.sort()
+        self._people = people
+        self._terms = terms
+        self._version = version
+
+    def _remove(self, identity):
+        person = self._people.pop(identity, None)
+        if person is None:
+            return
+        for term in self.terms(person):
+            position = bisect_left(self._terms, (term,) + identity)
+            if position < len(self._terms) and self._terms[position] == (term,) + identity:
+                del self._terms[position]
+
+    def update(self, person):
+        with self._lock:
+            if self._terms is not None:
+                identity = (person['kind'], person['key'])
+                self._remove(identity)
+                self._people[identity] = person
+                for term in self.terms(person):
+                    insort(self._terms, (term,) + identity)
+            self.bump()
+
+    def remove(self, kind, key):
+        with self._lock:
+            if self._terms is not None:
+                self._remove((kind, str(key)))
+            self.bump()
+
+    def reset(self):
+        with self._lock:
+            self._terms = None
+            self._people = {}
+            self._version = None
+
+    # first `limit` people having a term that starts with prefix, in term order
+    def complete(self, prefix, limit=10):
+        prefix = prefix.lower()
+        with self._lock:
+            if self._terms is None or self._version != self.sharedVersion():
+                self.build()
+            found = []
+            seen = set()
+            position = bisect_left(self._terms, (prefix,))
+            while position < len(self._terms) and len(found) < limit:
+                term, kind, key = self._terms[position]
+                if not term.startswith(prefix):
+                    break
+                if (kind, key) not in seen:
+                    seen.add((kind, key))
+                    found.append(self._people[(kind, key)])
+                position += 1
+            return found
+
+
+def personEntry(kind, key, name, ident, email):
+    return {'kind': kind, 'key': str(key), 'name': name, 'id': ident, 'email': email}
+
+
+def personFromInstance(instance):
+    kind = kindOf(instance)
+    model, key_field, ident_field = KINDS[kind]
+    return personEntry(kind, getattr(instance, key_field), instance.name, getattr(instance, ident_field), instance.email)
+
+
+directory_prefixes = DirectoryPrefixIndex()
@@ -0,0 +1,74 @@
+import random
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from myapp.attendance_summary import rebuildAttendanceSummary
+from myapp.models import Absentees, CourseList, CurrentCourses, StudentInfo
+from myapp.views import attendanceShortageList
+
+
+# fills a synthetic course (students x classes, random absences) and times the old per-student
+# count against attendanceShortageList. everything runs in a transaction that is rolled back
+class Command(BaseCommand):
+    help = 'Benchmark the attendance shortage report on synthetic data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=5000)
+        parser.add_argument('--classes', type=int, default=60)
+        parser.add_argument('--absence-rate', type=float, default=0.15)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.run(options['students'], options['classes'], options['absence_rate'])
+            transaction.set_rollback(True)
+
+    def run(self, n_students, n_classes, absence_rate):
+        course_code, department = 'BM999', 'bench'
+        rng = random.Random(42)
+        CurrentCourses.objects.create(course_code=course_code, total_classes=n_classes,
+                                      faculty_name='bench', semester=3, department=department)
+        CourseList.objects.create(course_code=course_code, course_name='bench', semester=3, department=department)
+        StudentInfo.objects.bulk_create([
+            StudentInfo(roll_no=f'BM{i:06d}', name=f'Student {i}', department=department, joining_year='2023',
+                        blood_group='O+', semester=3, contact_number='0000000000', address='', gender='', email='')
+            for i in range(n_students)], batch_size=1000)
+        start_day = date(2024, 1, 1)
+        Absentees.objects.bulk_create([
+            Absentees(course_code=course_code, date=start_day + timedelta(days=c), roll_no=f'BM{i:06d}',
+                      time_slot='09:20-10:10')
+            for i in range(n_students) for c in range(n_classes)
+            if rng.random() < absence_rate * (3 if i % 10 == 0 else 1)], batch_size=2000)
+        rebuildAttendanceSummary()
+        self.stdout.write(f'{n_students} students, {n_classes} classes, {Absentees.objects.count()} absences')
+
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            old = self.per_student(course_code, department, 0.8)
+            old_time = time.perf_counter() - start
+        old_queries = len(queries)
+
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            new = attendanceShortageList(course_code, department, 0.8)
+            new_time = time.perf_counter() - start
+        new_queries = len(queries)
+
+        assert [row[0] for row in old] == [row[0] for row in new]
+        self.stdout.write(f'per-student counts: {old_time * 1000:.1f} ms, {old_queries} queries')
+        self.stdout.write(f'attendance summary: {new_time * 1000:.1f} ms, {new_queries} queries')
+        self.stdout.write(f'{len(new)} students below 80%')
+
+    # the report as it was computed before, kept here for comparison
+    def per_student(self, course_code, department, threshold):
+        total_classes = CurrentCourses.objects.filter(course_code=course_code, department=department)[0].total_classes
+        semester = CourseList.objects.filter(course_code=course_code, department=department)[0].semester
+        shortage_list = []
+        for student in StudentInfo.objects.filter(semester=semester, department=department).order_by('roll_no'):
+            absent_days = len(Absentees.objects.filter(course_code=course_code, roll_no=student.roll_no))
+            if 1 - (absent_days / total_classes) < threshold:
+                shortage_list.append([student.roll_no, student.name, (1 - (absent_days / total_classes)) * 100])
+        return shortage_list
@@ -0,0 +1,55 @@
+import json
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from googleapiclient.discovery import build
+
+from myapp.views import CalendarServiceRegistry, calenderAccessAuth, getCalenderId
+
+
+# a reschedule request connects to the calendar three times (rescheduleEvent + 2x getEventID),
+# this times those connects with the old per-call auth/build and with the shared registry.
+# runs offline: a dummy token.json is written to a temp dir and the bundled discovery document is used
+class Command(BaseCommand):
+    help = 'Compare per-request calendar connect latency with and without the service registry'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--connects-per-request', type=int, default=3)
+
+    def handle(self, *args, **options):
+        n = options['requests']
+        connects = options['connects_per_request']
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                with open('token.json', 'w') as token:
+                    json.dump({'token': 'benchmark', 'refresh_token': 'benchmark',
+                               'client_id': 'benchmark', 'client_secret': 'benchmark',
+                               'expiry': '2099-01-01T00:00:00Z'}, token)
+
+                start = time.perf_counter()
+                for _ in range(n):
+                    for _ in range(connects):
+                        creds = calenderAccessAuth()
+                        build("calendar", "v3", credentials=creds)
+                        getCalenderId('2021', 'cse')
+                uncached = (time.perf_counter() - start) / n
+
+                registry = CalendarServiceRegistry()
+                start = time.perf_counter()
+                for _ in range(n):
+                    for _ in range(connects):
+                        registry.getService()
+                        getCalenderId('2021', 'cse')
+                cached = (time.perf_counter() - start) / n
+            finally:
+                os.chdir(cwd)
+
+        self.stdout.write(f'requests: {n}, connects per request: {connects}')
+        self.stdout.write(f'auth + build per connect: {uncached * 1000:.2f} ms/request')
+        self.stdout.write(f'service registry:         {cached * 1000:.2f} ms/request')
+        self.stdout.write(f'speedup: {uncached / cached:.0f}x')
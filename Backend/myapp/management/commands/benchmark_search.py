@@ -0,0 +1,93 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from myapp.directory_prefix import DirectoryPrefixIndex
+from myapp.models import AdministrationInfo, FacultyInfo, StudentInfo
+from myapp.search_index import rebuildSearchIndex, searchDirectory, searchIndexAvailable
+
+FIRST = ['Aarav', 'Priya', 'Rahul', 'Sneha', 'Vikram', 'Anjali', 'Karthik', 'Divya', 'Arjun', 'Meera',
+         'Rohan', 'Kavya', 'Nikhil', 'Pooja', 'Siddharth', 'Lakshmi', 'Aditya', 'Neha', 'Varun', 'Shreya']
+LAST = ['Sharma', 'Reddy', 'Nair', 'Iyer', 'Patel', 'Gupta', 'Menon', 'Rao', 'Das', 'Pillai',
+        'Kumar', 'Singh', 'Joshi', 'Verma', 'Bose', 'Chatterjee', 'Mehta', 'Kapoor', 'Naidu', 'Shetty']
+
+
+# fills the directory with synthetic people and times the icontains scans the search endpoint
+# used to run against the full-text index. everything runs in a transaction that is rolled back
+class Command(BaseCommand):
+    help = 'Benchmark the directory search on synthetic data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--people', type=int, default=200000)
+        parser.add_argument('--queries', type=int, default=50)
+
+    def handle(self, *args, **options):
+        if not searchIndexAvailable():
+            raise CommandError('the search index needs sqlite')
+        with transaction.atomic():
+            self.run(options['people'], options['queries'])
+            transaction.set_rollback(True)
+
+    def name(self, rng, i):
+        return f'{rng.choice(FIRST)} {rng.choice(LAST)}{i}'
+
+    def run(self, n_people, n_queries):
+        rng = random.Random(42)
+        n_students = n_people * 9 // 10
+        n_faculty = (n_people - n_students) // 2
+        StudentInfo.objects.bulk_create([
+            StudentInfo(roll_no=f'BM{i:07d}', name=self.name(rng, i), department='bench', joining_year='2023',
+                        blood_group='O+', semester=3, contact_number='0000000000', address='', gender='',
+                        email=f'bm{i}@example.com')
+            for i in range(n_students)], batch_size=2000)
+        FacultyInfo.objects.bulk_create([
+            FacultyInfo(faculty_id=f'BF{i:05d}', name='Dr. ' + self.name(rng, i), position='Professor',
+                        designation='', email=f'bf{i}@example.com', description='')
+            for i in range(n_faculty)], batch_size=2000)
+        AdministrationInfo.objects.bulk_create([
+            AdministrationInfo(staff_id=f'BA{i:05d}', name=self.name(rng, i), position='Clerk',
+                               email=f'ba{i}@example.com')
+            for i in range(n_people - n_students - n_faculty)], batch_size=2000)
+        start = time.perf_counter()
+        rebuildSearchIndex()
+        self.stdout.write(f'{n_people} people, index rebuilt in {(time.perf_counter() - start) * 1000:.0f} ms')
+
+        queries = [rng.choice(FIRST) + ' ' + rng.choice(LAST)[:3] for _ in range(n_queries)]
+        start = time.perf_counter()
+        for query in queries:
+            old = self.scan(query)
+        old_time = (time.perf_counter() - start) / n_queries
+
+        start = time.perf_counter()
+        for query in queries:
+            new = searchDirectory(query, limit=50)
+        new_time = (time.perf_counter() - start) / n_queries
+
+        start = time.perf_counter()
+        for query in queries:
+            fuzzy = searchDirectory(query.replace('a', 'e', 1) + 'x', limit=50)
+        fuzzy_time = (time.perf_counter() - start) / n_queries
+
+        self.stdout.write(f'icontains scans: {old_time * 1000:.1f} ms per query ({len(old)} matches for the last)')
+        self.stdout.write(f'search index:    {new_time * 1000:.1f} ms per query (first {len(new)})')
+        self.stdout.write(f'fuzzy fallback:  {fuzzy_time * 1000:.1f} ms per query (first {len(fuzzy)})')
+
+        prefix_index = DirectoryPrefixIndex()
+        start = time.perf_counter()
+        prefix_index.build()
+        self.stdout.write(f'autocomplete prefix index built in {(time.perf_counter() - start) * 1000:.0f} ms')
+        for length in range(1, 5):
+            prefixes = [query[:length] for query in queries]
+            prefix_index.complete(prefixes[0])
+            start = time.perf_counter()
+            for prefix in prefixes:
+                prefix_index.complete(prefix)
+            self.stdout.write(f'{length} character prefix: {(time.perf_counter() - start) / n_queries * 1e6:.0f} us per query')
+
+    # the three scans the search endpoint ran before the index, kept here for comparison
+    def scan(self, query):
+        return list(StudentInfo.objects.filter(name__icontains=query)) + \
+            list(FacultyInfo.objects.filter(name__icontains=query)) + \
+            list(AdministrationInfo.objects.filter(name__icontains=query))
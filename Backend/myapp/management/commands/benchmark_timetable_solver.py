@@ -0,0 +1,53 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from myapp.timetable_solver import TimetableProblem, TimetableSolver, slotBits
+from myapp.timetables import SLOTS, WEEKDAYS
+
+# cohorts, theory and lab courses of a cohort, courses a faculty teaches, slots blocked for every cohort
+INSTANCES = {
+    'small': {'cohorts': 10, 'theory': 5, 'labs': 1, 'per_faculty': 3, 'blocked': 0},
+    'medium': {'cohorts': 20, 'theory': 5, 'labs': 1, 'per_faculty': 3, 'blocked': 0},
+    'department': {'cohorts': 40, 'theory': 5, 'labs': 1, 'per_faculty': 3, 'blocked': 0},
+    'dense': {'cohorts': 40, 'theory': 6, 'labs': 2, 'per_faculty': 2, 'blocked': 0},
+    'full_week': {'cohorts': 40, 'theory': 8, 'labs': 1, 'per_faculty': 3, 'blocked': 1},
+    'busy_faculty': {'cohorts': 40, 'theory': 5, 'labs': 1, 'per_faculty': 5, 'blocked': 3},
+}
+
+
+def syntheticProblem(rng, cohorts, theory, labs, per_faculty, blocked):
+    problem = TimetableProblem()
+    all_slots = [(day, slot_no) for day in WEEKDAYS for slot_no in range(1, len(SLOTS) + 1)]
+    blocked_bits = slotBits(rng.sample(all_slots, blocked))
+    courses = []
+    for cohort in range(cohorts):
+        problem.addCohort((cohort // 2 + 1, f'bench{cohort}'), blocked_bits)
+        courses += [((cohort // 2 + 1, f'bench{cohort}'), f'T{cohort}{i}', False) for i in range(theory)]
+        courses += [((cohort // 2 + 1, f'bench{cohort}'), f'L{cohort}{i}', True) for i in range(labs)]
+    rng.shuffle(courses)
+    for index, (cohort, course_code, lab) in enumerate(courses):
+        problem.addCourse(cohort, course_code, f'faculty{index // per_faculty}', lab, 1 if lab else 4)
+    return problem
+
+
+# runs the timetable solver on synthetic departments, no database involved
+class Command(BaseCommand):
+    help = 'Benchmark the timetable generator on synthetic instances'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--instance', choices=sorted(INSTANCES), action='append')
+        parser.add_argument('--seeds', type=int, default=3)
+
+    def handle(self, *args, **options):
+        for name in options['instance'] or INSTANCES:
+            for seed in range(options['seeds']):
+                problem = syntheticProblem(random.Random(seed), **INSTANCES[name])
+                solver = TimetableSolver(problem, seed=seed)
+                start = time.perf_counter()
+                solved = solver.solve()
+                elapsed = (time.perf_counter() - start) * 1000
+                self.stdout.write(f'{name:<13} seed {seed}: {len(problem.cohorts)} cohorts, {solver.sessions} sessions, '
+                                  f'{"solved" if solved else "FAILED"} in {elapsed:.0f} ms, '
+                                  f'{solver.backtracks} backtracks, {solver.restarts} restarts')
@@ -0,0 +1,81 @@
+import json
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+
+from myapp.models import (Absentees, AdministrationInfo, CourseList, CurrentCourses, FacultyInfo, FeeDefaulters, LabResult,
+                          Login, Result, StudentInfo, TimeTable, TimeTableSlot, Todolist)
+
+# the lookups the busiest views run, with placeholder values
+HOT_QUERIES = {
+    'getUserDetails: login by email': lambda: Login.objects.filter(email='x@example.com'),
+    'getUserDetails: student by email': lambda: StudentInfo.objects.filter(email='x@example.com'),
+    'getUserDetails: faculty by email': lambda: FacultyInfo.objects.filter(email='x@example.com'),
+    'getUserDetails: admin by email': lambda: AdministrationInfo.objects.filter(email='x@example.com'),
+    'facultyTimetable: faculty by name': lambda: FacultyInfo.objects.filter(name='x'),
+    'facultyTimetable: classes of the courses': lambda: TimeTableSlot.objects.filter(
+        course_code__in=CurrentCourses.objects.filter(faculty_name='x').values('course_code')),
+    'getCoursesForFaculty: courses of a faculty': lambda: CurrentCourses.objects.filter(faculty_name='x').select_related('course'),
+    'insertAttendance: current course': lambda: CurrentCourses.objects.filter(course_code='x', department='cse'),
+    'getCoursesForStudents: courses of a semester': lambda: CourseList.objects.filter(semester=3, department='cse'),
+    'getCourseType: course by code': lambda: CourseList.objects.filter(course_code='x'),
+    'getResultForStudentForCourse: result': lambda: Result.objects.filter(course_code='x', roll_no='x'),
+    'getLabResultForStudentForCourse: lab result': lambda: LabResult.objects.filter(course_code='x', roll_no='x'),
+    'addResult: results of a course': lambda: Result.objects.filter(course_code='x'),
+    'getTodosForUser: todos': lambda: Todolist.objects.filter(roll_no='x'),
+    'getAttendanceDetailsForStudent: absences': lambda: Absentees.objects.filter(roll_no='x', course_code='x'),
+    'getFeeDefaulters: defaulters of a batch': lambda: FeeDefaulters.objects.filter(department='cse', batch='2022-2026'),
+    'getTimetableForStudent: timetable': lambda: TimeTable.objects.filter(semester=3, department='cse')
+        .values_list('day', 'slots__slot_no', 'slots__course_code'),
+}
+
+
+# sqlite prefixes each plan line with node ids that shift between schema versions
+def normalizePlan(plan):
+    return '\n'.join(re.sub(r'^(\d+ )+', '', line) for line in plan.splitlines())
+
+
+def scans(plan):
+    return sorted(set(re.findall(r'\bSCAN (\w+)', plan)))
+
+
+# prints the query plan of each hot lookup. --save writes them to a file, --baseline compares against
+# such a file and flags lookups that now scan a table they used to search through an index
+class Command(BaseCommand):
+    help = 'Report the query plans (EXPLAIN QUERY PLAN on sqlite) of the hot view lookups'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--save', help='write the plans to this JSON file')
+        parser.add_argument('--baseline', help='compare against plans saved earlier with --save')
+
+    def handle(self, *args, **options):
+        plans = {name: normalizePlan(query().explain()) for name, query in HOT_QUERIES.items()}
+        baseline = {}
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'cannot read baseline: {e}')
+
+        regressions = 0
+        for name, plan in plans.items():
+            state = ''
+            if name in baseline and baseline[name] != plan:
+                new_scans = set(scans(plan)) - set(scans(baseline[name]))
+                state = f'  REGRESSION, now scans {", ".join(sorted(new_scans))}' if new_scans else '  changed'
+                regressions += bool(new_scans)
+            elif not baseline and scans(plan):
+                state = f'  scans {", ".join(scans(plan))}'
+            self.stdout.write(f'{name}{state}')
+            if name in baseline and baseline[name] != plan:
+                for line in baseline[name].splitlines():
+                    self.stdout.write(f'  - {line}')
+            for line in plan.splitlines():
+                self.stdout.write(f'    {line}')
+
+        if options['save']:
+            with open(options['save'], 'w') as f:
+                json.dump(plans, f, indent=2)
+        if regressions:
+            raise CommandError(f'{regressions} lookup(s) lost their index')
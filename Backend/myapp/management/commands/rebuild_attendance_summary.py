@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from myapp.attendance_summary import rebuildAttendanceSummary
+
+
+# recomputes the per student per course absence counters from the Absentees table,
+# e.g. after absentees were written with queryset updates or raw sql
+class Command(BaseCommand):
+    help = 'Rebuild AttendanceSummary from Absentees'
+
+    def handle(self, *args, **options):
+        rows = rebuildAttendanceSummary()
+        self.stdout.write(f'rebuilt {rows} attendance summary rows')
@@ -0,0 +1,27 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from myapp.semester_rollover import rolloverSemesters
+
+
+# the updateSemester rollover for a scheduled job, e.g. daily from cron
+class Command(BaseCommand):
+    help = 'Move every student to the semester of their joining year'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='only report the counts per joining year')
+        parser.add_argument('--date', help='compute the semesters as of this day (YYYY-MM-DD), default today')
+
+    def handle(self, *args, **options):
+        try:
+            today = date.fromisoformat(options['date']) if options['date'] else None
+        except ValueError:
+            raise CommandError('--date must be YYYY-MM-DD')
+        result = rolloverSemesters(today=today, dry_run=options['dry_run'])
+        for joining_year, year in result['joining_years'].items():
+            self.stdout.write(f"{joining_year}: semester {year['semester']}, {year['students']} students, {year['changing']} changing")
+        if result['skipped']:
+            self.stdout.write(f"{result['skipped']} students skipped, their joining year is not a number")
+        self.stdout.write(f"{'would update' if result['dry_run'] else 'updated'} "
+                          f"{sum(year['changing'] for year in result['joining_years'].values()) if result['dry_run'] else result['updated']} students")
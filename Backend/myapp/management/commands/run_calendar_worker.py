@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from myapp.calendar_jobs import calendarJobMetrics, runNextCalendarJob
+
+
+# runs the queued google calendar jobs (CalendarJob), start one or more of these next to the web server
+class Command(BaseCommand):
+    help = 'Run queued Google Calendar jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='run the jobs that are due and exit')
+        parser.add_argument('--sleep', type=float, default=2, help='seconds to wait when the queue is empty')
+        parser.add_argument('--report-every', type=float, default=60, help='seconds between metrics lines')
+
+    def handle(self, *args, **options):
+        processed = 0
+        started = last_report = time.monotonic()
+        while True:
+            job = runNextCalendarJob()
+            if job is not None:
+                processed += 1
+                self.stdout.write(f'job {job.id} {job.action}: {job.status} (attempt {job.attempts})')
+            elif options['once']:
+                break
+            else:
+                time.sleep(options['sleep'])
+
+            if time.monotonic() - last_report >= options['report_every']:
+                last_report = time.monotonic()
+                self.report(processed, last_report - started)
+
+        self.report(processed, time.monotonic() - started)
+
+    def report(self, processed, elapsed):
+        metrics = calendarJobMetrics()
+        rate = processed / elapsed if elapsed else 0
+        self.stdout.write(f'processed {processed} jobs ({rate:.2f}/s), queue depth {metrics["queue_depth"]}, '
+                          f'oldest pending {metrics["oldest_pending_seconds"]:.0f}s')
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.1 on 2026-10-18 16:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0026_alter_message_message_type_alter_message_recipient_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarSyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('calendar_id', models.CharField(max_length=255, unique=True)),
+                ('sync_token', models.CharField(blank=True, max_length=255, null=True)),
+                ('last_synced', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CalendarEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('calendar_id', models.CharField(max_length=255)),
+                ('event_id', models.CharField(max_length=255)),
+                ('summary', models.CharField(blank=True, default='', max_length=255)),
+                ('date', models.DateField()),
+                ('start_time', models.CharField(max_length=5)),
+                ('end_time', models.CharField(max_length=5)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['calendar_id', 'date', 'summary'], name='myapp_calen_calenda_fb37cb_idx')],
+                'unique_together': {('calendar_id', 'event_id')},
+            },
+        ),
+    ]
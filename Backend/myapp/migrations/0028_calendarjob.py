@@ -0,0 +1,34 @@
+# Generated by Django 5.0.1 on 2026-10-18 16:34
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0027_calendarevent_calendarsyncstate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('add_timetable', 'add_timetable'), ('reschedule', 'reschedule'), ('add_or_change', 'add_or_change'), ('cancel', 'cancel')], max_length=20)),
+                ('payload', models.JSONField()),
+                ('status', models.CharField(choices=[('pending', 'pending'), ('running', 'running'), ('done', 'done'), ('failed', 'failed')], default='pending', max_length=10)),
+                ('attempts', models.IntegerField(default=0)),
+                ('max_attempts', models.IntegerField(default=5)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'run_after'], name='myapp_calen_status_b75c8f_idx'), models.Index(fields=['finished_at'], name='myapp_calen_finishe_3ef0e2_idx')],
+            },
+        ),
+    ]
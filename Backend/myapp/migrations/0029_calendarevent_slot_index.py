@@ -0,0 +1,17 @@
+# Generated by Django 5.0.1 on 2026-10-18 16:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0028_calendarjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='calendarevent',
+            index=models.Index(fields=['calendar_id', 'date', 'start_time'], name='myapp_calen_calenda_3af69e_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.1 on 2026-10-18 16:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0029_calendarevent_slot_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='absentees',
+            index=models.Index(fields=['course_code', 'roll_no'], name='myapp_absen_course__ab2e3d_idx'),
+        ),
+    ]
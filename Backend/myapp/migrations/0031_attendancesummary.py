@@ -0,0 +1,27 @@
+# Generated by Django 5.0.1 on 2026-10-18 16:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0030_absentees_course_roll_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('roll_no', models.CharField(max_length=255)),
+                ('course_code', models.CharField(max_length=255)),
+                ('department', models.CharField(max_length=255)),
+                ('absent_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['roll_no'], name='myapp_atten_roll_no_0e850f_idx')],
+                'unique_together': {('course_code', 'department', 'roll_no')},
+            },
+        ),
+    ]
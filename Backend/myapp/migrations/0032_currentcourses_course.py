@@ -0,0 +1,34 @@
+# Generated by Django 5.0.1 on 2026-10-18 16:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def link_current_courses(apps, schema_editor):
+    CurrentCourses = apps.get_model('myapp', 'CurrentCourses')
+    CourseList = apps.get_model('myapp', 'CourseList')
+    catalog = {}
+    for course in CourseList.objects.order_by('id'):
+        catalog.setdefault(course.course_code, []).append(course)
+    for current in CurrentCourses.objects.all():
+        courses = catalog.get(current.course_code, [])
+        same_department = [c for c in courses if c.department.lower() == current.department.lower()]
+        course = (same_department or courses or [None])[0]
+        if course is not None:
+            CurrentCourses.objects.filter(id=current.id).update(course=course)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0031_attendancesummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='currentcourses',
+            name='course',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='current_courses', to='myapp.courselist'),
+        ),
+        migrations.RunPython(link_current_courses, migrations.RunPython.noop),
+    ]
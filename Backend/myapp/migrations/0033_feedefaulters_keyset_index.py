@@ -0,0 +1,17 @@
+# Generated by Django 5.0.1 on 2026-10-18 16:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0032_currentcourses_course'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='feedefaulters',
+            index=models.Index(fields=['department', 'batch', 'roll_no'], name='myapp_feede_departm_3eaa64_idx'),
+        ),
+    ]
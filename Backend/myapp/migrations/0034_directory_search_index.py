@@ -0,0 +1,42 @@
+from django.db import migrations
+
+
+# sqlite only, other databases keep using the icontains scans in views.search
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    kinds = [
+        ('student', apps.get_model('myapp', 'StudentInfo'), 'roll_no', 'roll_no'),
+        ('faculty', apps.get_model('myapp', 'FacultyInfo'), 'id', 'faculty_id'),
+        ('admin', apps.get_model('myapp', 'AdministrationInfo'), 'id', 'staff_id'),
+    ]
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS myapp_directory_search "
+            "USING fts5(kind UNINDEXED, key UNINDEXED, name, ident, email, tokenize='trigram')"
+        )
+        for kind, model, key_field, ident_field in kinds:
+            cursor.executemany(
+                "INSERT INTO myapp_directory_search (kind, key, name, ident, email) VALUES (%s, %s, %s, %s, %s)",
+                [[kind, str(getattr(instance, key_field)), instance.name or '',
+                  getattr(instance, ident_field) or '', instance.email or '']
+                 for instance in model.objects.all()]
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("DROP TABLE IF EXISTS myapp_directory_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myapp", "0033_feedefaulters_keyset_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
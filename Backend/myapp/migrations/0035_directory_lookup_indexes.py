@@ -0,0 +1,83 @@
+# Generated by Django 5.0.1 on 2026-10-18 16:52
+
+from django.db import migrations, models
+from django.db.models import Count
+
+# the columns that become unique below
+UNIQUE_COLUMNS = [('Login', ['email']), ('CourseList', ['course_code', 'department']),
+                  ('Result', ['course_code', 'roll_no']), ('LabResult', ['course_code', 'roll_no'])]
+
+
+# stops before the constraints with the rows to merge or delete, instead of a bare IntegrityError.
+# the rows are not removed here: which of two results or logins is the right one is not ours to guess
+def check_duplicates(apps, schema_editor):
+    problems = []
+    for model_name, fields in UNIQUE_COLUMNS:
+        model = apps.get_model('myapp', model_name)
+        duplicates = model.objects.values(*fields).annotate(rows=Count('pk')).filter(rows__gt=1).order_by(*fields)
+        for duplicate in duplicates[:20]:
+            values = ', '.join(f'{field}={duplicate[field]!r}' for field in fields)
+            problems.append(f'{model_name} {values}: {duplicate["rows"]} rows')
+    if problems:
+        raise RuntimeError('Cannot add the unique constraints of migration 0035, remove the duplicate rows first:\n  '
+                           + '\n  '.join(problems))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0034_directory_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='login',
+            name='email',
+            field=models.EmailField(max_length=254, unique=True),
+        ),
+        migrations.AlterUniqueTogether(
+            name='courselist',
+            unique_together={('course_code', 'department')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='labresult',
+            unique_together={('course_code', 'roll_no')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='result',
+            unique_together={('course_code', 'roll_no')},
+        ),
+        migrations.AddIndex(
+            model_name='administrationinfo',
+            index=models.Index(fields=['email'], name='myapp_admin_email_44c655_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='courselist',
+            index=models.Index(fields=['semester', 'department'], name='myapp_cours_semeste_ed7b1d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='currentcourses',
+            index=models.Index(fields=['faculty_name'], name='myapp_curre_faculty_0b75af_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='currentcourses',
+            index=models.Index(fields=['course_code', 'department'], name='myapp_curre_course__b177c8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='facultyinfo',
+            index=models.Index(fields=['email'], name='myapp_facul_email_9733b8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='facultyinfo',
+            index=models.Index(fields=['name'], name='myapp_facul_name_1caba0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentinfo',
+            index=models.Index(fields=['email'], name='myapp_stude_email_d6ae1b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='todolist',
+            index=models.Index(fields=['roll_no'], name='myapp_todol_roll_no_100009_idx'),
+        ),
+    ]
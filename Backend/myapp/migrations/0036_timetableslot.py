@@ -0,0 +1,36 @@
+# Generated by Django 5.0.1 on 2026-10-18 16:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_timetable_slots(apps, schema_editor):
+    TimeTable = apps.get_model('myapp', 'TimeTable')
+    TimeTableSlot = apps.get_model('myapp', 'TimeTableSlot')
+    TimeTableSlot.objects.bulk_create([
+        TimeTableSlot(timetable=timetable, day=timetable.day, slot_no=slot_no, course_code=getattr(timetable, f'slot_{slot_no}'))
+        for timetable in TimeTable.objects.all() for slot_no in range(1, 8) if getattr(timetable, f'slot_{slot_no}')])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0035_directory_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimeTableSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.CharField(max_length=10)),
+                ('slot_no', models.PositiveSmallIntegerField()),
+                ('course_code', models.CharField(max_length=5)),
+                ('timetable', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slots', to='myapp.timetable')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['course_code'], name='myapp_timet_course__eb5eb4_idx')],
+                'unique_together': {('timetable', 'slot_no')},
+            },
+        ),
+        migrations.RunPython(fill_timetable_slots, migrations.RunPython.noop),
+    ]
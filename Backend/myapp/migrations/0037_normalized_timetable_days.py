@@ -0,0 +1,28 @@
+# Generated by Django 5.0.1 on 2026-10-18 17:01
+
+from django.db import migrations, models
+from django.db.models.functions import Lower
+
+
+def lowercase_days(apps, schema_editor):
+    for model in ('TimeTable', 'TimeTableSlot', 'FacultyTimeTable'):
+        apps.get_model('myapp', model).objects.update(day=Lower('day'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0036_timetableslot'),
+    ]
+
+    operations = [
+        migrations.RunPython(lowercase_days, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='facultytimetable',
+            unique_together={('name', 'day')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='timetable',
+            unique_together={('semester', 'department', 'day')},
+        ),
+    ]
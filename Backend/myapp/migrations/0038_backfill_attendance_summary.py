@@ -0,0 +1,39 @@
+from django.db import migrations
+from django.db.models import Count
+
+
+# AttendanceSummary was created empty, count the absences already in the Absentees log.
+# the department is resolved like rebuildAttendanceSummary does
+def fill_attendance_summary(apps, schema_editor):
+    Absentees = apps.get_model('myapp', 'Absentees')
+    AttendanceSummary = apps.get_model('myapp', 'AttendanceSummary')
+    CurrentCourses = apps.get_model('myapp', 'CurrentCourses')
+    StudentInfo = apps.get_model('myapp', 'StudentInfo')
+    course_departments = {}
+    for course_code, department in CurrentCourses.objects.values_list('course_code', 'department'):
+        course_departments.setdefault(course_code, []).append(department)
+    student_departments = dict(StudentInfo.objects.values_list('roll_no', 'department'))
+
+    summaries = []
+    for row in Absentees.objects.values('roll_no', 'course_code').annotate(absent_count=Count('id')).order_by():
+        departments = course_departments.get(row['course_code'], [])
+        department = student_departments.get(row['roll_no'], '')
+        if len(departments) == 1:
+            department = departments[0]
+        else:
+            department = next((d for d in departments if d.lower() == department.lower()), department)
+        summaries.append(AttendanceSummary(roll_no=row['roll_no'], course_code=row['course_code'],
+                                           department=department, absent_count=row['absent_count']))
+    AttendanceSummary.objects.all().delete()
+    AttendanceSummary.objects.bulk_create(summaries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0037_normalized_timetable_days'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_attendance_summary, migrations.RunPython.noop),
+    ]
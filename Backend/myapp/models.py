@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator,RegexValidator
 from django.utils import timezone
 # from django.contrib.auth.models import AbstractUser
@@ -56,6 +56,9 @@ class StudentInfo(models.Model):
     gender = models.CharField(max_length=255)
     email = models.EmailField()
 
+    class Meta:
+        indexes = [models.Index(fields=['email'])]
+
     def  __str__(self):
         return self.roll_no
 
@@ -67,6 +70,9 @@ class FacultyInfo(models.Model):
     email = models.EmailField()
     description = models.TextField()
 
+    class Meta:
+        indexes = [models.Index(fields=['email']), models.Index(fields=['name'])]
+
     def  __str__(self):
         return self.name
 
@@ -76,29 +82,60 @@ class AdministrationInfo(models.Model):
     email = models.EmailField()
     staff_id = models.CharField(max_length=255)
 
+    class Meta:
+        indexes = [models.Index(fields=['email'])]
+
     def __str__(self):
         return self.name
     
+class CourseList(models.Model):
+    course_code = models.CharField(max_length=255)
+    course_name = models.CharField(max_length=255)
+    semester = models.IntegerField()
+    department = models.CharField(max_length=255)
+    course_type=models.CharField(max_length=255,default="",null=True)
+    
+    class Meta:
+        unique_together = ('course_code', 'department')
+        indexes = [models.Index(fields=['semester', 'department'])]
+
+    def __str__(self):
+        return self.course_code+' '+self.course_name
+
+# CourseList entry of a course code, preferring the one of the given department
+def find_course(course_code, department):
+    courses = list(CourseList.objects.filter(course_code=course_code))
+    for course in courses:
+        if course.department.lower() == (department or '').lower():
+            return course
+    return courses[0] if courses else None
+
 class CurrentCourses(models.Model):
     course_code = models.CharField(max_length=255)
     total_classes = models.IntegerField()
     faculty_name = models.CharField(max_length=255)
     semester = models.IntegerField()
     department = models.CharField(max_length=255,default='none')
+    # catalog entry of course_code, filled in on save so views can select_related('course')
+    course = models.ForeignKey(CourseList, on_delete=models.SET_NULL, blank=True, null=True, related_name='current_courses')
 
+    class Meta:
+        indexes = [models.Index(fields=['faculty_name']), models.Index(fields=['course_code', 'department'])]
 
-    def __str__(self):
-        return self.course_code+' '+self.faculty_name
+    def save(self, *args, **kwargs):
+        if self.course_id is None or self.course.course_code != self.course_code:
+            self.course = find_course(self.course_code, self.department)
+        super().save(*args, **kwargs)
+
+    # the linked catalog entry, looked up again when the link is missing or stale
+    # (e.g. course_code changed by a queryset update)
+    def catalog_course(self):
+        if self.course is not None and self.course.course_code == self.course_code:
+            return self.course
+        return find_course(self.course_code, self.department)
 
-class CourseList(models.Model):
-    course_code = models.CharField(max_length=255)
-    course_name = models.CharField(max_length=255)
-    semester = models.IntegerField()
-    department = models.CharField(max_length=255)
-    course_type=models.CharField(max_length=255,default="",null=True)
-    
     def __str__(self):
-        return self.course_code+' '+self.course_name
+        return self.course_code+' '+self.faculty_name
     
 class Result(models.Model):
     course_code = models.CharField(max_length=255)
@@ -113,6 +150,9 @@ class Result(models.Model):
     )
     roll_no = models.CharField(max_length=255)
 
+    class Meta:
+        unique_together = ('course_code', 'roll_no')
+
     def __str__(self):
         return self.course_code+' '+self.roll_no
 
@@ -130,6 +170,9 @@ class FeeDefaulters(models.Model):
     batch = models.CharField(max_length=9, validators=[validate_batch_format])
     roll_no = models.CharField(max_length=255)
 
+    class Meta:
+        indexes = [models.Index(fields=['department', 'batch', 'roll_no'])]
+
     def __str__(self):
         return self.department+' '+self.batch
     
@@ -140,14 +183,35 @@ class Absentees(models.Model):
     roll_no = models.CharField(max_length=255)
     time_slot = models.CharField(max_length=255)
 
+    class Meta:
+        indexes = [models.Index(fields=['course_code', 'roll_no'])]
+
     def __str__(self):
         return  str(self.date) + " "+self.roll_no+" "+self.course_code
 
+# number of absences of a student in a course, maintained by insertAttendance
+# (rebuild it with manage.py rebuild_attendance_summary)
+class AttendanceSummary(models.Model):
+    roll_no = models.CharField(max_length=255)
+    course_code = models.CharField(max_length=255)
+    department = models.CharField(max_length=255)
+    absent_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('course_code', 'department', 'roll_no')
+        indexes = [models.Index(fields=['roll_no'])]
+
+    def __str__(self):
+        return self.roll_no + ' ' + self.course_code + ' ' + str(self.absent_count)
+
 class Todolist(models.Model):
     roll_no = models.CharField(max_length=255)
     task = models.CharField(max_length=255)
     id=models.CharField(max_length=100,primary_key=True)
     is_completed=models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [models.Index(fields=['roll_no'])]
     
     
 
@@ -155,7 +219,7 @@ class Todolist(models.Model):
         return self.roll_no+' '+self.task
     
 class Login(models.Model):
-    email = models.EmailField()
+    email = models.EmailField(unique=True)
     type_of_user = models.CharField(max_length=255)
 
     def __str__(self):
@@ -177,10 +241,42 @@ class TimeTable(models.Model):
     # date_created = models.DateTimeField(default=timezone.now)
     # date_created = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        unique_together = ('semester', 'department', 'day')
+
+    def save(self, *args, **kwargs):
+        # days are stored lowercase, one row per cohort and day
+        self.day = self.day.lower()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.rebuildSlots()
+
+    # one TimeTableSlot per filled slot, so the classes of a course can be found by index
+    def rebuildSlots(self):
+        self.slots.all().delete()
+        TimeTableSlot.objects.bulk_create([
+            TimeTableSlot(timetable=self, day=self.day, slot_no=slot_no, course_code=getattr(self, f'slot_{slot_no}'))
+            for slot_no in range(1, 8) if getattr(self, f'slot_{slot_no}')])
+
     def __str__(self):
         return 'sem'+str(self.semester) + ' ' + self.department + ' '+self.day
     
 
+# the filled slots of TimeTable as rows, kept in step by TimeTable.save
+class TimeTableSlot(models.Model):
+    timetable = models.ForeignKey(TimeTable, on_delete=models.CASCADE, related_name='slots')
+    day = models.CharField(max_length=10)
+    slot_no = models.PositiveSmallIntegerField()
+    course_code = models.CharField(max_length=5)
+
+    class Meta:
+        unique_together = ('timetable', 'slot_no')
+        indexes = [models.Index(fields=['course_code'])]
+
+    def __str__(self):
+        return self.day + ' ' + str(self.slot_no) + ' ' + self.course_code
+
+
 class WeeklyTimeTable(models.Model) :
     semester = models.IntegerField()
     department = models.CharField(max_length=255)
@@ -220,6 +316,10 @@ class FacultyTimeTable(models.Model):
     slot_5 = models.CharField(max_length=5, blank=True, null=True)
     slot_6 = models.CharField(max_length=5, blank=True, null=True)
     slot_7 = models.CharField(max_length=5, blank=True, null=True) 
+
+    class Meta:
+        unique_together = ('name', 'day')
+
     def __str__(self):
         return str(self.name) + ' '+self.day
     
@@ -235,5 +335,72 @@ class LabResult(models.Model) :
         validators=[RegexValidator(regex=r'^[ABCDEF|S]{1,2}$', message='Grade must be one of the following: A, B, C, D, E, F, S')]
     )
 
+    class Meta:
+        unique_together = ('course_code', 'roll_no')
+
+    def __str__(self):
+        return self.course_code+' '+self.roll_no
+
+# local mirror of the google calendar of each cohort, filled by incremental sync
+class CalendarEvent(models.Model):
+    calendar_id = models.CharField(max_length=255)
+    event_id = models.CharField(max_length=255)
+    summary = models.CharField(max_length=255, blank=True, default='')
+    date = models.DateField()
+    start_time = models.CharField(max_length=5)
+    end_time = models.CharField(max_length=5)
+
+    class Meta:
+        unique_together = ('calendar_id', 'event_id')
+        indexes = [
+            models.Index(fields=['calendar_id', 'date', 'summary']),
+            models.Index(fields=['calendar_id', 'date', 'start_time']),
+        ]
+
+    def __str__(self):
+        return str(self.date) + ' ' + self.start_time + ' ' + self.summary
+
+
+class CalendarSyncState(models.Model):
+    calendar_id = models.CharField(max_length=255, unique=True)
+    sync_token = models.CharField(max_length=255, blank=True, null=True)
+    last_synced = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return self.calendar_id
+
+
+# google calendar changes queued by the timetable views and run by the run_calendar_worker command
+class CalendarJob(models.Model):
+    ACTIONS = [
+        ('add_timetable', 'add_timetable'),
+        ('reschedule', 'reschedule'),
+        ('add_or_change', 'add_or_change'),
+        ('cancel', 'cancel'),
+    ]
+    STATUSES = [
+        ('pending', 'pending'),
+        ('running', 'running'),
+        ('done', 'done'),
+        ('failed', 'failed'),
+    ]
+    action = models.CharField(max_length=20, choices=ACTIONS)
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUSES, default='pending')
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    result = models.JSONField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+            models.Index(fields=['finished_at']),
+        ]
+
     def __str__(self):
-        return self.course_code+' '+self.roll_no
\ No newline at end of file
+        return str(self.id) + ' ' + self.action + ' ' + self.status
@@ -0,0 +1,148 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.forms.models import model_to_dict
+
+from .models import AdministrationInfo, FacultyInfo, Login, StudentInfo
+
+PROFILE_MODELS = {
+    'student': StudentInfo,
+    'student_cr': StudentInfo,
+    'faculty': FacultyInfo,
+    'admin': AdministrationInfo,
+}
+
+
+# bounded in-process store, least recently used entries go first once it is full
+class LocalProfileStore:
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.evictions = 0
+
+    def get(self, email):
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is None:
+                return None
+            expires, profile = entry
+            if expires < time.monotonic():
+                del self._entries[email]
+                return None
+            self._entries.move_to_end(email)
+            return profile
+
+    def set(self, email, profile):
+        with self._lock:
+            self._entries[email] = (time.monotonic() + self.ttl, profile)
+            self._entries.move_to_end(email)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, email):
+        with self._lock:
+            self._entries.pop(email, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def size(self):
+        return len(self._entries)
+
+
+# shared store on one of the CACHES aliases (e.g. redis or memcached), size and eviction are the backend's
+class DjangoCacheProfileStore:
+    def __init__(self, alias, ttl):
+        self.alias = alias
+        self.ttl = ttl
+        self.evictions = None
+
+    def key(self, email):
+        return f'profile:{email}'
+
+    def get(self, email):
+        return caches[self.alias].get(self.key(email))
+
+    def set(self, email, profile):
+        caches[self.alias].set(self.key(email), profile, self.ttl)
+
+    def delete(self, email):
+        caches[self.alias].delete(self.key(email))
+
+    # other processes share these entries, they are left to expire
+    def clear(self):
+        pass
+
+    @property
+    def size(self):
+        return None
+
+
+# resolved login type and profile fields by email, for getUserDetails and getUserAllDetails.
+# the signals in signals.py drop an entry when its Login or profile row changes
+class ProfileCache:
+    def __init__(self):
+        self._store = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def store(self):
+        if self._store is None:
+            ttl = getattr(settings, 'PROFILE_CACHE_TTL', 600)
+            alias = getattr(settings, 'PROFILE_CACHE_BACKEND', None)
+            if alias:
+                self._store = DjangoCacheProfileStore(alias, ttl)
+            else:
+                self._store = LocalProfileStore(getattr(settings, 'PROFILE_CACHE_SIZE', 10000), ttl)
+        return self._store
+
+    def load(self, email):
+        type_of_user = Login.objects.filter(email=email).values_list('type_of_user', flat=True).first()
+        if type_of_user not in PROFILE_MODELS:
+            return None
+        person = PROFILE_MODELS[type_of_user].objects.filter(email=email).first()
+        if person is None:
+            return None
+        return {'type_of_user': type_of_user, 'fields': model_to_dict(person)}
+
+    def get(self, email):
+        profile = self.store.get(email)
+        with self._lock:
+            if profile is not None:
+                self.hits += 1
+                return profile
+            self.misses += 1
+        profile = self.load(email)
+        if profile is not None:
+            self.store.set(email, profile)
+        return profile
+
+    def invalidate(self, email):
+        if email:
+            self.store.delete(email)
+
+    def reset(self):
+        with self._lock:
+            if self._store is not None:
+                self._store.clear()
+            self._store = None
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / lookups if lookups else None,
+                'size': self.store.size, 'evictions': self.store.evictions}
+
+
+profile_cache = ProfileCache()
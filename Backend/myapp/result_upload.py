@@ -0,0 +1,127 @@
+import csv
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .course_stats import invalidateCourseStats
+from .models import LabResult, Result
+
+# model and record fields of the theory and lab grade uploads
+RESULT_UPLOADS = {
+    'theory': (Result, ['course_code', 'faculty', 'ct_1', 'ct_2', 'assignments', 'end_sem', 'grade', 'roll_no']),
+    'lab': (LabResult, ['course_code', 'faculty', 'internal_marks', 'end_lab', 'grade', 'roll_no']),
+}
+
+
+def lines(stream):
+    for line in stream:
+        yield line.decode('utf-8-sig') if isinstance(line, bytes) else line
+
+
+# the records of an upload: a JSON list (the frontend's format), a CSV body with a header row,
+# newline delimited JSON (one record per line), or either of the last two as a multipart 'file'.
+# CSV and newline delimited JSON are read line by line from the request stream
+def readResultRecords(request):
+    content_type = (request.content_type or '').split(';')[0].strip()
+    if content_type == 'multipart/form-data':
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValueError('Upload the records as a file named "file"')
+        stream = upload
+        content_type = 'application/x-ndjson' if upload.name.endswith(('.ndjson', '.jsonl')) else 'text/csv'
+    else:
+        stream = request.stream or []
+
+    if content_type == 'text/csv':
+        return list(csv.DictReader(lines(stream)))
+    if content_type in ('application/x-ndjson', 'application/jsonl'):
+        try:
+            return [json.loads(line) for line in lines(stream) if line.strip()]
+        except ValueError as e:
+            raise ValueError(f'Invalid JSON line: {e}')
+    records = request.data
+    if not isinstance(records, list):
+        raise ValueError('Send a list of records')
+    return records
+
+
+# builds and validates every record before anything is written.
+# returns the unsaved objects and, per invalid record, its position, roll number and field errors
+def validateResultRecords(kind, records):
+    model, fields = RESULT_UPLOADS[kind]
+    objects = []
+    errors = []
+    seen = set()
+    for index, record in enumerate(records):
+        if not isinstance(record, dict):
+            errors.append({'record': index, 'roll_no': None, 'errors': {'__all__': ['Record must be an object']}})
+            continue
+        missing = [field for field in fields if record.get(field) in (None, '')]
+        if missing:
+            errors.append({'record': index, 'roll_no': record.get('roll_no'),
+                           'errors': {field: ['This field is required.'] for field in missing}})
+            continue
+        obj = model(**{field: record[field] for field in fields})
+        try:
+            # uniqueness is checked below for the whole upload instead of a query per record
+            obj.full_clean(validate_unique=False)
+        except ValidationError as e:
+            errors.append({'record': index, 'roll_no': record.get('roll_no'), 'errors': e.message_dict})
+            continue
+        if (obj.course_code, obj.roll_no) in seen:
+            errors.append({'record': index, 'roll_no': obj.roll_no,
+                           'errors': {'roll_no': ['Appears more than once for this course in the upload']}})
+            continue
+        seen.add((obj.course_code, obj.roll_no))
+        objects.append(obj)
+    return objects, errors
+
+
+# bulk writes skip the model signals, so the uploads drop the cached course statistics themselves
+def afterResultUpload(kind, course_codes):
+    transaction.on_commit(lambda: invalidateCourseStats(kind, course_codes))
+
+
+# replaces the results of every course in the upload in one transaction
+def replaceResults(kind, objects):
+    model, fields = RESULT_UPLOADS[kind]
+    course_codes = set(obj.course_code for obj in objects)
+    with transaction.atomic():
+        model.objects.filter(course_code__in=course_codes).delete()
+        model.objects.bulk_create(objects, batch_size=500)
+        afterResultUpload(kind, course_codes)
+    return len(objects)
+
+
+# inserts new (course_code, roll_no) pairs and rewrites only the fields that changed on existing ones,
+# rows missing from the upload are kept. rows changed in the same fields share one bulk_update
+def upsertResults(kind, objects):
+    model, fields = RESULT_UPLOADS[kind]
+    data_fields = [field for field in fields if field not in ('course_code', 'roll_no')]
+    summary = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+    with transaction.atomic():
+        existing = {(row.course_code, row.roll_no): row for row in
+                    model.objects.filter(course_code__in=set(obj.course_code for obj in objects))}
+        new_rows = []
+        changed = {}
+        for obj in objects:
+            row = existing.get((obj.course_code, obj.roll_no))
+            if row is None:
+                new_rows.append(obj)
+                continue
+            changed_fields = tuple(field for field in data_fields if getattr(row, field) != getattr(obj, field))
+            if not changed_fields:
+                summary['unchanged'] += 1
+                continue
+            for field in changed_fields:
+                setattr(row, field, getattr(obj, field))
+            changed.setdefault(changed_fields, []).append(row)
+        model.objects.bulk_create(new_rows, batch_size=500)
+        for changed_fields, rows in changed.items():
+            model.objects.bulk_update(rows, changed_fields, batch_size=500)
+        if new_rows or changed:
+            afterResultUpload(kind, set(obj.course_code for obj in objects))
+    summary['inserted'] = len(new_rows)
+    summary['updated'] = sum(len(rows) for rows in changed.values())
+    return summary
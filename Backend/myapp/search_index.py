@@ -0,0 +1,105 @@
+from django.db import connection
+
+from .models import AdministrationInfo, FacultyInfo, StudentInfo
+
+# FTS5 table (trigram tokenizer) over the names, ids and emails of students, faculty and staff.
+# created by migration 0034 on sqlite and kept in sync by the signals in signals.py
+TABLE = 'myapp_directory_search'
+
+# kind stored in the index -> (model, field used as key, field used as id)
+KINDS = {
+    'student': (StudentInfo, 'roll_no', 'roll_no'),
+    'faculty': (FacultyInfo, 'id', 'faculty_id'),
+    'admin': (AdministrationInfo, 'id', 'staff_id'),
+}
+
+
+def kindOf(instance):
+    for kind, (model, key_field, ident_field) in KINDS.items():
+        if isinstance(instance, model):
+            return kind
+    return None
+
+
+def searchIndexAvailable():
+    return connection.vendor == 'sqlite'
+
+
+def indexRow(kind, instance):
+    model, key_field, ident_field = KINDS[kind]
+    return [kind, str(getattr(instance, key_field)), instance.name or '',
+            getattr(instance, ident_field) or '', instance.email or '']
+
+
+def indexPerson(instance):
+    kind = kindOf(instance)
+    if kind is None or not searchIndexAvailable():
+        return
+    row = indexRow(kind, instance)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE kind = %s AND key = %s', row[:2])
+        cursor.execute(f'INSERT INTO {TABLE} (kind, key, name, ident, email) VALUES (%s, %s, %s, %s, %s)', row)
+
+
+def unindexPerson(instance):
+    kind = kindOf(instance)
+    if kind is None or not searchIndexAvailable():
+        return
+    model, key_field, ident_field = KINDS[kind]
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE kind = %s AND key = %s', [kind, str(getattr(instance, key_field))])
+
+
+# refills the index from the three tables, e.g. after bulk imports that bypass the signals
+def rebuildSearchIndex():
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        for kind, (model, key_field, ident_field) in KINDS.items():
+            rows = (indexRow(kind, instance) for instance in
+                    model.objects.only(key_field, 'name', ident_field, 'email').iterator(chunk_size=5000))
+            cursor.executemany(f'INSERT INTO {TABLE} (kind, key, name, ident, email) VALUES (%s, %s, %s, %s, %s)', rows)
+
+
+def trigrams(text):
+    text = text.lower()
+    return set(text[i:i + 3] for i in range(len(text) - 2))
+
+
+def quote(text):
+    return '"' + text.replace('"', '""') + '"'
+
+
+# [(kind, key)] of the people matching query, best first. every query is an indexed lookup:
+# substring matches ranked by bm25 (a match in the name counts most), and when there are none
+# and fuzzy is set, names sharing at least half of the query's trigrams (typos), ranked by overlap
+def searchDirectory(query, limit=50, offset=0, fuzzy=True):
+    query = query.strip()
+    if len(query) < 3:
+        # trigram index needs three characters, short queries match name prefixes
+        sql = f'SELECT kind, key FROM {TABLE} WHERE name LIKE %s ORDER BY name LIMIT %s OFFSET %s'
+        params = [query.replace('%', '').replace('_', '') + '%', limit, offset]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [tuple(row) for row in cursor.fetchall()]
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT kind, key FROM {TABLE} WHERE {TABLE} MATCH %s '
+                       f'ORDER BY bm25({TABLE}, 0, 0, 10.0, 2.0, 1.0) LIMIT %s OFFSET %s',
+                       ['{name ident email}: ' + quote(query), limit, offset])
+        results = [tuple(row) for row in cursor.fetchall()]
+    if results or offset or not fuzzy:
+        return results
+
+    wanted = trigrams(query)
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT kind, key, name FROM {TABLE} WHERE {TABLE} MATCH %s '
+                       f'ORDER BY bm25({TABLE}, 0, 0, 10.0, 2.0, 1.0) LIMIT 500',
+                       ['name: ' + ' OR '.join(quote(trigram) for trigram in sorted(wanted))])
+        candidates = cursor.fetchall()
+    scored = []
+    for kind, key, name in candidates:
+        overlap = len(wanted & trigrams(name)) / len(wanted)
+        if overlap >= 0.5:
+            scored.append((-overlap, name, kind, key))
+    scored.sort()
+    return [(kind, key) for _, _, kind, key in scored[:limit]]
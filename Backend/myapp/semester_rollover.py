@@ -0,0 +1,63 @@
+from datetime import date
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Case, Count, IntegerField, Q, Value, When
+
+from .models import StudentInfo
+from .profile_cache import profile_cache
+from .session_bootstrap import invalidateAllBootstraps
+
+
+# semester of a student who joined in joining_year, 0 once the four years are over.
+# the year turns over in june
+def semesterForJoiningYear(joining_year, today):
+    years_since_joining = (today.year - int(joining_year)) + (today.month - 6) / 12
+    if years_since_joining >= 4:
+        return 0
+    return int(years_since_joining * 2) + 1
+
+
+# per joining year: the semester it should be in, how many students it has and how many of them
+# are in another semester. one grouped query
+def rolloverPlan(today):
+    plan = {}
+    skipped = 0
+    for joining_year, semester, students in StudentInfo.objects.values_list('joining_year', 'semester') \
+            .annotate(students=Count('roll_no')).order_by('joining_year'):
+        try:
+            target = semesterForJoiningYear(joining_year, today)
+        except (TypeError, ValueError):
+            skipped += students
+            continue
+        year = plan.setdefault(joining_year, {'semester': target, 'students': 0, 'changing': 0})
+        year['students'] += students
+        if semester != target:
+            year['changing'] += students
+    return plan, skipped
+
+
+# moves every student to the semester of their joining year with one UPDATE ... CASE over the
+# joining years that have students in the wrong semester. dry_run only reports the plan
+def rolloverSemesters(today=None, dry_run=False):
+    today = today or date.today()
+    plan, skipped = rolloverPlan(today)
+    changing = {joining_year: year['semester'] for joining_year, year in plan.items() if year['changing']}
+    updated = 0
+    if changing and not dry_run:
+        stale = reduce(or_, (Q(joining_year=joining_year) & ~Q(semester=semester) for joining_year, semester in changing.items()))
+        with transaction.atomic():
+            students = StudentInfo.objects.filter(stale)
+            # update() skips the model signals, so drop the cached profiles and bootstraps here
+            emails = list(students.values_list('email', flat=True))
+            updated = students.update(semester=Case(
+                *[When(joining_year=joining_year, then=Value(semester)) for joining_year, semester in changing.items()],
+                output_field=IntegerField()))
+
+            def invalidate():
+                for email in emails:
+                    profile_cache.invalidate(email)
+                invalidateAllBootstraps()
+            transaction.on_commit(invalidate)
+    return {'date': today.isoformat(), 'dry_run': dry_run, 'joining_years': plan, 'skipped': skipped, 'updated': updated}
@@ -0,0 +1,91 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import (AdministrationInfo, CourseList, CurrentCourses, FacultyInfo, FacultyTimeTable, Login,
+                     StudentInfo, Todolist)
+from .timetables import SLOTS, cohortWeek, weekRows
+
+
+# everything the frontend loads after login, in a fixed number of queries:
+# student 5 (login, profile, courses, timetable, todos), faculty 4, admin 2. None for an unknown email
+def buildSessionBootstrap(email):
+    login = Login.objects.filter(email=email).values_list('type_of_user', flat=True).first()
+    if login is None:
+        return None
+    data = {'type_of_user': login, 'email': email, 'profile': None, 'courses': [], 'timetable': [], 'todos': []}
+
+    if login == 'student' or login == 'student_cr':
+        student = StudentInfo.objects.filter(email=email).first()
+        if student is None:
+            return data
+        data['profile'] = {'student_name': student.name, 'roll_no': student.roll_no, 'joining_year': student.joining_year,
+                           'department': student.department, 'semester': student.semester, 'gender': student.gender,
+                           'blood_group': student.blood_group, 'contact_number': student.contact_number,
+                           'email': student.email, 'address': student.address}
+        data['courses'] = [list(course) for course in CourseList.objects.filter(semester=student.semester, department=student.department)
+                           .values_list('course_code', 'course_name', 'department')]
+        data['timetable'] = cohortWeek(student.semester, student.department.lower()).rows()
+        data['todos'] = list(Todolist.objects.filter(roll_no=student.roll_no).values('roll_no', 'task', 'id', 'is_completed'))
+    elif login == 'faculty':
+        teacher = FacultyInfo.objects.filter(email=email).first()
+        if teacher is None:
+            return data
+        data['profile'] = {'faculty_id': teacher.faculty_id, 'faculty_name': teacher.name, 'position': teacher.position,
+                           'designation': teacher.designation, 'email': teacher.email, 'description': teacher.description}
+        data['courses'] = []
+        for course in CurrentCourses.objects.filter(faculty_name=teacher.name).select_related('course'):
+            catalog = course.catalog_course()
+            data['courses'].append([course.course_code, catalog.course_name if catalog else '', course.department])
+        data['timetable'] = weekRows(FacultyTimeTable.objects.filter(name=teacher.name).values('day', *SLOTS))
+    elif login == 'admin':
+        staff = AdministrationInfo.objects.filter(email=email).first()
+        if staff is not None:
+            data['profile'] = {'admin_name': staff.name, 'position': staff.position, 'admin_id': staff.staff_id, 'email': staff.email}
+    return data
+
+
+# the bootstraps and their version live in a cache every worker reads, so a write in one drops them in all
+def bootstrapCache():
+    return caches[getattr(settings, 'SESSION_BOOTSTRAP_CACHE_BACKEND', 'shared')]
+
+
+# the cache key carries a version, so a write to shared data (courses, timetables, profiles)
+# drops every cached bootstrap at once by bumping it. it starts from the clock so a version
+# evicted from the cache never comes back as an old one
+def bootstrapVersion():
+    return bootstrapCache().get_or_set('session_bootstrap:version', lambda: time.time_ns(), None)
+
+
+def bootstrapKey(email):
+    return f'session_bootstrap:{bootstrapVersion()}:{email}'
+
+
+def cachedSessionBootstrap(email):
+    cache = bootstrapCache()
+    key = bootstrapKey(email)
+    data = cache.get(key)
+    if data is None:
+        data = buildSessionBootstrap(email)
+        if data is not None:
+            cache.set(key, data, getattr(settings, 'SESSION_BOOTSTRAP_CACHE_TIMEOUT', 300))
+    return data
+
+
+def invalidateAllBootstraps():
+    cache = bootstrapCache()
+    try:
+        cache.incr('session_bootstrap:version')
+    except ValueError:
+        cache.set('session_bootstrap:version', time.time_ns(), None)
+
+
+def invalidateBootstrap(email):
+    bootstrapCache().delete(bootstrapKey(email))
+
+
+# todos change often and only concern their student
+def invalidateStudentBootstrap(roll_no):
+    for email in StudentInfo.objects.filter(roll_no=roll_no).values_list('email', flat=True):
+        invalidateBootstrap(email)
@@ -0,0 +1,160 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .attendance_summary import adjustAttendanceSummary, keptByCaller
+from .course_stats import invalidateCourseStats
+from .directory_prefix import directory_prefixes, personFromInstance
+from .models import (Absentees, AdministrationInfo, CourseList, CurrentCourses, FacultyInfo, FacultyTimeTable, LabResult,
+                     Login, Result, StudentInfo, TimeTable, Todolist)
+from .profile_cache import profile_cache
+from .search_index import indexPerson, unindexPerson
+from .timetable_cache import timetable_payloads
+from .session_bootstrap import invalidateAllBootstraps, invalidateStudentBootstrap
+
+
+@receiver(post_save, sender=StudentInfo)
+@receiver(post_save, sender=FacultyInfo)
+@receiver(post_save, sender=AdministrationInfo)
+def updateSearchIndex(sender, instance, **kwargs):
+    indexPerson(instance)
+    # the prefix index lives outside the database, so it only sees committed changes
+    person = personFromInstance(instance)
+    transaction.on_commit(lambda: directory_prefixes.update(person))
+
+
+@receiver(post_delete, sender=StudentInfo)
+@receiver(post_delete, sender=FacultyInfo)
+@receiver(post_delete, sender=AdministrationInfo)
+def removeFromSearchIndex(sender, instance, **kwargs):
+    unindexPerson(instance)
+    person = personFromInstance(instance)
+    transaction.on_commit(lambda: directory_prefixes.remove(person['kind'], person['key']))
+
+
+@receiver(post_save, sender=Login)
+@receiver(post_delete, sender=Login)
+@receiver(post_save, sender=StudentInfo)
+@receiver(post_delete, sender=StudentInfo)
+@receiver(post_save, sender=FacultyInfo)
+@receiver(post_delete, sender=FacultyInfo)
+@receiver(post_save, sender=AdministrationInfo)
+@receiver(post_delete, sender=AdministrationInfo)
+@receiver(post_save, sender=CourseList)
+@receiver(post_delete, sender=CourseList)
+@receiver(post_save, sender=CurrentCourses)
+@receiver(post_delete, sender=CurrentCourses)
+@receiver(post_save, sender=TimeTable)
+@receiver(post_delete, sender=TimeTable)
+@receiver(post_save, sender=FacultyTimeTable)
+@receiver(post_delete, sender=FacultyTimeTable)
+def dropSessionBootstraps(sender, instance, **kwargs):
+    transaction.on_commit(invalidateAllBootstraps)
+
+
+@receiver(post_save, sender=Todolist)
+@receiver(post_delete, sender=Todolist)
+def dropStudentBootstrap(sender, instance, **kwargs):
+    roll_no = instance.roll_no
+    transaction.on_commit(lambda: invalidateStudentBootstrap(roll_no))
+
+
+# an email change would otherwise leave the profile cached under the old address
+@receiver(pre_save, sender=Login)
+@receiver(pre_save, sender=StudentInfo)
+@receiver(pre_save, sender=FacultyInfo)
+@receiver(pre_save, sender=AdministrationInfo)
+def rememberStoredEmail(sender, instance, **kwargs):
+    if not instance._state.adding:
+        instance._stored_email = sender.objects.filter(pk=instance.pk).values_list('email', flat=True).first()
+
+
+@receiver(post_save, sender=Login)
+@receiver(post_delete, sender=Login)
+@receiver(post_save, sender=StudentInfo)
+@receiver(post_delete, sender=StudentInfo)
+@receiver(post_save, sender=FacultyInfo)
+@receiver(post_delete, sender=FacultyInfo)
+@receiver(post_save, sender=AdministrationInfo)
+@receiver(post_delete, sender=AdministrationInfo)
+def dropCachedProfile(sender, instance, **kwargs):
+    emails = set([instance.email, getattr(instance, '_stored_email', None)])
+
+    def invalidate():
+        for email in emails:
+            profile_cache.invalidate(email)
+    transaction.on_commit(invalidate)
+
+
+# CurrentCourses link their catalog entry when saved; an entry added, moved to another course code
+# or deleted afterwards relinks the rows of its course code
+@receiver(post_save, sender=CourseList)
+def linkCurrentCourses(sender, instance, **kwargs):
+    current = CurrentCourses.objects.filter(course_code=instance.course_code)
+    current.filter(course__isnull=True).update(course=instance)
+    current.filter(department__iexact=instance.department).exclude(course=instance).update(course=instance)
+    for stale in CurrentCourses.objects.filter(course=instance).exclude(course_code=instance.course_code):
+        stale.save(update_fields=['course'])
+
+
+@receiver(post_delete, sender=CourseList)
+def relinkCurrentCourses(sender, instance, **kwargs):
+    for current in CurrentCourses.objects.filter(course_code=instance.course_code, course__isnull=True):
+        current.save(update_fields=['course'])
+
+
+# result rows saved or deleted through the orm (admin, the api/ viewsets, queryset deletes);
+# the bulk inserts of the grade uploads skip signals and drop the statistics themselves
+@receiver(post_save, sender=Result)
+@receiver(post_delete, sender=Result)
+@receiver(post_save, sender=LabResult)
+@receiver(post_delete, sender=LabResult)
+def dropCourseStats(sender, instance, **kwargs):
+    kind = 'lab' if sender is LabResult else 'theory'
+    course_code = instance.course_code
+    transaction.on_commit(lambda: invalidateCourseStats(kind, [course_code]))
+
+
+# a row moved to another semester or department changes the timetable of both cohorts
+@receiver(pre_save, sender=TimeTable)
+def rememberStoredCohort(sender, instance, **kwargs):
+    if not instance._state.adding:
+        instance._stored_cohort = sender.objects.filter(pk=instance.pk).values_list('semester', 'department').first()
+
+
+@receiver(post_save, sender=TimeTable)
+@receiver(post_delete, sender=TimeTable)
+def dropTimetablePayload(sender, instance, **kwargs):
+    cohorts = set([(instance.semester, instance.department.lower())])
+    stored = getattr(instance, '_stored_cohort', None)
+    if stored is not None:
+        cohorts.add((stored[0], stored[1].lower()))
+
+    def invalidate():
+        for semester, department in cohorts:
+            timetable_payloads.invalidate(semester, department)
+    transaction.on_commit(invalidate)
+
+
+# absences added, moved or removed one at a time (admin, the api/ viewset) keep AttendanceSummary in
+# step; the attendance sync applies its own changes in bulk
+@receiver(pre_save, sender=Absentees)
+def rememberStoredAbsence(sender, instance, **kwargs):
+    if not instance._state.adding:
+        instance._stored_absence = sender.objects.filter(pk=instance.pk).values_list('roll_no', 'course_code').first()
+
+
+@receiver(post_save, sender=Absentees)
+def countAbsence(sender, instance, created, **kwargs):
+    stored = getattr(instance, '_stored_absence', None)
+    if created:
+        adjustAttendanceSummary(instance.roll_no, instance.course_code, 1)
+    elif stored is not None and stored != (instance.roll_no, instance.course_code):
+        adjustAttendanceSummary(stored[0], stored[1], -1)
+        adjustAttendanceSummary(instance.roll_no, instance.course_code, 1)
+
+
+@receiver(post_delete, sender=Absentees)
+def uncountAbsence(sender, instance, **kwargs):
+    if not keptByCaller():
+        adjustAttendanceSummary(instance.roll_no, instance.course_code, -1)
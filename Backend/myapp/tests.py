@@ -6,14 +6,42 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.exceptions import ValidationError
 from django.urls import reverse
 from rest_framework import status
-from datetime import datetime
+from datetime import datetime, timedelta
 from rest_framework.test import APIClient
 from myapp.models import *
 from datetime import date
+import json
+import re
 from django.contrib.auth.models import User
+from django.utils import timezone
+from django.core.management import call_command
+from io import StringIO
 from .models import Login,Result,LabResult
 from .models import Todolist
 
+
+# the 'shared' cache is a directory that outlives the test database, the tests keep it in a
+# temporary one. the changes of a test are never committed, so the tests that read it start empty
+def setUpModule():
+    global shared_cache_location, shared_cache_override
+    import tempfile
+    from django.conf import settings
+    from django.test import override_settings
+    shared_cache_location = tempfile.TemporaryDirectory()
+    shared_cache_override = override_settings(CACHES=dict(settings.CACHES, shared=dict(
+        settings.CACHES['shared'], LOCATION=shared_cache_location.name)))
+    shared_cache_override.enable()
+
+
+def tearDownModule():
+    shared_cache_override.disable()
+    shared_cache_location.cleanup()
+
+
+def useEmptySharedCache(test):
+    from django.core.cache import caches
+    caches['shared'].clear()
+
 class TestMessageModel(TestCase):
     def test_file_size_limit(self):
         # Create a file over 1 MB for testing
@@ -198,6 +226,7 @@ class TestStudentInfoModel(TestCase):
 class TimetableAPICallTestCase(TestCase): # TC1
     def setUp(self):
         self.client = APIClient()
+        useEmptySharedCache(self)
         self.semester = '3'
         self.department = 'cse'
 
@@ -319,6 +348,15 @@ class TimetableTestCases(TestCase):
         except AssertionError:
             print("test_donot_add_duplicate_timetable_entry: FAILED")
             self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_duplicate_day_is_a_400_everywhere(self):
+        response = self.client.post(self.url, dict(self.data, day='Friday'), format='json')
+        self.assertEqual(response.data, {'error': 'Timetable already exists for this semester, department, and day.'})
+        response = self.client.post('/api/timetable/', self.data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        # a proposal may redefine the stored day
+        response = self.client.post(reverse('checkTimetableClashes'), [self.data], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
     
 
 class DataFetcher(TestCase):
@@ -551,6 +589,47 @@ class InsertAttendanceTestCase(TestCase):
         response = self.client.post(self.url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_sync_many_sessions_in_one_request(self):
+        Absentees.objects.create(course_code=self.course_code, date='2024-04-15', roll_no="A009", time_slot="09:20-10:10")
+        call_command('rebuild_attendance_summary', stdout=StringIO())
+        sessions = [
+            {"date": "2024-04-15", "time_slot": "09:20-10:10", "absentees_list": ["A001"], "count": 1},
+            {"date": "2024-04-16", "time_slot": "09:20-10:10", "absentees_list": ["A001", "A002"], "count": 0},
+            {"date": "2024-04-17", "time_slot": "11:20-12:10", "absentees_list": [], "count": 0},
+        ]
+        data = {"course_id": self.course_code, "department": self.department, "sessions": sessions}
+        # savepoint, total_classes, read absentees, read and delete the changed rows, insert,
+        # read summary, insert summary, update summary, release
+        with self.assertNumQueries(10):
+            response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(CurrentCourses.objects.get(course_code=self.course_code).total_classes, 2)
+        self.assertEqual(sorted(Absentees.objects.values_list('date', 'roll_no')),
+                         [(date(2024, 4, 15), 'A001'), (date(2024, 4, 16), 'A001'), (date(2024, 4, 16), 'A002')])
+        self.assertEqual(dict(AttendanceSummary.objects.filter(course_code=self.course_code, department=self.department)
+                              .values_list('roll_no', 'absent_count')), {'A001': 2, 'A002': 1, 'A009': 0})
+
+    def test_sync_rejects_invalid_session(self):
+        sessions = [
+            {"date": "2024-04-15", "time_slot": "09:20-10:10", "absentees_list": ["A001"], "count": 0},
+            {"date": "15-04-2024", "time_slot": "09:20-10:10", "absentees_list": ["A001"], "count": 0},
+        ]
+        data = {"course_id": self.course_code, "department": self.department, "sessions": sessions}
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['session'], 1)
+        self.assertEqual(Absentees.objects.count(), 0)
+        self.assertEqual(CurrentCourses.objects.get(course_code=self.course_code).total_classes, 0)
+
+    def test_sync_rejects_missing_count_and_repeated_session(self):
+        session = {"date": "2024-04-15", "time_slot": "09:20-10:10", "absentees_list": ["A001"], "count": 0}
+        for sessions in ([session, dict(session, count=1)], [dict(session, time_slot="11:20-12:10"), {k: v for k, v in session.items() if k != "count"}]):
+            data = {"course_id": self.course_code, "department": self.department, "sessions": sessions}
+            response = self.client.post(self.url, data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.data['session'], 1)
+        self.assertEqual(Absentees.objects.count(), 0)
+
 class AuthTests(TestCase):
 
     def setUp(self):
@@ -752,3 +831,1235 @@ class ResultTestCase(TestCase):
         response = self.client.post(self.add_result_lab_url, invalid_data, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+
+
+# in-memory stand-in for the google calendar service used by the calendar helpers
+class FakeRequest:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+class FakeEvents:
+    def __init__(self, service):
+        self.service = service
+
+    def list(self, **kwargs):
+        self.service.list_calls.append(kwargs)
+        if kwargs.get('syncToken'):
+            items, self.service.changes = self.service.changes, []
+        else:
+            items = [e for e in self.service.stored.values() if e.get('status') != 'cancelled']
+        return FakeRequest({'items': items, 'nextSyncToken': 'token-%d' % len(self.service.list_calls)})
+
+    def insert(self, calendarId, body):
+        from googleapiclient.errors import HttpError
+        import httplib2
+        if body.get('id') in self.service.stored:
+            return FakeRequest(HttpError(httplib2.Response({'status': 409}), b'duplicate'))
+        self.service.counter += 1
+        event = dict(body, id=body.get('id') or 'ev%d' % self.service.counter)
+        self.service.stored[event['id']] = event
+        self.service.inserts += 1
+        return FakeRequest(event)
+
+    def get(self, calendarId, eventId):
+        return FakeRequest(dict(self.service.stored[eventId]))
+
+    def update(self, calendarId, eventId, body):
+        self.service.stored[eventId] = dict(body)
+        return FakeRequest(dict(body, updated='now'))
+
+    def delete(self, calendarId, eventId):
+        if self.service.fail_deletes:
+            from googleapiclient.errors import HttpError
+            import httplib2
+            self.service.fail_deletes -= 1
+            return FakeRequest(HttpError(httplib2.Response({'status': 503}), b'unavailable'))
+        self.service.stored.pop(eventId)
+        return FakeRequest('')
+
+
+class FakeCalendarService:
+    def __init__(self):
+        self.stored = {}
+        self.changes = []
+        self.list_calls = []
+        self.counter = 0
+        self.inserts = 0
+        self.fail_deletes = 0
+
+    def add(self, event_id, summary, start, end):
+        event = {'id': event_id, 'summary': summary, 'start': {'dateTime': start}, 'end': {'dateTime': end}}
+        self.stored[event_id] = event
+        self.changes.append(event)
+
+    def events(self):
+        return FakeEvents(self)
+
+
+class CalendarEventStoreTestCase(TestCase):
+    def setUp(self):
+        from unittest import mock
+        from myapp import views
+        self.views = views
+        self.service = FakeCalendarService()
+        self.service.add('e1', 'CS102', '2024-04-15T09:20:00+05:30', '2024-04-15T10:10:00+05:30')
+        self.service.add('e2', 'CS102', '2024-04-15T14:00:00+05:30', '2024-04-15T14:50:00+05:30')
+        self.service.add('e3', 'CS103', '2024-04-15T10:10:00+05:30', '2024-04-15T11:00:00+05:30')
+        self.service.changes = []
+        self.calender_id = views.getCalenderId('2021', 'cse')
+        patcher = mock.patch.object(views, 'connectToCalender', return_value=(self.service, self.calender_id))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_slots_come_from_local_store(self):
+        slots = self.views.getEventsOnCond('15-04-2024', 'CS102', '2021', 'cse')
+        self.assertEqual(slots, ['09:20', '14:00'])
+        self.assertEqual(CalendarEvent.objects.filter(calendar_id=self.calender_id).count(), 3)
+
+        # the second lookup is answered without listing the calendar again
+        self.views.getEventsOnCond('15-04-2024', 'CS103', '2021', 'cse')
+        self.assertEqual(len(self.service.list_calls), 1)
+
+    def test_incremental_sync_after_invalidation(self):
+        self.views.getEventsOnCond('15-04-2024', 'CS102', '2021', 'cse')
+        self.service.changes = [{'id': 'e1', 'status': 'cancelled'}]
+        self.service.add('e4', 'CS102', '2024-04-15T16:00:00+05:30', '2024-04-15T16:50:00+05:30')
+        self.views.invalidateCalendarStore(self.calender_id)
+
+        slots = self.views.getEventsOnCond('15-04-2024', 'CS102', '2021', 'cse')
+        self.assertEqual(slots, ['14:00', '16:00'])
+        self.assertEqual(self.service.list_calls[-1]['syncToken'], 'token-1')
+
+    def test_cancel_and_reschedule_use_the_event_index(self):
+        self.assertEqual(self.views.getEventID('2024-04-15', '09:20-10:10', '2021', 'cse'), 'e1')
+        self.views.cancelEvent('2024-04-15', '09:20-10:10', '2021', 'cse')
+        self.assertNotIn('e1', self.service.stored)
+        self.assertIsNone(self.views.getEventID('2024-04-15', '09:20-10:10', '2021', 'cse'))
+
+        self.views.rescheduleEvent('2024-04-15', '14:00-14:50', '2024-04-16', '11:20-12:10', '2021', 'cse')
+        new_id = self.views.getEventID('2024-04-16', '11:20-12:10', '2021', 'cse')
+        self.assertEqual(self.service.stored[new_id]['summary'], 'CS102')
+        self.assertIsNone(self.views.getEventID('2024-04-15', '14:00-14:50', '2021', 'cse'))
+        # everything after the first sync was answered from the index
+        self.assertEqual(len(self.service.list_calls), 1)
+
+    def test_retried_reschedule_does_not_duplicate_the_class(self):
+        from myapp.calendar_jobs import enqueueCalendarJob, runNextCalendarJob
+        job = enqueueCalendarJob('reschedule', {'from_date': '2024-04-15', 'from_time_slot': '14:00-14:50', 'to_date': '2024-04-16',
+                                                'to_time_slot': '11:20-12:10', 'joining_yr': '2021', 'department': 'cse'})
+        self.service.fail_deletes = 1
+        self.assertEqual(runNextCalendarJob().status, 'pending')
+        self.assertIn('e2', self.service.stored)
+        CalendarJob.objects.filter(id=job.id).update(run_after=timezone.now())
+        self.assertEqual(runNextCalendarJob().status, 'done')
+        self.assertNotIn('e2', self.service.stored)
+        self.assertEqual([event['summary'] for event in self.service.stored.values() if event['start']['dateTime'].startswith('2024-04-16')], ['CS102'])
+        self.assertEqual(self.service.inserts, 1)
+        # run once more (e.g. a reclaimed job that had finished): the class is already moved
+        CalendarJob.objects.filter(id=job.id).update(status='pending', run_after=timezone.now())
+        self.assertEqual(runNextCalendarJob().status, 'done')
+        self.assertEqual(self.service.inserts, 1)
+
+
+class CalendarServiceRegistryTestCase(TestCase):
+    def setUp(self):
+        from unittest import mock
+        from myapp import views
+        self.creds = mock.Mock(expiry=datetime.utcnow() + timedelta(hours=1), refresh_token='r', valid=True)
+        self.creds.to_json.return_value = '{}'
+        auth = mock.patch.object(views, 'calenderAccessAuth', return_value=self.creds)
+        build = mock.patch.object(views, 'build', side_effect=lambda *a, **k: object())
+        self.auth = auth.start()
+        self.build = build.start()
+        self.addCleanup(auth.stop)
+        self.addCleanup(build.stop)
+        self.registry = views.CalendarServiceRegistry()
+
+    def test_service_is_built_once(self):
+        first = self.registry.getService()
+        for _ in range(5):
+            self.assertIs(self.registry.getService(), first)
+        self.assertEqual(self.auth.call_count, 1)
+        self.assertEqual(self.build.call_count, 1)
+        self.creds.refresh.assert_not_called()
+
+    def test_token_refreshed_only_near_expiry(self):
+        from unittest import mock
+        self.registry.getService()
+        self.creds.expiry = datetime.utcnow() + timedelta(minutes=1)
+        with mock.patch('builtins.open', mock.mock_open()):
+            self.registry.getService()
+        self.creds.refresh.assert_called_once()
+        self.assertEqual(self.build.call_count, 1)
+
+    def test_one_service_for_all_threads(self):
+        import threading
+        services = []
+        threads = [threading.Thread(target=lambda: services.append(self.registry.getService())) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(map(id, services))), 1)
+        self.assertEqual(self.build.call_count, 1)
+
+
+# local http server that speaks enough of the calendar api (single inserts and
+# multipart batch requests) to run the real google client against it
+class FakeCalendarServer:
+    def __init__(self, fail_summaries=()):
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        fake = self
+        self.round_trips = 0
+        self.created = []
+        self.fail_summaries = set(fail_summaries)
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                fake.round_trips += 1
+                body = self.rfile.read(int(self.headers['Content-Length'])).decode()
+                if self.path.startswith('/batch'):
+                    self.reply_batch(body)
+                else:
+                    code, payload = fake.insert(json.loads(body))
+                    self.reply(code, 'application/json', payload)
+
+            def reply(self, code, content_type, payload):
+                data = payload.encode()
+                self.send_response(code)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def reply_batch(self, body):
+                boundary = self.headers['Content-Type'].split('boundary=')[1].strip('"')
+                parts = []
+                for part in body.split('--' + boundary)[1:-1]:
+                    content_id = re.search(r'Content-ID: <(.*)>', part).group(1)
+                    method, path = re.search(r'(GET|POST) (\S+) HTTP', part).groups()
+                    if method == 'GET':
+                        code, payload = fake.instances(path.split('/events/')[1].split('/instances')[0])
+                    else:
+                        code, payload = fake.insert(json.loads(part[part.index('{'):part.rindex('}') + 1]))
+                    reason = 'OK' if code == 200 else 'Bad Request'
+                    parts.append('Content-Type: application/http\r\nContent-ID: <response-%s>\r\n\r\n'
+                                 'HTTP/1.1 %d %s\r\nContent-Type: application/json\r\n\r\n%s\r\n'
+                                 % (content_id, code, reason, payload))
+                response = ''.join('--fakebatch\r\n' + part for part in parts) + '--fakebatch--\r\n'
+                self.reply(200, 'multipart/mixed; boundary=fakebatch', response)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:%d/' % self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def insert(self, event):
+        if event['summary'] in self.fail_summaries:
+            return 400, json.dumps({'error': {'code': 400, 'message': 'invalid event'}})
+        if any(created['id'] == event.get('id') for created in self.created):
+            return 409, json.dumps({'error': {'code': 409, 'message': 'duplicate'}})
+        event = dict(event, id=event.get('id') or 'ev%d' % (len(self.created) + 1))
+        self.created.append(event)
+        return 200, json.dumps(event)
+
+    # three weekly occurrences of a created recurring event
+    def instances(self, event_id):
+        event = next(e for e in self.created if e['id'] == event_id)
+        start = datetime.fromisoformat(event['start']['dateTime'])
+        end = datetime.fromisoformat(event['end']['dateTime'])
+        items = [{'id': '%s_%d' % (event_id, week), 'summary': event['summary'], 'recurringEventId': event_id,
+                  'start': {'dateTime': (start + timedelta(weeks=week)).isoformat() + '+05:30'},
+                  'end': {'dateTime': (end + timedelta(weeks=week)).isoformat() + '+05:30'}}
+                 for week in range(3)]
+        return 200, json.dumps({'items': items})
+
+    def service(self):
+        from googleapiclient.discovery import build
+        from google.oauth2.credentials import Credentials
+        return build('calendar', 'v3', credentials=Credentials(token='test'),
+                     client_options={'api_endpoint': self.url})
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class CalendarBatchTestCase(TestCase):
+    def setUp(self):
+        from unittest import mock
+        from myapp import views
+        self.views = views
+        self.server = FakeCalendarServer(fail_summaries={'BAD01'})
+        self.addCleanup(self.server.close)
+        patcher = mock.patch.object(views, 'connectToCalender',
+                                    return_value=(self.server.service(), views.getCalenderId('2023', 'cse')))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.settings_override = self.settings(CALENDAR_BATCH_URI=self.server.url + 'batch/calendar/v3')
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def test_week_is_created_in_one_round_trip(self):
+        days = [(day, ['cs101', 'cs102', 'cs103', 'cs104', 'cs201', 'cs202', 'cs203'])
+                for day in ['monday', 'tuesday', 'wednesday', 'thursday', 'friday']]
+        result = self.views.calenderWeekTableAdd('2023', 'cse', days)
+        self.assertEqual(result['created'], 35)
+        self.assertEqual(result['errors'], [])
+        # one batch for the inserts, one for the occurrences of the new events
+        self.assertEqual(self.server.round_trips, 2)
+        self.assertEqual(CalendarEvent.objects.count(), 35 * 3)
+        self.assertTrue(result['results'][7]['recurrence'][0].startswith('RRULE:FREQ=WEEKLY;BYDAY=TU'))
+
+    def test_failed_items_are_reported_per_item(self):
+        result = self.views.calenderMainTableAdd('2023', 'cse', 'monday', 'cs101', 'BAD01', '', None, 'cs201', '', '')
+        self.assertEqual(result['created'], 2)
+        self.assertEqual([error['index'] for error in result['errors']], [1])
+        self.assertEqual(len(self.server.created), 2)
+
+    def test_add_timetable_accepts_a_week(self):
+        week = [{'semester': 3, 'department': 'CSE', 'day': day, 'slot_1': 'cs101', 'slot_2': 'cs102',
+                 'slot_3': '', 'slot_4': '', 'slot_5': '', 'slot_6': '', 'slot_7': ''}
+                for day in ['monday', 'tuesday', 'wednesday', 'thursday', 'friday']]
+        response = APIClient().post(reverse('addTimetable'), week, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(TimeTable.objects.filter(semester=3, department='CSE').count(), 5)
+        self.assertEqual(len(response.data['job_ids']), 1)
+
+        from myapp.calendar_jobs import runNextCalendarJob
+        self.assertEqual(runNextCalendarJob().status, 'done')
+        self.assertEqual(len(self.server.created), 10)
+        self.assertEqual(self.server.round_trips, 2)
+
+    def test_job_with_failed_events_is_retried_without_duplicates(self):
+        from myapp.calendar_jobs import enqueueCalendarJob, runNextCalendarJob
+        job = enqueueCalendarJob('add_timetable', {'joining_yr': '2023', 'department': 'cse',
+                                                   'days': [('monday', ['cs101', 'BAD01', 'cs103', None, None, None, None])]})
+        job = runNextCalendarJob()
+        self.assertEqual(job.status, 'pending')
+        self.assertIn('1 events failed', job.last_error)
+        self.assertEqual(len(self.server.created), 2)
+
+        self.server.fail_summaries.clear()
+        CalendarJob.objects.filter(id=job.id).update(run_after=timezone.now())
+        job = runNextCalendarJob()
+        self.assertEqual(job.status, 'done')
+        self.assertEqual((job.result['created'], job.result['existing']), (1, 2))
+        self.assertEqual(sorted(event['summary'] for event in self.server.created), ['BAD01', 'cs101', 'cs103'])
+
+        # created on google but never stored locally: the retry gets a 409 and keeps the event
+        CalendarEvent.objects.all().delete()
+        result = self.views.calenderWeekTableAdd('2023', 'cse', job.payload['days'], key=f'job{job.id}')
+        self.assertEqual((result['created'], result['errors']), (3, []))
+        self.assertEqual(len(self.server.created), 3)
+
+
+class CalendarJobQueueTestCase(TestCase):
+    def setUp(self):
+        from unittest import mock
+        from myapp import views
+        self.client = APIClient()
+        self.cancel = mock.patch.object(views, 'cancelEvent').start()
+        self.addCleanup(mock.patch.stopall)
+
+    def test_cancel_class_is_queued(self):
+        from myapp.calendar_jobs import runNextCalendarJob
+        response = self.client.post(reverse('cancel_class'), {'cancel_date': '2024-04-15', 'cancel_time_slot': '09:20-10:10',
+                                                              'joining_yr': '2021', 'department': 'cse'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.cancel.assert_not_called()
+
+        job_id = response.data['job_id']
+        status_response = self.client.get(reverse('getCalendarJobStatus'), {'job_id': job_id})
+        self.assertEqual(status_response.data['status'], 'pending')
+
+        runNextCalendarJob()
+        self.cancel.assert_called_once_with('2024-04-15', '09:20-10:10', '2021', 'cse', missing_ok=False)
+        status_response = self.client.get(reverse('getCalendarJobStatus'), {'job_id': job_id})
+        self.assertEqual(status_response.data['status'], 'done')
+        self.assertIsNone(runNextCalendarJob())
+
+    def test_unknown_cohort_is_rejected_before_queueing(self):
+        response = self.client.post(reverse('cancel_class'), {'cancel_date': '2024-04-15', 'cancel_time_slot': '09:20-10:10',
+                                                              'joining_yr': '1999', 'department': 'cse'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(CalendarJob.objects.count(), 0)
+
+    def test_stale_running_job_is_reclaimed(self):
+        from myapp.calendar_jobs import enqueueCalendarJob, reclaimStaleCalendarJobs, runNextCalendarJob
+        job = enqueueCalendarJob('cancel', {'date': '2024-04-15', 'time_slot': '09:20-10:10',
+                                            'joining_yr': '2021', 'department': 'cse'})
+        CalendarJob.objects.filter(id=job.id).update(status='running', attempts=1, started_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(reclaimStaleCalendarJobs(timezone.now()), 0)
+        CalendarJob.objects.filter(id=job.id).update(started_at=timezone.now() - timedelta(hours=1))
+        job = runNextCalendarJob()
+        self.assertEqual((job.status, job.attempts), ('done', 2))
+        self.cancel.assert_called_once_with('2024-04-15', '09:20-10:10', '2021', 'cse', missing_ok=True)
+
+    def test_job_status_needs_a_numeric_id(self):
+        response = self.client.get(reverse('getCalendarJobStatus'), {'job_id': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(reverse('getCalendarJobStatus'), {'job_id': '999'}).status_code, 404)
+
+    def test_failed_job_is_retried_with_backoff(self):
+        from myapp.calendar_jobs import enqueueCalendarJob, runNextCalendarJob, calendarJobMetrics
+        self.cancel.side_effect = Exception('calendar unavailable')
+        job = enqueueCalendarJob('cancel', {'date': '2024-04-15', 'time_slot': '09:20-10:10',
+                                            'joining_yr': '2021', 'department': 'cse'})
+        job.max_attempts = 2
+        job.save()
+
+        job = runNextCalendarJob()
+        self.assertEqual((job.status, job.attempts, job.last_error), ('pending', 1, 'calendar unavailable'))
+        self.assertGreater(job.run_after, timezone.now())
+        # not due yet
+        self.assertIsNone(runNextCalendarJob())
+
+        CalendarJob.objects.filter(id=job.id).update(run_after=timezone.now())
+        job = runNextCalendarJob()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        metrics = calendarJobMetrics()
+        self.assertEqual(metrics['queue_depth']['failed'], 1)
+        self.assertEqual(metrics['failed_last_hour'], 1)
+
+
+class AttendanceShortageTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        CurrentCourses.objects.create(course_code='CS101', total_classes=10, faculty_name='Dr. Smith', semester=3, department='cse')
+        CourseList.objects.create(course_code='CS101', course_name='Programming', semester=3, department='cse')
+        for i, absences in enumerate([0, 2, 3, 5]):
+            roll_no = 'R%d' % i
+            StudentInfo.objects.create(roll_no=roll_no, name='Student %d' % i, department='cse', joining_year='2023',
+                                       blood_group='O+', semester=3, contact_number='1234567890', address='', gender='', email='')
+            for day in range(absences):
+                Absentees.objects.create(course_code='CS101', date=date(2024, 4, day + 1), roll_no=roll_no, time_slot='09:20-10:10')
+        # absences in another course do not count
+        Absentees.objects.create(course_code='CS102', date=date(2024, 4, 1), roll_no='R0', time_slot='09:20-10:10')
+        call_command('rebuild_attendance_summary', stdout=StringIO())
+
+    def test_shortage_list_default_threshold(self):
+        from myapp.views import attendanceShortageList
+        with self.assertNumQueries(3):
+            shortage_list = attendanceShortageList('CS101', 'cse', 0.8)
+        self.assertEqual([row[0] for row in shortage_list], ['R2', 'R3'])
+        self.assertAlmostEqual(shortage_list[0][2], 70.0)
+
+    def test_shortage_list_threshold_parameter(self):
+        response = self.client.get(reverse('getStudentsWithAttendanceShortage'),
+                                   {'course_code': 'CS101', 'department': 'cse', 'threshold': '0.65'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row[0] for row in response.data['shortage_list']], ['R3'])
+
+        response = self.client.get(reverse('getStudentsWithAttendanceShortage'),
+                                   {'course_code': 'CS101', 'department': 'cse', 'threshold': 'high'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_summary_follows_attendance_updates(self):
+        self.client.post(reverse('insertAttendance'), {'course_id': 'CS101', 'department': 'cse', 'date': '2024-04-01',
+                                                       'time_slot': '09:20-10:10', 'absentees_list': ['R0', 'R1'], 'count': 1},
+                         format='json')
+        response = self.client.get(reverse('getAttendanceSummaryForStudent'),
+                                   {'roll_no': 'R1', 'department': 'cse', 'semester': 3})
+        # the 2024-04-01 class is replaced: R1 stays absent, R0 is added, R2 and R3 are removed
+        self.assertEqual(response.data['attendance'], [{'course_code': 'CS101', 'total_classes': 10, 'absent_count': 2}])
+        self.assertEqual(AttendanceSummary.objects.get(roll_no='R0', course_code='CS101').absent_count, 1)
+        self.assertEqual(AttendanceSummary.objects.get(roll_no='R2', course_code='CS101').absent_count, 2)
+        self.assertEqual(AttendanceSummary.objects.get(roll_no='R3', course_code='CS101').absent_count, 4)
+
+    def test_summary_follows_single_absentee_edits(self):
+        response = self.client.post('/api/absentees/', {'course_code': 'CS101', 'date': '2024-05-01', 'roll_no': 'R0',
+                                                        'time_slot': '09:20-10:10'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(AttendanceSummary.objects.get(roll_no='R0', course_code='CS101').absent_count, 1)
+
+        absence = Absentees.objects.get(date=date(2024, 5, 1), roll_no='R0')
+        absence.roll_no = 'R1'
+        absence.save()
+        self.assertEqual(AttendanceSummary.objects.get(roll_no='R0', course_code='CS101').absent_count, 0)
+        self.assertEqual(AttendanceSummary.objects.get(roll_no='R1', course_code='CS101').absent_count, 3)
+
+        self.client.delete(f'/api/absentees/{absence.pk}/')
+        Absentees.objects.filter(roll_no='R3').delete()
+        self.assertEqual(AttendanceSummary.objects.get(roll_no='R1', course_code='CS101').absent_count, 2)
+        self.assertEqual(AttendanceSummary.objects.get(roll_no='R3', course_code='CS101').absent_count, 0)
+
+    def test_summary_never_goes_negative(self):
+        from myapp.attendance_summary import updateAttendanceSummary
+        updateAttendanceSummary('CS101', 'cse', {'R1': -5, 'R9': -1})
+        self.assertEqual(AttendanceSummary.objects.get(roll_no='R1', course_code='CS101').absent_count, 0)
+        self.assertFalse(AttendanceSummary.objects.filter(roll_no='R9').exists())
+
+    def test_benchmark_command_runs(self):
+        out = StringIO()
+        call_command('benchmark_attendance_shortage', students=50, classes=5, stdout=out)
+        self.assertIn('50 students, 5 classes', out.getvalue())
+        self.assertFalse(StudentInfo.objects.filter(department='bench').exists())
+
+
+class CoursesForFacultyTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        for i in range(8):
+            CourseList.objects.create(course_code='CS%03d' % i, course_name='Course %d' % i, semester=3, department='cse')
+            CurrentCourses.objects.create(course_code='CS%03d' % i, total_classes=0, faculty_name='Dr. Smith',
+                                          semester=3, department='cse')
+
+    def test_course_names_in_constant_queries(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('getCoursesForFaculty'), {'faculty_name': 'Dr. Smith'})
+        self.assertEqual(len(response.data['course_list']), 8)
+        self.assertEqual(response.data['course_list'][3], ['CS003', 'Course 3', 'cse'])
+
+    def test_course_is_linked_by_department(self):
+        ece = CourseList.objects.create(course_code='CS001', course_name='Course 1 (ECE)', semester=3, department='ece')
+        current = CurrentCourses.objects.create(course_code='CS001', total_classes=0, faculty_name='Dr. Jones',
+                                                semester=3, department='ECE')
+        self.assertEqual(current.course, ece)
+
+    def test_catalog_changes_relink_current_courses(self):
+        current = CurrentCourses.objects.create(course_code='CS900', total_classes=0, faculty_name='Dr. Smith',
+                                                semester=3, department='cse')
+        self.assertIsNone(current.course)
+        other = CourseList.objects.create(course_code='CS900', course_name='Later (ECE)', semester=3, department='ece')
+        own = CourseList.objects.create(course_code='CS900', course_name='Later', semester=3, department='cse')
+        current.refresh_from_db()
+        self.assertEqual(current.course, own)
+
+        own.delete()
+        current.refresh_from_db()
+        self.assertEqual(current.course, other)
+
+        CurrentCourses.objects.filter(pk=current.pk).update(course_code='CS001')
+        response = self.client.get(reverse('getCoursesForFaculty'), {'faculty_name': 'Dr. Smith'})
+        self.assertIn(['CS001', 'Course 1', 'cse'], response.data['course_list'])
+
+
+class AddNewStudentTestCase(TestCase):
+    def test_existing_login_is_a_validation_error(self):
+        Login.objects.create(email="priya@example.com", type_of_user="faculty")
+        data = {'roll_no': '2023101', 'name': 'Priya Raman', 'department': 'CSE', 'joining_year': '2023', 'blood_group': 'O+',
+                'semester': 3, 'contact_number': '1234567890', 'address': 'Chennai', 'gender': 'F', 'email': 'priya@example.com'}
+        response = APIClient().post(reverse('addNewStudent'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('email', response.data['errors'])
+        self.assertFalse(StudentInfo.objects.filter(roll_no='2023101').exists())
+        response = APIClient().post(reverse('addNewStudent'), dict(data, email='priya.r@example.com'), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(Login.objects.filter(email='priya.r@example.com', type_of_user='student').exists())
+
+
+class FeeDefaultersTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        for i in range(5):
+            roll_no = 'CS%02d' % i
+            StudentInfo.objects.create(roll_no=roll_no, name='Student %d' % i, department='cse', joining_year='2022',
+                                       blood_group='O+', semester=5, contact_number='123456789%d' % i, address='',
+                                       gender='', email='%s@example.com' % roll_no)
+            FeeDefaulters.objects.create(department='cse', batch='2022-2026', roll_no=roll_no)
+        FeeDefaulters.objects.create(department='ece', batch='2021-2025', roll_no='EC01')
+
+    def test_defaulters_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('getFeeDefaulters'), {'department': 'cse', 'batch': '2022-2026'})
+        self.assertEqual(len(response.data['student_list']), 5)
+        self.assertEqual(response.data['student_list'][0],
+                         {'roll_no': 'CS00', 'name': 'Student 0', 'email': 'CS00@example.com', 'contact_number': '1234567890'})
+        self.assertIsNone(response.data['next_after'])
+
+    def test_keyset_pagination(self):
+        url = reverse('getFeeDefaulters')
+        response = self.client.get(url, {'department': 'cse', 'batch': '2022-2026', 'limit': 2})
+        self.assertEqual([s['roll_no'] for s in response.data['student_list']], ['CS00', 'CS01'])
+        response = self.client.get(url, {'department': 'cse', 'batch': '2022-2026', 'limit': 2,
+                                         'after': response.data['next_after']})
+        self.assertEqual([s['roll_no'] for s in response.data['student_list']], ['CS02', 'CS03'])
+        response = self.client.get(url, {'department': 'cse', 'batch': '2022-2026', 'limit': 2,
+                                         'after': response.data['next_after']})
+        self.assertEqual([s['roll_no'] for s in response.data['student_list']], ['CS04'])
+        self.assertIsNone(response.data['next_after'])
+
+    def test_limit_must_be_positive(self):
+        for limit in ['-5', '0', 'ten']:
+            response = self.client.get(reverse('getFeeDefaulters'), {'department': 'cse', 'batch': '2022-2026', 'limit': limit})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_report_is_streamed_from_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('getFeeDefaultersReport'))
+            content = b''.join(response.streaming_content).decode()
+        lines = content.strip().splitlines()
+        self.assertEqual(lines[0], 'department,batch,roll_no,name,email,contact_number')
+        self.assertEqual(len(lines), 7)
+        # a defaulter without a StudentInfo row is still listed
+        self.assertEqual(lines[-1], 'ece,2021-2025,EC01,,,')
+
+class SearchIndexTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('search')
+        StudentInfo.objects.create(name="Priya Raman", roll_no="2022101", department="CSE", semester=3, joining_year=2022, email="priya@example.com")
+        StudentInfo.objects.create(name="Arun Kumar", roll_no="2022102", department="CSE", semester=3, joining_year=2022, email="raman.fan@example.com")
+        FacultyInfo.objects.create(name="Dr. Meera Raman", faculty_id="F101", position="Professor", description="", designation="HOD", email="meera@example.com")
+        AdministrationInfo.objects.create(name="Ramesh Babu", position="Clerk", staff_id="A101", email="ramesh@example.com")
+
+    def names(self, response):
+        return [person['name'] for person in response.data['search_list']]
+
+    def test_name_matches_rank_before_email_matches(self):
+        response = self.client.get(self.url, {'searchText': 'raman'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['search_list']), 3)
+        self.assertEqual(self.names(response)[-1], "Arun Kumar")
+
+    def test_id_and_prefix_match(self):
+        response = self.client.get(self.url, {'searchText': '20221'})
+        self.assertEqual(sorted(self.names(response)), ["Arun Kumar", "Priya Raman"])
+
+    def test_typo_falls_back_to_fuzzy_match(self):
+        response = self.client.get(self.url, {'searchText': 'Priya Ramen'})
+        self.assertEqual(self.names(response), ["Priya Raman"])
+
+    def test_limit_and_offset(self):
+        first = self.names(self.client.get(self.url, {'searchText': 'raman', 'limit': 2}))
+        rest = self.names(self.client.get(self.url, {'searchText': 'raman', 'limit': 2, 'offset': 2}))
+        self.assertEqual(len(first), 2)
+        self.assertEqual(rest, ["Arun Kumar"])
+        response = self.client.get(self.url, {'searchText': 'raman', 'limit': 'x'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_index_follows_updates_and_deletes(self):
+        student = StudentInfo.objects.get(roll_no="2022101")
+        student.name = "Priya Sundar"
+        student.save()
+        self.assertEqual(self.names(self.client.get(self.url, {'searchText': 'Sundar'})), ["Priya Sundar"])
+        self.assertNotIn("Priya Sundar", self.names(self.client.get(self.url, {'searchText': 'raman'})))
+        FacultyInfo.objects.filter(faculty_id="F101").delete()
+        self.assertEqual(self.names(self.client.get(self.url, {'searchText': 'Meera'})), [])
+
+class AutocompleteTestCase(TestCase):
+    def setUp(self):
+        from myapp.directory_prefix import directory_prefixes
+        useEmptySharedCache(self)
+        self.prefixes = directory_prefixes
+        self.prefixes.reset()
+        self.client = APIClient()
+        self.url = reverse('autocomplete')
+        StudentInfo.objects.create(name="Priya Raman", roll_no="2022101", department="CSE", semester=3, joining_year=2022, email="priya@example.com")
+        StudentInfo.objects.create(name="Pranav Iyer", roll_no="2022102", department="CSE", semester=3, joining_year=2022, email="pranav@example.com")
+        FacultyInfo.objects.create(name="Dr. Meera Raman", faculty_id="F101", position="Professor", description="", designation="HOD", email="meera@example.com")
+
+    def tearDown(self):
+        self.prefixes.reset()
+
+    def names(self, response):
+        return [person['name'] for person in response.data['suggestions']]
+
+    def test_short_prefixes_without_queries(self):
+        self.client.get(self.url, {'searchText': 'x'})
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {'searchText': 'Pr'})
+        self.assertEqual(self.names(response), ["Pranav Iyer", "Priya Raman"])
+        self.assertEqual(response.data['suggestions'][0],
+                         {'kind': 'student', 'name': "Pranav Iyer", 'roll_no': "2022102", 'email': "pranav@example.com"})
+        # name words, ids and email local parts are all prefixes
+        self.assertEqual(self.names(self.client.get(self.url, {'searchText': 'ram'})), ["Dr. Meera Raman", "Priya Raman"])
+        self.assertEqual(self.names(self.client.get(self.url, {'searchText': 'f1'})), ["Dr. Meera Raman"])
+        self.assertEqual(self.names(self.client.get(self.url, {'searchText': 'Pr', 'limit': 1})), ["Pranav Iyer"])
+        self.assertEqual(self.client.get(self.url, {'searchText': ''}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_prefixes_follow_committed_saves_and_deletes(self):
+        self.client.get(self.url, {'searchText': 'x'})
+        with self.captureOnCommitCallbacks(execute=True):
+            student = StudentInfo.objects.get(roll_no="2022101")
+            student.name = "Kavya Raman"
+            student.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            FacultyInfo.objects.filter(faculty_id="F101").delete()
+        self.assertEqual(self.names(self.client.get(self.url, {'searchText': 'kav'})), ["Kavya Raman"])
+        self.assertEqual(self.names(self.client.get(self.url, {'searchText': 'ra'})), ["Kavya Raman"])
+        self.assertEqual(self.names(self.client.get(self.url, {'searchText': 'meera'})), [])
+
+    def test_other_processes_rebuild_after_a_change(self):
+        from myapp.directory_prefix import DirectoryPrefixIndex
+        other = DirectoryPrefixIndex()
+        self.assertEqual([person['name'] for person in other.complete('kav')], [])
+        self.client.get(self.url, {'searchText': 'x'})
+        with self.captureOnCommitCallbacks(execute=True):
+            StudentInfo.objects.create(name="Kavya Nair", roll_no="2022103", department="CSE", semester=3,
+                                       joining_year=2022, email="kavya@example.com")
+        # this process applied the change itself, the other one reloads
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names(self.client.get(self.url, {'searchText': 'kav'})), ["Kavya Nair"])
+        self.assertEqual([person['name'] for person in other.complete('kav')], ["Kavya Nair"])
+
+class SessionBootstrapTestCase(TestCase):
+    def setUp(self):
+        useEmptySharedCache(self)
+        self.client = APIClient()
+        self.url = reverse('getSessionBootstrap')
+        Login.objects.create(email="priya@example.com", type_of_user="student")
+        Login.objects.create(email="meera@example.com", type_of_user="faculty")
+        StudentInfo.objects.create(name="Priya Raman", roll_no="2022101", department="CSE", semester=3, joining_year=2022,
+                                   email="priya@example.com", gender="F", blood_group="O+", contact_number="1234567890", address="")
+        FacultyInfo.objects.create(name="Meera Raman", faculty_id="F101", position="Professor", description="", designation="HOD", email="meera@example.com")
+        CourseList.objects.create(course_code="CS301", course_name="Operating Systems", semester=3, department="CSE")
+        CurrentCourses.objects.create(course_code="CS301", total_classes=0, faculty_name="Meera Raman", semester=3, department="CSE")
+        TimeTable.objects.create(semester=3, department="cse", day="Tuesday", slot_1="CS301")
+        TimeTable.objects.create(semester=3, department="cse", day="Monday", slot_2="CS301")
+        Todolist.objects.create(id="t1", roll_no="2022101", task="Lab record")
+
+    def test_student_bootstrap_in_fixed_queries_then_cached(self):
+        with self.assertNumQueries(5):
+            response = self.client.get(self.url, {'username': 'priya@example.com'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['type_of_user'], 'student')
+        self.assertEqual(response.data['profile']['roll_no'], '2022101')
+        self.assertEqual(response.data['courses'], [['CS301', 'Operating Systems', 'CSE']])
+        self.assertEqual([row['day'] for row in response.data['timetable']], ['monday', 'tuesday'])
+        self.assertEqual(response.data['todos'], [{'roll_no': '2022101', 'task': 'Lab record', 'id': 't1', 'is_completed': False}])
+        with self.assertNumQueries(0):
+            self.client.get(self.url, {'username': 'priya@example.com'})
+
+    def test_faculty_bootstrap(self):
+        response = self.client.get(self.url, {'username': 'meera@example.com'})
+        self.assertEqual(response.data['profile']['faculty_id'], 'F101')
+        self.assertEqual(response.data['courses'], [['CS301', 'Operating Systems', 'CSE']])
+        self.assertEqual(self.client.get(self.url, {'username': 'nobody@example.com'}).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_writes_drop_the_cached_bootstrap(self):
+        self.client.get(self.url, {'username': 'priya@example.com'})
+        with self.captureOnCommitCallbacks(execute=True):
+            Todolist.objects.create(id="t2", roll_no="2022101", task="Assignment")
+        response = self.client.get(self.url, {'username': 'priya@example.com'})
+        self.assertEqual(len(response.data['todos']), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            TimeTable.objects.create(semester=3, department="cse", day="Wednesday", slot_3="CS301")
+        response = self.client.get(self.url, {'username': 'priya@example.com'})
+        self.assertEqual(len(response.data['timetable']), 3)
+
+    def test_bootstraps_shared_between_workers(self):
+        from django.core.cache import caches
+        self.client.get(self.url, {'username': 'priya@example.com'})
+        # another worker has its own 'default' cache, it reads the same bootstrap
+        caches['default'].clear()
+        with self.assertNumQueries(0):
+            self.client.get(self.url, {'username': 'priya@example.com'})
+
+class ProfileCacheTestCase(TestCase):
+    def setUp(self):
+        from myapp.profile_cache import profile_cache
+        self.cache = profile_cache
+        self.cache.reset()
+        self.client = APIClient()
+        Login.objects.create(email="priya@example.com", type_of_user="student")
+        Login.objects.create(email="ramesh@example.com", type_of_user="admin")
+        StudentInfo.objects.create(name="Priya Raman", roll_no="2022101", department="CSE", semester=3, joining_year=2022,
+                                   email="priya@example.com", gender="F", blood_group="O+", contact_number="1234567890", address="")
+        AdministrationInfo.objects.create(name="Ramesh Babu", position="Clerk", staff_id="A101", email="ramesh@example.com")
+
+    def tearDown(self):
+        self.cache.reset()
+
+    def test_second_lookup_skips_the_database(self):
+        url = reverse('getUserDetails')
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'username': 'priya@example.com'})
+        self.assertEqual(response.data['roll_no'], '2022101')
+        self.assertEqual(response.data['department'], 'cse')
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('getUserAllDetails'), {'username': 'priya@example.com'})
+        self.assertEqual(response.data['blood_group'], 'O+')
+        response = self.client.get(reverse('getUserDetails'), {'username': 'ramesh@example.com'})
+        self.assertEqual(response.data['staff_id'], 'A101')
+        self.assertEqual(self.client.get(url, {'username': 'nobody@example.com'}).status_code, status.HTTP_404_NOT_FOUND)
+        stats = self.client.get(reverse('getProfileCacheStats')).data
+        self.assertEqual((stats['hits'], stats['misses'], stats['size']), (1, 3, 2))
+
+    def test_saves_and_email_changes_invalidate(self):
+        url = reverse('getUserDetails')
+        self.client.get(url, {'username': 'priya@example.com'})
+        with self.captureOnCommitCallbacks(execute=True):
+            student = StudentInfo.objects.get(roll_no="2022101")
+            student.semester = 4
+            student.save()
+        self.assertEqual(self.client.get(url, {'username': 'priya@example.com'}).data['semester'], 4)
+        with self.captureOnCommitCallbacks(execute=True):
+            student.email = "priya.r@example.com"
+            student.save()
+        self.assertEqual(self.client.get(url, {'username': 'priya@example.com'}).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_lru_and_ttl(self):
+        from myapp.profile_cache import LocalProfileStore
+        store = LocalProfileStore(2, ttl=60)
+        store.set('a', 1)
+        store.set('b', 2)
+        store.get('a')
+        store.set('c', 3)
+        self.assertEqual((store.get('a'), store.get('b'), store.get('c')), (1, None, 3))
+        self.assertEqual(store.evictions, 1)
+        store.ttl = -1
+        store.set('d', 4)
+        self.assertIsNone(store.get('d'))
+
+class ExplainHotQueriesTestCase(TestCase):
+    def test_hot_lookups_use_indexes(self):
+        out = StringIO()
+        call_command('explain_hot_queries', stdout=out)
+        report = out.getvalue()
+        self.assertIn('SEARCH myapp_login USING INDEX', report)
+        self.assertIn('SEARCH myapp_result USING INDEX', report)
+        self.assertNotIn('scans myapp_studentinfo', report)
+        self.assertNotIn('scans myapp_currentcourses', report)
+
+class BulkResultUploadTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.records = [{'course_code': 'CS101', 'faculty': 'Dr. Smith', 'ct_1': 15, 'ct_2': 16, 'assignments': 8,
+                         'end_sem': 40, 'grade': 'A', 'roll_no': 'R%03d' % i} for i in range(600)]
+
+    def test_large_upload_in_a_few_queries(self):
+        # savepoint, delete, five inserts of up to 124 rows (sqlite's parameter limit), release
+        with self.assertNumQueries(8):
+            response = self.client.post('/api/addResult/', self.records, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 600)
+        self.assertEqual(Result.objects.filter(course_code='CS101').count(), 600)
+
+    def test_replacing_a_large_upload(self):
+        self.client.post('/api/addResult/', self.records, format='json')
+        # savepoint, read the stored rows and delete them 100 at a time, five inserts, release
+        with self.assertNumQueries(14):
+            response = self.client.post('/api/addResult/', [dict(record, ct_1=5) for record in self.records], format='json')
+        self.assertEqual(response.data['created'], 600)
+        self.assertEqual(Result.objects.filter(course_code='CS101', ct_1=5).count(), 600)
+
+    def test_invalid_records_leave_stored_results_untouched(self):
+        self.client.post('/api/addResult/', self.records[:10], format='json')
+        records = [dict(record, ct_1=5) for record in self.records[:10]]
+        records[3]['ct_1'] = 25
+        records[7]['grade'] = 'Z'
+        records[8]['roll_no'] = records[2]['roll_no']
+        response = self.client.post('/api/addResult/', records, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([error['record'] for error in response.data['errors']], [3, 7, 8])
+        self.assertIn('ct_1', response.data['errors'][0]['errors'])
+        self.assertEqual(Result.objects.filter(course_code='CS101', ct_1=15).count(), 10)
+
+    def test_csv_and_ndjson_bodies(self):
+        body = 'course_code,faculty,internal_marks,end_lab,grade,roll_no\r\n' + \
+            ''.join('CS102,Dr. Jones,30,35,B,R%03d\r\n' % i for i in range(20))
+        response = self.client.post('/api/addResultLab/', body, content_type='text/csv')
+        self.assertEqual(response.data['created'], 20)
+        self.assertEqual(LabResult.objects.get(roll_no='R005').end_lab, 35)
+        body = '\n'.join(json.dumps(record) for record in self.records[:5])
+        response = self.client.post('/api/addResult/', body, content_type='application/x-ndjson')
+        self.assertEqual(response.data['created'], 5)
+        response = self.client.post('/api/addResult/', '{"course_code": ', content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_upsert_touches_only_changed_rows(self):
+        self.client.post('/api/addResult/', self.records[:100], format='json')
+        records = [dict(record) for record in self.records[:102]]
+        records[4]['ct_2'] = 19
+        records[9]['ct_2'] = 18
+        records[20].update(end_sem=48, grade='S')
+        # savepoint, select, insert, two updates (one per set of changed fields), release
+        with self.assertNumQueries(6):
+            response = self.client.post('/api/addResult/?mode=upsert', records[2:], format='json')
+        self.assertEqual(response.data, {'inserted': 2, 'updated': 3, 'unchanged': 95})
+        self.assertEqual(Result.objects.filter(course_code='CS101').count(), 102)
+        self.assertEqual(Result.objects.get(roll_no='R020').grade, 'S')
+        self.assertEqual(Result.objects.get(roll_no='R004').ct_2, 19)
+        response = self.client.post('/api/addResult/?mode=merge', records, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class TranscriptTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('getTranscriptForStudent')
+        StudentInfo.objects.create(name="Priya Raman", roll_no="2022101", department="cse", semester=3, joining_year=2022)
+        CourseList.objects.create(course_code="CS101", course_name="Programming", semester=1, department="CSE", course_type="Theory")
+        CourseList.objects.create(course_code="CS301", course_name="Operating Systems", semester=3, department="CSE", course_type="Theory")
+        CourseList.objects.create(course_code="CS391", course_name="OS Lab", semester=3, department="CSE", course_type="Lab")
+        CourseList.objects.create(course_code="CS301", course_name="Other department", semester=5, department="ECE")
+        Result.objects.create(course_code="CS101", faculty="Dr. Smith", ct_1=18, ct_2=17, assignments=9, end_sem=45, grade="A", roll_no="2022101")
+        Result.objects.create(course_code="CS301", faculty="Dr. Meera", ct_1=15, ct_2=16, assignments=8, end_sem=40, grade="B", roll_no="2022101")
+        Result.objects.create(course_code="CS301", faculty="Dr. Meera", ct_1=10, ct_2=10, assignments=5, end_sem=30, grade="C", roll_no="2022102")
+        LabResult.objects.create(course_code="CS391", faculty="Dr. Meera", internal_marks=40, end_lab=45, grade="S", roll_no="2022101")
+
+    def test_transcript_in_one_query_per_table(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, {'roll_no': '2022101'})
+        self.assertEqual([(row['course_code'], row['course_name'], row['semester']) for row in response.data['theory']],
+                         [('CS101', 'Programming', 1), ('CS301', 'Operating Systems', 3)])
+        self.assertEqual(response.data['lab'][0]['course_name'], 'OS Lab')
+        self.assertEqual(response.data['lab'][0]['end_lab'], 45)
+
+    def test_semester_filter_and_etag(self):
+        response = self.client.get(self.url, {'roll_no': '2022101', 'semester': 3})
+        self.assertEqual([row['course_code'] for row in response.data['theory']], ['CS301'])
+        etag = response['ETag']
+        response = self.client.get(self.url, {'roll_no': '2022101', 'semester': 3}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        Result.objects.filter(roll_no='2022101', course_code='CS301').update(grade='A')
+        response = self.client.get(self.url, {'roll_no': '2022101', 'semester': 3}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get(self.url, {'roll_no': 'nobody'}).status_code, status.HTTP_404_NOT_FOUND)
+
+class CourseStatisticsTestCase(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        useEmptySharedCache(self)
+        self.client = APIClient()
+        self.url = reverse('getCourseStatistics')
+        marks = [(18, 17, 9, 45, 'A'), (10, 12, 6, 30, 'C'), (15, 14, 8, 38, 'B'), (5, 8, 4, 20, 'F'), (20, 19, 10, 50, 'S')]
+        self.records = [{'course_code': 'CS301', 'faculty': 'Dr. Meera', 'ct_1': ct_1, 'ct_2': ct_2, 'assignments': assignments,
+                         'end_sem': end_sem, 'grade': grade, 'roll_no': 'R%d' % i}
+                        for i, (ct_1, ct_2, assignments, end_sem, grade) in enumerate(marks)]
+        self.client.post('/api/addResult/', self.records, format='json')
+        CourseList.objects.create(course_code="CS301", course_name="Operating Systems", semester=3, department="cse")
+
+    def test_statistics_of_a_course(self):
+        response = self.client.get(self.url, {'course_code': 'CS301'})
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(response.data['grades'], {'A': 1, 'B': 1, 'C': 1, 'F': 1, 'S': 1})
+        end_sem = response.data['columns']['end_sem']
+        self.assertEqual((end_sem['mean'], end_sem['median'], end_sem['min'], end_sem['max']), (36.6, 38.0, 20.0, 50.0))
+        self.assertEqual(end_sem['percentiles']['25'], 30.0)
+        self.assertEqual(response.data['columns']['total']['max'], 99.0)
+        self.assertGreater(response.data['correlations']['ct_1/end_sem'], 0.95)
+        response = self.client.get(self.url, {'department': 'CSE', 'semester': 3})
+        self.assertEqual(response.data['course_codes'], ['CS301'])
+
+    def test_python_fallback_matches_numpy(self):
+        from myapp.course_stats import computeCourseStats, numpy
+        python = computeCourseStats('theory', ['CS301'], use_numpy=False)
+        self.assertEqual(python['backend'], 'python')
+        if numpy is not None:
+            vectorized = computeCourseStats('theory', ['CS301'], use_numpy=True)
+            self.assertEqual(python['columns'], vectorized['columns'])
+            self.assertEqual(python['correlations'], vectorized['correlations'])
+
+    def test_cached_until_next_upload(self):
+        self.client.get(self.url, {'course_code': 'CS301'})
+        with self.assertNumQueries(0):
+            self.client.get(self.url, {'course_code': 'CS301'})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/addResult/?mode=upsert', [dict(self.records[3], end_sem=25, grade='E')], format='json')
+        response = self.client.get(self.url, {'course_code': 'CS301'})
+        self.assertEqual(response.data['columns']['end_sem']['min'], 25.0)
+        self.assertEqual(response.data['grades']['E'], 1)
+
+    def test_deleted_results_drop_the_statistics(self):
+        self.client.get(self.url, {'course_code': 'CS301'})
+        with self.captureOnCommitCallbacks(execute=True):
+            Result.objects.filter(course_code='CS301', grade__in=['F', 'S']).delete()
+        response = self.client.get(self.url, {'course_code': 'CS301'})
+        self.assertEqual(response.data['count'], 3)
+
+    def test_upload_in_another_worker_drops_the_statistics(self):
+        from django.core.cache import caches
+        from myapp.course_stats import statsVersionKey
+        self.client.get(self.url, {'course_code': 'CS301'})
+        # another worker stored an upload: it dropped the shared version, this worker's payload is kept
+        Result.objects.filter(roll_no='R3').update(end_sem=25, grade='E')
+        caches['shared'].delete(statsVersionKey('theory', 'CS301'))
+        response = self.client.get(self.url, {'course_code': 'CS301'})
+        self.assertEqual(response.data['columns']['end_sem']['min'], 25.0)
+
+class SemesterRolloverTestCase(TestCase):
+    def setUp(self):
+        for i, (joining_year, semester) in enumerate([('2021', 5), ('2021', 7), ('2022', 5), ('2024', 1), ('2019', 8)]):
+            StudentInfo.objects.create(roll_no='R%d' % i, name='Student %d' % i, department='cse', joining_year=joining_year,
+                                       semester=semester, email='r%d@example.com' % i)
+
+    def semesters(self):
+        return dict(StudentInfo.objects.values_list('roll_no', 'semester'))
+
+    def test_rollover_matches_the_old_formula(self):
+        from myapp.semester_rollover import rolloverSemesters
+        today = date(2024, 9, 1)
+        with self.assertNumQueries(5):
+            result = rolloverSemesters(today=today)
+        self.assertEqual(result['updated'], 2)
+        self.assertEqual(self.semesters(), {'R0': 7, 'R1': 7, 'R2': 5, 'R3': 1, 'R4': 0})
+        self.assertEqual(result['joining_years']['2021'], {'semester': 7, 'students': 2, 'changing': 1})
+        # nothing left to change: only the grouped count runs
+        with self.assertNumQueries(1):
+            self.assertEqual(rolloverSemesters(today=today)['updated'], 0)
+
+    def test_dry_run_and_command(self):
+        response = self.client.post('/api/updateSemester/?dry_run=1')
+        self.assertTrue(response.data['dry_run'])
+        self.assertEqual(StudentInfo.objects.get(roll_no='R3').semester, 1)
+        out = StringIO()
+        call_command('rollover_semesters', '--date', '2025-01-10', stdout=out)
+        self.assertIn('2022: semester 6, 1 students, 1 changing', out.getvalue())
+        self.assertEqual(self.semesters(), {'R0': 8, 'R1': 8, 'R2': 6, 'R3': 2, 'R4': 0})
+
+class FacultyTimetableTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('facultyTimetable')
+        CurrentCourses.objects.create(course_code="CS301", total_classes=0, faculty_name="Meera Raman", semester=3, department="cse")
+        CurrentCourses.objects.create(course_code="CS305", total_classes=0, faculty_name="Meera Raman", semester=3, department="cse")
+        self.monday = TimeTable.objects.create(semester=3, department="cse", day="monday", slot_1="CS301", slot_4="CS999")
+        TimeTable.objects.create(semester=3, department="cse", day="tuesday", slot_2="CS305", slot_3="CS301")
+
+    def test_week_from_slot_index_written_once(self):
+        self.assertEqual(TimeTableSlot.objects.filter(course_code='CS301').count(), 2)
+        response = self.client.get(self.url, {'faculty_name': 'Meera Raman'})
+        rows = response.data['faculty_timetable_data']
+        self.assertEqual([row['day'] for row in rows], ['monday', 'tuesday'])
+        self.assertEqual((rows[0]['slot_1'], rows[0]['slot_4']), ('CS301', ''))
+        self.assertEqual((rows[1]['slot_2'], rows[1]['slot_3']), ('CS305', 'CS301'))
+        self.assertEqual(FacultyTimeTable.objects.filter(name='Meera Raman').count(), 2)
+        # unchanged inputs: slot lookup and stored rows, no writes
+        with self.assertNumQueries(2):
+            self.client.get(self.url, {'faculty_name': 'Meera Raman'})
+
+    def test_changed_timetable_rewrites_only_the_changed_day(self):
+        self.client.get(self.url, {'faculty_name': 'Meera Raman'})
+        self.monday.slot_1 = None
+        self.monday.slot_2 = "CS305"
+        self.monday.save()
+        self.client.get(self.url, {'faculty_name': 'Meera Raman'})
+        monday = FacultyTimeTable.objects.get(name='Meera Raman', day='monday')
+        self.assertEqual((monday.slot_1, monday.slot_2), ('', 'CS305'))
+        self.monday.delete()
+        response = self.client.get(self.url, {'faculty_name': 'Meera Raman'})
+        self.assertEqual([row['day'] for row in response.data['faculty_timetable_data']], ['tuesday'])
+        self.assertEqual(FacultyTimeTable.objects.filter(name='Meera Raman').count(), 1)
+
+class WeekGridTestCase(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        useEmptySharedCache(self)
+        self.client = APIClient()
+        TimeTable.objects.create(semester=3, department="cse", day="Tuesday", slot_2="CS305", slot_3="CS301")
+        TimeTable.objects.create(semester=3, department="cse", day="monday", slot_1="CS301")
+        TimeTable.objects.create(semester=3, department="cse", day="wednesday")
+        TimeTable.objects.create(semester=5, department="cse", day="monday", slot_1="CS501")
+
+    def test_grid_lookup_and_clashes(self):
+        from .timetables import WeekGrid, cohortGrids
+        with self.assertNumQueries(1):
+            grids = cohortGrids(department='cse')
+        third, fifth = grids[(3, 'cse')], grids[(5, 'cse')]
+        self.assertEqual(third.get('tuesday', 3), 'CS301')
+        self.assertIsNone(third.get('Monday', 2))
+        self.assertIs(third.get('monday', 1), third.get('tuesday', 3))
+        self.assertEqual(len(third), 3)
+        self.assertTrue(third.hasDay('wednesday'))
+        self.assertEqual(third.clashes(fifth), [('monday', 1, 'CS301', 'CS501')])
+        self.assertEqual(WeekGrid().clashes(third), [])
+        with self.assertRaises(IndexError):
+            third.get('monday', 8)
+        with self.assertRaises(AttributeError):
+            third.extra = 1
+
+    def test_student_timetable_rows(self):
+        response = self.client.get(reverse('getTimetableForStudent'), {'semester': 3, 'department': 'CSE'})
+        rows = json.loads(response.content)['timetable_data']
+        self.assertEqual([row['day'] for row in rows], ['monday', 'tuesday', 'wednesday'])
+        self.assertEqual(rows[1], {'day': 'tuesday', 'slot_1': None, 'slot_2': 'CS305', 'slot_3': 'CS301', 'slot_4': None,
+                                   'slot_5': None, 'slot_6': None, 'slot_7': None})
+        self.assertEqual(set(rows[2].values()), {'wednesday', None})
+
+    def test_days_normalized_and_unique(self):
+        from django.db import IntegrityError
+        self.assertEqual(TimeTable.objects.filter(day='tuesday').count(), 1)
+        response = self.client.post(reverse('addTimetable'), {'semester': 3, 'department': 'CSE', 'day': 'Someday'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        with self.assertRaises(IntegrityError):
+            TimeTable.objects.create(semester=3, department="cse", day="MONDAY")
+
+class TimetableClashTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        CurrentCourses.objects.create(course_code="CS301", total_classes=0, faculty_name="Meera Raman", semester=3, department="cse")
+        CurrentCourses.objects.create(course_code="CS501", total_classes=0, faculty_name="Meera Raman", semester=5, department="cse")
+        CurrentCourses.objects.create(course_code="CS303", total_classes=0, faculty_name="Arun Nair", semester=3, department="cse")
+        TimeTable.objects.create(semester=3, department="cse", day="monday", slot_1="CS301", slot_2="CS303")
+
+    def test_occupancy_bits(self):
+        from .timetable_clashes import OccupancyMaps
+        with self.assertNumQueries(2):
+            maps = OccupancyMaps.load()
+        self.assertEqual(maps.courses[(3, 'cse', 'CS301')], 1)
+        self.assertEqual(maps.faculty['Arun Nair'], 2)
+        maps.bookDay(5, 'CSE', 'tuesday', ['CS501'])
+        self.assertEqual(maps.faculty['Meera Raman'], 1 | 1 << 7)
+        self.assertEqual(maps.clashes(3, 'cse', 'monday', [None, None, 'CS301']), [])
+
+    def test_add_rejects_faculty_and_course_clashes(self):
+        response = self.client.post(reverse('addTimetable'), {'semester': 5, 'department': 'CSE', 'day': 'monday', 'slot_1': 'CS501'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([(clash['slot'], clash['faculty_name']) for clash in response.data['clashes']], [(1, 'Meera Raman')])
+        self.assertFalse(TimeTable.objects.filter(semester=5).exists())
+        week = [{'semester': 5, 'department': 'CSE', 'day': 'tuesday', 'slot_1': 'CS501'},
+                {'semester': 5, 'department': 'CSE', 'day': 'wednesday', 'slot_2': 'CS501'}]
+        response = self.client.post(reverse('addTimetable'), week, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_week_stored_by_another_request_meanwhile(self):
+        from unittest import mock
+        from . import views
+
+        # another request stores the wednesday after the existence checks passed
+        def storeWednesday(entries):
+            TimeTable.objects.create(semester=5, department="CSE", day="wednesday")
+            return []
+        week = [{'semester': 5, 'department': 'CSE', 'day': 'tuesday', 'slot_1': 'CS501'},
+                {'semester': 5, 'department': 'CSE', 'day': 'wednesday', 'slot_2': 'CS501'}]
+        with mock.patch.object(views, 'timetableClashes', side_effect=storeWednesday):
+            response = self.client.post(reverse('addTimetable'), week, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(TimeTable.objects.filter(semester=5, day='tuesday').exists())
+        self.assertFalse(CalendarJob.objects.exists())
+
+    def test_bulk_check_of_a_department(self):
+        url = reverse('checkTimetableClashes')
+        proposal = [{'semester': 3, 'department': 'cse', 'day': 'monday', 'slot_1': 'CS303', 'slot_2': 'CS301'},
+                    {'semester': 5, 'department': 'cse', 'day': 'monday', 'slot_2': 'CS501', 'slot_3': 'CS303'}]
+        with self.assertNumQueries(2):
+            response = self.client.post(url, proposal, format='json')
+        self.assertFalse(response.data['valid'])
+        self.assertEqual([(clash['semester'], clash['slot'], clash['reason']) for clash in response.data['clashes']],
+                         [(5, 2, 'Faculty already teaches another course in this slot.')])
+        proposal[1]['slot_3'] = 'CS303'
+        response = self.client.post(url, proposal[1:] + [proposal[1]], format='json')
+        self.assertEqual([(clash['semester'], clash['course_code'], clash['reason']) for clash in response.data['clashes']],
+                         [(5, 'CS501', 'Course already has a class in this slot.'), (5, 'CS303', 'Course already has a class in this slot.')])
+        self.assertTrue(self.client.post(url, proposal[:1], format='json').data['valid'])
+
+    def test_course_code_of_another_semester(self):
+        # CS301 also runs in semester 7, taught by someone else: its monday slot 1 is free
+        CurrentCourses.objects.create(course_code="CS301", total_classes=0, faculty_name="Kavya Iyer", semester=7, department="cse")
+        response = self.client.post(reverse('checkTimetableClashes'),
+                                    [{'semester': 7, 'department': 'cse', 'day': 'monday', 'slot_1': 'CS301'}], format='json')
+        self.assertTrue(response.data['valid'])
+
+class TimetableGeneratorTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('generateTimetable')
+        CourseList.objects.create(course_code="CS301", course_name="Operating Systems", semester=3, department="cse", course_type="Theory")
+        CourseList.objects.create(course_code="CS302", course_name="Networks Lab", semester=3, department="cse", course_type="Lab")
+        for course_code, faculty_name, semester in [("CS301", "Meera Raman", 3), ("CS302", "Arun Nair", 3), ("CS303", "Meera Raman", 3),
+                                                    ("CS501", "Meera Raman", 5), ("CS502", "Arun Nair", 5)]:
+            CurrentCourses.objects.create(course_code=course_code, total_classes=0, faculty_name=faculty_name, semester=semester, department="cse")
+        # the ece class of Meera Raman on monday slot 1 stays where it is
+        CurrentCourses.objects.create(course_code="EC301", total_classes=0, faculty_name="Meera Raman", semester=3, department="ece")
+        TimeTable.objects.create(semester=3, department="ece", day="monday", slot_1="EC301")
+
+    def test_solver_places_every_class_without_clashes(self):
+        from .timetable_clashes import timetableClashes
+        from .timetable_solver import TimetableSolver, timetableProblem
+        with self.assertNumQueries(3):
+            problem = timetableProblem('CSE', blocked=[['friday', 7]])
+        solver = TimetableSolver(problem)
+        self.assertTrue(solver.solve())
+        grids = solver.grids()
+        self.assertEqual(sorted(grids), [(3, 'cse'), (5, 'cse')])
+        third = grids[(3, 'cse')]
+        self.assertEqual(len(third), 4 + 2 + 4)
+        lab = [(day, slot_no) for day in ['monday', 'tuesday', 'wednesday', 'thursday', 'friday'] for slot_no in range(1, 8)
+               if third.get(day, slot_no) == 'CS302']
+        self.assertEqual(lab[1], (lab[0][0], lab[0][1] + 1))
+        self.assertIsNone(third.get('friday', 7))
+        entries = [dict({'semester': semester, 'department': department}, **row)
+                   for (semester, department), grid in grids.items() for row in grid.rows()]
+        self.assertEqual(timetableClashes(entries), [])
+
+    def test_streamed_progress_and_save(self):
+        response = self.client.post(self.url, {'department': 'cse', 'save': True}, format='json')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        events = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(events[-1]['event'], 'solved')
+        self.assertTrue(all(event['event'] == 'progress' for event in events[:-1]))
+        self.assertEqual([(cohort['semester'], len(cohort['days'])) for cohort in events[-1]['timetable']], [(3, 5), (5, 5)])
+        self.assertEqual(TimeTable.objects.filter(department='cse').count(), 10)
+        self.assertEqual(len(events[-1]['job_ids']), 2)
+        response = self.client.post(self.url, {'department': 'cse', 'save': True}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_impossible_load_fails(self):
+        response = self.client.post(self.url, {'department': 'cse', 'loads': {'CS301': 40}}, format='json')
+        event = json.loads(b''.join(response.streaming_content).splitlines()[-1])
+        self.assertEqual(event['event'], 'failed')
+        self.assertIn('cohort 3 cse', event['reason'])
+        response = self.client.post(self.url, {'department': 'cse', 'blocked': [['sunday', 1]]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.post(self.url, {'department': 'mech'}, format='json').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_loads_must_be_positive_whole_numbers(self):
+        for loads in [{'CS301': '4'}, {'CS301': 2.5}, {'CS301': 0}, {'CS301': True}, ['CS301']]:
+            response = self.client.post(self.url, {'department': 'cse', 'loads': loads}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_save_sees_timetables_added_in_upper_case(self):
+        self.client.post(reverse('addTimetable'), {'semester': 5, 'department': 'CSE', 'day': 'friday'}, format='json')
+        response = self.client.post(self.url, {'department': 'cse', 'save': True}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(TimeTable.objects.filter(semester=5).count(), 1)
+
+    def test_cohort_stored_while_solving(self):
+        response = self.client.post(self.url, {'department': 'cse', 'save': True}, format='json')
+        # the solver runs while the body streams: addTimetable fills semester 5 before it is saved
+        TimeTable.objects.create(semester=5, department='CSE', day='friday')
+        events = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(events[-1]['event'], 'failed')
+        self.assertEqual(TimeTable.objects.filter(department__iexact='cse').count(), 1)
+        self.assertFalse(CalendarJob.objects.exists())
+
+
+class TimetableCacheTestCase(TestCase):
+    def setUp(self):
+        useEmptySharedCache(self)
+        self.client = APIClient()
+        self.url = reverse('getTimetableForStudent')
+        self.monday = TimeTable.objects.create(semester=3, department="cse", day="monday", slot_1="CS301")
+
+    def get(self, **headers):
+        return self.client.get(self.url, {'semester': '3', 'department': 'CSE'}, **headers)
+
+    def test_cached_payload_and_revalidation(self):
+        response = self.get()
+        self.assertEqual(json.loads(response.content)['timetable_data'][0]['slot_1'], 'CS301')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get().content, response.content)
+            self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            self.assertEqual(self.get(HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        self.assertEqual(self.client.get(self.url, {'semester': 'x', 'department': 'cse'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_timetable_change_drops_the_payload(self):
+        etag = self.get()['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.monday.slot_1 = "CS305"
+            self.monday.save()
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['timetable_data'][0]['slot_1'], 'CS305')
+        # moving the row to semester 5 changes both cohorts
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.monday.semester = 5
+            self.monday.save()
+        self.assertEqual(json.loads(self.get().content)['timetable_data'], [])
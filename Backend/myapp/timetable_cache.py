@@ -0,0 +1,62 @@
+import hashlib
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.http import quote_etag
+
+from .timetables import cohortWeek
+
+
+def cohortKey(semester, department):
+    return f'{semester}:{department.lower()}'
+
+
+# the getTimetableForStudent body of each (semester, department), encoded once. the shared cache
+# holds a version per cohort (the time it was last changed, also the Last-Modified) and the payload
+# of that version; each process keeps the payloads it served for as long as their version is current
+class TimetablePayloads:
+    def __init__(self):
+        self._local = {}
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[getattr(settings, 'TIMETABLE_CACHE_BACKEND', 'default')]
+
+    # expires with the payloads, so a backend that missed an invalidation serves them for a day at most
+    def version(self, semester, department):
+        return self.shared.get_or_set('timetable:version:' + cohortKey(semester, department), time.time_ns,
+                                      getattr(settings, 'TIMETABLE_CACHE_TIMEOUT', None))
+
+    def build(self, semester, department, version):
+        body = json.dumps({'timetable_data': cohortWeek(semester, department.lower()).rows()}).encode()
+        return {'body': body, 'etag': quote_etag(hashlib.md5(body).hexdigest()), 'last_modified': version // 10 ** 9}
+
+    # payload dict with body (bytes), etag and last_modified (epoch seconds)
+    def get(self, semester, department):
+        key = cohortKey(semester, department)
+        version = self.version(semester, department)
+        with self._lock:
+            local = self._local.get(key)
+        if local is not None and local[0] == version:
+            return local[1]
+        payload_key = f'timetable:{key}:{version}'
+        payload = self.shared.get(payload_key)
+        if payload is None:
+            payload = self.build(semester, department, version)
+            self.shared.set(payload_key, payload, getattr(settings, 'TIMETABLE_CACHE_TIMEOUT', None))
+        with self._lock:
+            self._local[key] = (version, payload)
+        return payload
+
+    def invalidate(self, semester, department):
+        key = cohortKey(semester, department)
+        self.shared.delete('timetable:version:' + key)
+        with self._lock:
+            self._local.pop(key, None)
+
+
+timetable_payloads = TimetablePayloads()
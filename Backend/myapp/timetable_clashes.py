@@ -0,0 +1,72 @@
+from .models import CurrentCourses, TimeTableSlot
+from .timetables import DAY_INDEX, WeekGrid
+
+
+# the week of every course and faculty as a 35 bit int, bit WeekGrid.cell(day, slot_no) set when
+# it has a class then. a course is keyed by (semester, department, course_code) since a course code
+# can run in several semesters of a department, its faculty comes from CurrentCourses
+class OccupancyMaps:
+    def __init__(self, teachers):
+        self.teachers = teachers
+        self.courses = {}
+        self.faculty = {}
+
+    # every stored class except those of the (semester, department, day) triples in skip,
+    # two queries
+    @classmethod
+    def load(cls, skip=()):
+        teachers = {(semester, department.lower(), course_code): faculty_name
+                    for semester, department, course_code, faculty_name
+                    in CurrentCourses.objects.values_list('semester', 'department', 'course_code', 'faculty_name')}
+        maps = cls(teachers)
+        for semester, department, day, slot_no, course_code in TimeTableSlot.objects.values_list(
+                'timetable__semester', 'timetable__department', 'day', 'slot_no', 'course_code'):
+            department = department.lower()
+            if day in DAY_INDEX and (semester, department, day) not in skip:
+                maps.book(semester, department, course_code, 1 << WeekGrid.cell(day, slot_no))
+        return maps
+
+    def book(self, semester, department, course_code, bits):
+        course = (semester, department, course_code)
+        self.courses[course] = self.courses.get(course, 0) | bits
+        faculty_name = self.teachers.get(course)
+        if faculty_name:
+            self.faculty[faculty_name] = self.faculty.get(faculty_name, 0) | bits
+
+    # the clashes of one proposed day of a cohort: the course already has a class in the slot,
+    # or its faculty teaches another course then
+    def clashes(self, semester, department, day, slots):
+        course = (semester, department.lower())
+        found = []
+        for slot_no, course_code in enumerate(slots, 1):
+            if not course_code:
+                continue
+            bit = 1 << WeekGrid.cell(day, slot_no)
+            course_bits = self.courses.get(course + (course_code,), 0)
+            faculty_name = self.teachers.get(course + (course_code,))
+            if course_bits & bit:
+                found.append({'day': day, 'slot': slot_no, 'course_code': course_code, 'faculty_name': faculty_name,
+                              'reason': 'Course already has a class in this slot.'})
+            if faculty_name and self.faculty.get(faculty_name, 0) & ~course_bits & bit:
+                found.append({'day': day, 'slot': slot_no, 'course_code': course_code, 'faculty_name': faculty_name,
+                              'reason': 'Faculty already teaches another course in this slot.'})
+        return found
+
+    def bookDay(self, semester, department, day, slots):
+        for slot_no, course_code in enumerate(slots, 1):
+            if course_code:
+                self.book(semester, department.lower(), course_code, 1 << WeekGrid.cell(day, slot_no))
+
+
+# checks the entries ({'semester', 'department', 'day', slot_1 ..}) in order against the stored
+# timetable and the entries before them. with replace, stored days the entries redefine are ignored
+def timetableClashes(entries, replace=False):
+    skip = {(entry['semester'], entry['department'].lower(), entry['day']) for entry in entries} if replace else ()
+    maps = OccupancyMaps.load(skip)
+    found = []
+    for entry in entries:
+        slots = [entry.get(f'slot_{slot_no}') for slot_no in range(1, 8)]
+        for clash in maps.clashes(entry['semester'], entry['department'], entry['day'], slots):
+            found.append(dict(clash, semester=entry['semester'], department=entry['department']))
+        maps.bookDay(entry['semester'], entry['department'], entry['day'], slots)
+    return found
@@ -0,0 +1,281 @@
+import random
+import time
+
+from django.conf import settings
+
+from .models import CurrentCourses
+from .timetable_clashes import OccupancyMaps
+from .timetables import DAY_INDEX, SLOTS, WEEKDAYS, WeekGrid
+
+FULL_WEEK = (1 << (len(WEEKDAYS) * len(SLOTS))) - 1
+DAY_BITS = [((1 << len(SLOTS)) - 1) << (day * len(SLOTS)) for day in range(len(WEEKDAYS))]
+# a lab takes two slots in a row between the breaks: 09:20-11:00, 11:20-13:00, 14:00-15:40
+LAB_BLOCKS = ((1, 2), (3, 4), (5, 6))
+LAB_MASKS = [1 << WeekGrid.cell(day, first) | 1 << WeekGrid.cell(day, second)
+             for day in WEEKDAYS for first, second in LAB_BLOCKS]
+
+
+def slotBits(slots):
+    bits = 0
+    for day, slot_no in slots:
+        bits |= 1 << WeekGrid.cell(day, int(slot_no))
+    return bits
+
+
+def dayOf(mask):
+    return (mask.bit_length() - 1) // len(SLOTS)
+
+
+class SolverCourse:
+    __slots__ = ('course_code', 'cohort', 'faculty_name', 'lab', 'sessions', 'remaining', 'placed', 'days')
+
+    def __init__(self, course_code, cohort, faculty_name, lab, sessions):
+        self.course_code = course_code
+        self.cohort = cohort
+        self.faculty_name = faculty_name
+        self.lab = lab
+        self.sessions = sessions
+        self.remaining = sessions
+        self.placed = []
+        self.days = 0
+
+    # at most one class a day, unless the course has more classes than days
+    @property
+    def spread(self):
+        return self.sessions <= len(WEEKDAYS)
+
+
+# what the solver places: the sessions of every course of the cohorts, and the slots that are
+# already taken (blocked for a cohort, or a faculty that is unavailable or teaching elsewhere)
+class TimetableProblem:
+    def __init__(self):
+        self.cohorts = []
+        self.courses = []
+        self.blocked = {}
+        self.busy = {}
+
+    def addCohort(self, cohort, blocked=0):
+        if cohort not in self.blocked:
+            self.cohorts.append(cohort)
+            self.blocked[cohort] = 0
+        self.blocked[cohort] |= blocked
+
+    def addCourse(self, cohort, course_code, faculty_name, lab=False, sessions=None):
+        self.addCohort(cohort)
+        if sessions is None:
+            sessions = settings.TIMETABLE_WEEKLY_LOAD['lab' if lab else 'theory']
+        self.courses.append(SolverCourse(course_code, cohort, faculty_name, lab, sessions))
+
+    def addBusy(self, faculty_name, bits):
+        self.busy[faculty_name] = self.busy.get(faculty_name, 0) | bits
+
+    def width(self, course):
+        return 2 if course.lab else 1
+
+    # why the problem cannot be solved before searching: a cohort or faculty with more classes than free slots
+    def overloaded(self):
+        cohort_load = {}
+        faculty_load = {}
+        for course in self.courses:
+            load = course.sessions * self.width(course)
+            cohort_load[course.cohort] = cohort_load.get(course.cohort, 0) + load
+            faculty_load[course.faculty_name] = faculty_load.get(course.faculty_name, 0) + load
+        for cohort, load in cohort_load.items():
+            if load > (FULL_WEEK & ~self.blocked[cohort]).bit_count():
+                return f'cohort {cohort[0]} {cohort[1]} has {load} classes a week'
+        for faculty_name, load in faculty_load.items():
+            if load > (FULL_WEEK & ~self.busy.get(faculty_name, 0)).bit_count():
+                return f'{faculty_name} has {load} classes a week'
+        for course in self.courses:
+            if course.lab and course.sessions > len(WEEKDAYS):
+                return f'{course.course_code} has more lab sessions than days'
+        return None
+
+
+# the courses of a department (optionally only some semesters) from CurrentCourses, with the classes
+# of other departments' stored timetables as busy slots of their faculty. three queries
+def timetableProblem(department, semesters=None, loads=None, unavailable=None, blocked=None):
+    department = department.lower()
+    courses = CurrentCourses.objects.filter(department__iexact=department).select_related('course').order_by('semester', 'course_code')
+    if semesters:
+        courses = courses.filter(semester__in=semesters)
+    courses = list(courses)
+    cohorts = sorted({course.semester for course in courses})
+    problem = TimetableProblem()
+    blocked_bits = slotBits(blocked or [])
+    for semester in cohorts:
+        problem.addCohort((semester, department), blocked_bits)
+
+    maps = OccupancyMaps.load({(semester, department, day) for semester in cohorts for day in WEEKDAYS})
+    for faculty_name, bits in maps.faculty.items():
+        problem.addBusy(faculty_name, bits)
+    for faculty_name, slots in (unavailable or {}).items():
+        problem.addBusy(faculty_name, slotBits(slots))
+
+    for course in courses:
+        lab = course.course is not None and (course.course.course_type or '').lower() == 'lab'
+        problem.addCourse((course.semester, department), course.course_code, course.faculty_name, lab,
+                          (loads or {}).get(course.course_code))
+    return problem
+
+
+# backtracking over the courses: the course with the fewest free slots goes next, its candidates
+# are tried emptiest day first. a search that backtracks too often starts over with other tie-breaks
+class TimetableSolver:
+    def __init__(self, problem, seed=0, restart_after=None, max_restarts=None, time_limit=None):
+        self.problem = problem
+        self.seed = seed
+        self.restart_after = restart_after or settings.TIMETABLE_SOLVER_RESTART_AFTER
+        self.max_restarts = max_restarts if max_restarts is not None else settings.TIMETABLE_SOLVER_MAX_RESTARTS
+        self.time_limit = time_limit or settings.TIMETABLE_SOLVER_TIME_LIMIT
+        self.sessions = sum(course.sessions for course in problem.courses)
+        self.backtracks = 0
+        self.restarts = 0
+
+    def reset(self):
+        self.cohort_bits = dict(self.problem.blocked)
+        self.faculty_bits = dict(self.problem.busy)
+        for course in self.problem.courses:
+            course.remaining = course.sessions
+            course.placed = []
+            course.days = 0
+        self.open = [course for course in self.problem.courses if course.remaining]
+
+    def free(self, course):
+        taken = self.cohort_bits[course.cohort] | self.faculty_bits.get(course.faculty_name, 0)
+        if course.spread:
+            taken |= course.days
+        return FULL_WEEK & ~taken
+
+    def candidates(self, course, free):
+        if course.lab:
+            return [mask for mask in LAB_MASKS if free & mask == mask]
+        found = []
+        while free:
+            bit = free & -free
+            found.append(bit)
+            free ^= bit
+        return found
+
+    # the open course with the fewest candidates and its candidates in the order to try them
+    def pick(self, rng):
+        best, best_key, best_free = None, None, 0
+        for course in self.open:
+            free = self.free(course)
+            count = len(self.candidates(course, free)) if course.lab else free.bit_count()
+            # ties: the course with more classes left, then the one of the busier faculty
+            key = (count, -course.remaining, (FULL_WEEK & ~self.faculty_bits.get(course.faculty_name, 0)).bit_count())
+            if best is None or key < best_key:
+                best, best_key, best_free = course, key, free
+                if count == 0:
+                    break
+        if best is None:
+            return None, []
+        cohort_bits = self.cohort_bits[best.cohort]
+        faculty_bits = self.faculty_bits.get(best.faculty_name, 0)
+        candidates = self.candidates(best, best_free)
+        candidates.sort(key=lambda mask: ((cohort_bits & DAY_BITS[dayOf(mask)]).bit_count(),
+                                          (faculty_bits & DAY_BITS[dayOf(mask)]).bit_count(), rng.random()))
+        return best, candidates
+
+    def place(self, course, mask):
+        self.cohort_bits[course.cohort] |= mask
+        self.faculty_bits[course.faculty_name] = self.faculty_bits.get(course.faculty_name, 0) | mask
+        course.placed.append(mask)
+        course.days |= DAY_BITS[dayOf(mask)]
+        course.remaining -= 1
+        if not course.remaining:
+            self.open.remove(course)
+
+    def unplace(self, course, mask):
+        self.cohort_bits[course.cohort] ^= mask
+        self.faculty_bits[course.faculty_name] ^= mask
+        course.placed.pop()
+        if course.spread:
+            course.days ^= DAY_BITS[dayOf(mask)]
+        if not course.remaining:
+            self.open.append(course)
+        course.remaining += 1
+
+    def timedOut(self, started):
+        return time.perf_counter() - started > self.time_limit
+
+    def progress(self, placed, started):
+        return {'event': 'progress', 'placed': placed, 'sessions': self.sessions, 'backtracks': self.backtracks,
+                'restarts': self.restarts, 'elapsed_ms': round((time.perf_counter() - started) * 1000)}
+
+    # yields progress events; returns True when solved, False when there is no solution
+    # and None when the backtrack budget of this attempt or the time limit ran out
+    def search(self, rng, started):
+        budget = self.backtracks + self.restart_after * (self.restarts + 1)
+        report_every = max(1, self.sessions // 10)
+        stack = []
+        placed = 0
+        while True:
+            course, candidates = self.pick(rng)
+            if course is None:
+                return True
+            if candidates:
+                stack.append([course, candidates, 0])
+                self.place(course, candidates[0])
+                placed += 1
+                if placed % report_every == 0:
+                    yield self.progress(placed, started)
+                continue
+            while stack:
+                frame = stack[-1]
+                self.unplace(frame[0], frame[1][frame[2]])
+                placed -= 1
+                self.backtracks += 1
+                frame[2] += 1
+                if frame[2] < len(frame[1]):
+                    self.place(frame[0], frame[1][frame[2]])
+                    placed += 1
+                    break
+                stack.pop()
+            else:
+                return False
+            if self.backtracks >= budget or (self.backtracks % 256 == 0 and self.timedOut(started)):
+                return None
+
+    # generator of progress events ending with a 'solved' or 'failed' event
+    def run(self):
+        started = time.perf_counter()
+        reason = self.problem.overloaded()
+        if reason is None:
+            while True:
+                self.reset()
+                solved = yield from self.search(random.Random(self.seed + self.restarts), started)
+                if solved:
+                    yield dict(self.progress(self.sessions, started), event='solved')
+                    return
+                if solved is False:
+                    reason = 'no conflict-free timetable exists for these courses and constraints'
+                    break
+                if self.restarts >= self.max_restarts or self.timedOut(started):
+                    reason = f'no timetable found in {self.restarts + 1} attempts'
+                    break
+                self.restarts += 1
+                yield dict(self.progress(0, started), event='restart')
+        yield dict(self.progress(0, started), event='failed', reason=reason)
+
+    def solve(self):
+        for event in self.run():
+            pass
+        return event['event'] == 'solved'
+
+    # cohort -> WeekGrid of the solution, every weekday listed
+    def grids(self):
+        grids = {}
+        for cohort in self.problem.cohorts:
+            grids[cohort] = WeekGrid()
+            for day in DAY_INDEX:
+                grids[cohort].addDay(day)
+        for course in self.problem.courses:
+            for mask in course.placed:
+                while mask:
+                    bit = mask & -mask
+                    index = bit.bit_length() - 1
+                    grids[course.cohort].set(WEEKDAYS[index // len(SLOTS)], index % len(SLOTS) + 1, course.course_code)
+                    mask ^= bit
+        return grids
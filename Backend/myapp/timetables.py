@@ -0,0 +1,117 @@
+import sys
+
+from django.db import transaction
+
+from .models import CurrentCourses, FacultyTimeTable, TimeTable, TimeTableSlot
+
+DAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+SLOTS = ['slot_1', 'slot_2', 'slot_3', 'slot_4', 'slot_5', 'slot_6', 'slot_7']
+WEEKDAYS = DAYS[:5]
+DAY_INDEX = {day: index for index, day in enumerate(WEEKDAYS)}
+
+
+def weekRows(rows):
+    rows = [dict(row) for row in rows]
+    return sorted(rows, key=lambda row: DAYS.index(row['day'].lower()) if row['day'].lower() in DAYS else len(DAYS))
+
+
+# one week (5 weekdays x 7 slots) as a flat list of interned course codes, None for a free slot.
+# days is a bitmask of the days that have a row, so a day with every slot free still shows up
+class WeekGrid:
+    __slots__ = ('cells', 'days')
+
+    def __init__(self):
+        self.cells = [None] * (len(WEEKDAYS) * len(SLOTS))
+        self.days = 0
+
+    @staticmethod
+    def cell(day, slot_no):
+        if not 1 <= slot_no <= len(SLOTS):
+            raise IndexError(f'no slot {slot_no}')
+        return DAY_INDEX[day.lower()] * len(SLOTS) + slot_no - 1
+
+    def hasDay(self, day):
+        return bool(self.days >> DAY_INDEX[day.lower()] & 1)
+
+    def addDay(self, day):
+        self.days |= 1 << DAY_INDEX[day.lower()]
+
+    def get(self, day, slot_no):
+        return self.cells[self.cell(day, slot_no)]
+
+    def set(self, day, slot_no, course_code):
+        self.addDay(day)
+        self.cells[self.cell(day, slot_no)] = sys.intern(course_code) if course_code else None
+
+    def __len__(self):
+        return sum(1 for course_code in self.cells if course_code)
+
+    # (day, slot_no, own course, other course) of every slot filled in both weeks
+    def clashes(self, other):
+        return [(WEEKDAYS[index // len(SLOTS)], index % len(SLOTS) + 1, mine, theirs)
+                for index, (mine, theirs) in enumerate(zip(self.cells, other.cells)) if mine and theirs]
+
+    # the API format: one {'day', slot_1 .. slot_7} row per day, monday first
+    def rows(self, free=None):
+        return [dict({'day': day}, **{slot: self.cells[index * len(SLOTS) + offset] or free for offset, slot in enumerate(SLOTS)})
+                for index, day in enumerate(WEEKDAYS) if self.days >> index & 1]
+
+    # from (day, slot_no, course_code) rows; a None slot_no marks a day without classes.
+    # days outside the week have no cells and are skipped
+    @classmethod
+    def fromSlots(cls, slots):
+        grid = cls()
+        for day, slot_no, course_code in slots:
+            if day.lower() not in DAY_INDEX:
+                continue
+            if slot_no is None:
+                grid.addDay(day)
+            else:
+                grid.set(day, slot_no, course_code)
+        return grid
+
+
+# (semester, department) -> WeekGrid of every cohort matching filters, one query over the slot rows
+def cohortGrids(**filters):
+    cohorts = {}
+    for semester, department, day, slot_no, course_code in TimeTable.objects.filter(**filters) \
+            .values_list('semester', 'department', 'day', 'slots__slot_no', 'slots__course_code'):
+        cohorts.setdefault((semester, department), []).append((day, slot_no, course_code))
+    return {cohort: WeekGrid.fromSlots(slots) for cohort, slots in cohorts.items()}
+
+
+def cohortWeek(semester, department):
+    return WeekGrid.fromSlots(TimeTable.objects.filter(semester=semester, department=department)
+                              .values_list('day', 'slots__slot_no', 'slots__course_code'))
+
+
+# every class of the faculty's courses, one query through the course_code index of TimeTableSlot
+def facultyWeek(faculty_name):
+    courses = CurrentCourses.objects.filter(faculty_name=faculty_name).values('course_code')
+    return WeekGrid.fromSlots(TimeTableSlot.objects.filter(course_code__in=courses)
+                              .values_list('day', 'slot_no', 'course_code'))
+
+
+# makes the stored FacultyTimeTable rows of the faculty match the grid, writing only the days that differ
+def syncFacultyTimeTable(faculty_name, grid):
+    from .session_bootstrap import invalidateAllBootstraps
+
+    week = {row.pop('day'): row for row in grid.rows(free='')}
+    stored = {row.day: row for row in FacultyTimeTable.objects.filter(name=faculty_name)}
+    new_rows = [FacultyTimeTable(name=faculty_name, day=day, **slots) for day, slots in week.items() if day not in stored]
+    changed = []
+    for day, slots in week.items():
+        row = stored.get(day)
+        if row is not None and any((getattr(row, slot) or '') != value for slot, value in slots.items()):
+            for slot, value in slots.items():
+                setattr(row, slot, value)
+            changed.append(row)
+    gone = [row.id for day, row in stored.items() if day not in week]
+    if new_rows or changed or gone:
+        with transaction.atomic():
+            FacultyTimeTable.objects.bulk_create(new_rows)
+            FacultyTimeTable.objects.bulk_update(changed, SLOTS)
+            FacultyTimeTable.objects.filter(id__in=gone).delete()
+            # the bulk writes skip the signals that drop cached bootstraps
+            transaction.on_commit(invalidateAllBootstraps)
+    return len(new_rows) + len(changed) + len(gone)
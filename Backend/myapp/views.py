@@ -5,7 +5,12 @@ from .models import *
 # from django.contrib.auth.models import User
 from django.contrib.auth import authenticate, login, logout
 # Create your views here.
+import csv
+import hashlib
+import io
+import json
 import os.path
+import threading
 from datetime import datetime, timedelta
 from django.shortcuts import render
 
@@ -20,9 +25,33 @@ from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from googleapiclient.http import BatchHttpRequest, HttpRequest
+from google_auth_httplib2 import AuthorizedHttp
+import httplib2
 
 # Validation
 from django.core.exceptions import ValidationError
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.db import IntegrityError, transaction
+from django.db.models import ExpressionWrapper, F, FloatField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_etags, quote_etag
+from .attendance_summary import summaryKeptByCaller, updateAttendanceSummary
+from .calendar_jobs import enqueueCalendarJob, calendarJobMetrics
+from .course_stats import cachedCourseStats
+from .directory_prefix import directory_prefixes
+from .profile_cache import profile_cache
+from .result_upload import readResultRecords, replaceResults, upsertResults, validateResultRecords
+from .search_index import KINDS as SEARCH_KINDS, searchDirectory, searchIndexAvailable
+from .semester_rollover import rolloverSemesters
+from .session_bootstrap import cachedSessionBootstrap
+from .timetable_cache import timetable_payloads
+from .timetables import SLOTS, facultyWeek, syncFacultyTimeTable
+from .timetable_clashes import timetableClashes
+from .timetable_solver import TimetableSolver, timetableProblem
 
 
 # authenticates us to connect with google calendar api 
@@ -58,48 +87,159 @@ def calenderAccessAuth():
         # print(2)
     return creds
 
-#connects to calendar
-def connectToCalender(joining_yr, department):
-    creds = calenderAccessAuth()
+# calendar id of the cohort (joining year + department)
+def getCalenderId(joining_yr, department):
     yrs=['2021','2022','2023','2024']
     calenders=['20d93d2fe1b0ecd1544f1a2b2b108da8e96af9ff12241d7492c3d65b24238790@group.calendar.google.com','42d1535640fbdeb2c505ba9b52315343dc907a3b2f91d4b9645b9b3805804828@group.calendar.google.com','aa4783b76409e5b9f2557220593a81e47854cb1f8692abe0a10754a7fde96202@group.calendar.google.com','a925c86f766b09ffa88d867653cafe9d55aaece2843c7f23657823807b2de584@group.calendar.google.com','41071f57b3a292eaa22f30e3f138487c6629af8d4504e280ea66ae2e4b99e65b@group.calendar.google.com','b4f926456995f1ce8e90e4038597f600fec71ca73c0745a0e56098dfacddc4c4@group.calendar.google.com','343a067515a7b486410df769c83cc58ec72b3b27bfeb68399c197b9ff448c09b@group.calendar.google.com','cefe6f3824e000eed77be01be2f930e92038c80b0a0e62bd56063e976aa85721@group.calendar.google.com']
     dept_mapping={'cse': 0,'ece':4}
     idx=dept_mapping[department.lower()]+yrs.index(joining_yr)
-    # print(idx)
-    calender_id=calenders[idx]
+    return calenders[idx]
+
+# keeps the credentials and the calendar client for the whole process instead of
+# reading token.json and rebuilding the client on every connectToCalender call.
+# the credentials are refreshed only when they are about to expire. httplib2 connections are not
+# thread safe, so the one client gives every request it builds a connection of its own
+class CalendarServiceRegistry:
+    def __init__(self, refresh_margin=timedelta(minutes=5)):
+        self.refresh_margin = refresh_margin
+        self._lock = threading.Lock()
+        self._creds = None
+        self._service = None
+
+    def needsRefresh(self, creds):
+        if creds.expiry is None:
+            return not creds.valid
+        return creds.expiry - self.refresh_margin <= datetime.utcnow()
+
+    def getCredentials(self):
+        with self._lock:
+            if self._creds is None:
+                self._creds = calenderAccessAuth()
+            elif self.needsRefresh(self._creds) and self._creds.refresh_token:
+                self._creds.refresh(Request())
+                with open("token.json", "w") as token:
+                    token.write(self._creds.to_json())
+            return self._creds
+
+    def buildRequest(self, http, *args, **kwargs):
+        return HttpRequest(AuthorizedHttp(self._creds, http=httplib2.Http()), *args, **kwargs)
+
+    def getService(self):
+        creds = self.getCredentials()
+        with self._lock:
+            if self._service is None:
+                self._service = build("calendar", "v3", credentials=creds, requestBuilder=self.buildRequest)
+            return self._service
+
+    def reset(self):
+        with self._lock:
+            self._creds = None
+            self._service = None
+
+
+calendar_services = CalendarServiceRegistry()
+
+#connects to calendar
+def connectToCalender(joining_yr, department):
+    calender_id = getCalenderId(joining_yr, department)
 #     calender_id = '5cc47411b973f0be87683f090d88df0dbd791532b2990b02c89153f1e9b5e2bc@group.calendar.google.com'
-    service = build("calendar", "v3", credentials=creds)
+    service = calendar_services.getService()
     return service, calender_id
 
 
-# when time table is being added first time in database calendar event gets created  
+def httpStatus(error):
+    return getattr(getattr(error, 'resp', None), 'status', None)
+
+# id of an event a calendar job creates. google takes 5-1024 characters of base32hex (0-9, a-v)
+# as event id, which md5 hex digits are. a retried job creates the same ids, so what an earlier
+# attempt created is found in CalendarEvent, or refused by google with 409
+def calendarEventId(key, *parts):
+    return hashlib.md5(json.dumps([key] + list(parts)).encode()).hexdigest()
+
+# ids of the events of the calendar in the local copy, occurrences of a recurring event are stored as <id>_<start>
+def storedCalendarEventIds(calender_id):
+    return {event_id.split('_')[0] for event_id in
+            CalendarEvent.objects.filter(calendar_id=calender_id).values_list('event_id', flat=True)}
+
+def insertCalendarEvent(service, calender_id, body):
+    try:
+        return service.events().insert(calendarId=calender_id, body=body).execute()
+    except HttpError as error:
+        if httpStatus(error) != 409 or 'id' not in body:
+            raise
+        return service.events().get(calendarId=calender_id, eventId=body['id']).execute()
+
+def deleteCalendarEvent(service, calender_id, event_id):
+    try:
+        service.events().delete(calendarId=calender_id, eventId=event_id).execute()
+    except HttpError as error:
+        # already deleted, e.g. by an earlier attempt of the same job
+        if httpStatus(error) not in (404, 410):
+            raise
+    forgetCalendarEvent(calender_id, event_id)
+
+
+# sends the requests as google batch requests, CALENDAR_BATCH_SIZE of them per round trip,
+# and collects every response; a failing item is reported in errors and does not stop the rest
+def executeCalendarBatch(service, requests):
+    results = [None] * len(requests)
+    errors = []
+
+    def collect(request_id, response, exception):
+        if exception is not None:
+            errors.append({'index': int(request_id), 'error': str(exception), 'status': httpStatus(exception)})
+        else:
+            results[int(request_id)] = response
+
+    batch_size = getattr(settings, 'CALENDAR_BATCH_SIZE', 50)
+    batch_uri = getattr(settings, 'CALENDAR_BATCH_URI', None)
+    for start in range(0, len(requests), batch_size):
+        if batch_uri:
+            batch = BatchHttpRequest(callback=collect, batch_uri=batch_uri)
+        else:
+            batch = service.new_batch_http_request(callback=collect)
+        for i in range(start, min(start + batch_size, len(requests))):
+            batch.add(requests[i], request_id=str(i))
+        batch.execute()
+    errors.sort(key=lambda error: error['index'])
+    return {'results': results, 'errors': errors}
+
+
+# when time table is being added first time in database calendar event gets created
 def calenderMainTableAdd(joining_yr,department, day, s1, s2, s3, s4, s5, s6, s7):
     # inputs from frontend``
     # summary_list = ['ES101', None, None, None, None, None, None]
     # day = 'tuesday'
-    summary_list = [s1, s2, s3, s4, s5, s6, s7]
+    try:
+        return calenderWeekTableAdd(joining_yr, department, [(day, [s1, s2, s3, s4, s5, s6, s7])])
+    except HttpError as error:
+        print(f"An error occurred: {error}")
+        return {'results': [], 'errors': [{'index': None, 'error': str(error)}], 'created': 0}
 
+# creates the recurring events of several days of a cohort in as few batch requests as possible,
+# days is a list of (day, [slot_1 .. slot_7]). raises HttpError if the batch itself fails.
+# with a key (calendar jobs) the events get ids from calendarEventId and the ones already created are skipped
+def calenderWeekTableAdd(joining_yr, department, days, key=None):
     slot_to_time = [['09:20', '10:10'], ['10:10', '11:00'], ['11:20', '12:10'], [
         '12:10', '13:00'], ['14:00', '14:50'], ['14:50', '15:40'], ['16:00', '16:50']]
     # byday_list=['MO','TU','WE','TH','FR']
     byday_dict = {'monday': 'MO', 'tuesday': 'TU',
                   'wednesday': 'WE', 'thursday': 'TH', 'friday': 'FR'}
-    today = start_day = datetime.now().date()
-    while start_day.strftime('%A').lower() != day:
-        start_day += timedelta(days=1)
+    today = datetime.now().date()
     end_date = today + timedelta(days=130)
 
-    try:
-        service, calender_id = connectToCalender(joining_yr=joining_yr, department=department)
+    events = []
+    for day, summary_list in days:
+        day = day.lower()
+        start_day = today
+        while start_day.strftime('%A').lower() != day:
+            start_day += timedelta(days=1)
         for i in range(7):
-            if len(summary_list[i]) != 0:
-                timezone_offset = timedelta(hours=-7)
+            if summary_list[i]:
                 start_datetime = str(datetime.combine(start_day, datetime.strptime(
                     slot_to_time[i][0], '%H:%M').time()).isoformat())
                 end_datetime = str(datetime.combine(start_day, datetime.strptime(
                     slot_to_time[i][1], '%H:%M').time()).isoformat())
-                # print(start_datetime)
-                # print(end_datetime)
                 recurrence_rule = f'RRULE:FREQ=WEEKLY;BYDAY={byday_dict[day]};UNTIL={end_date.strftime("%Y%m%d")}'
                 event = {
                     'summary': summary_list[i],
@@ -107,10 +247,37 @@ def calenderMainTableAdd(joining_yr,department, day, s1, s2, s3, s4, s5, s6, s7)
                     'end': {'dateTime': end_datetime, 'timeZone': 'Asia/Kolkata', },
                     'recurrence': [recurrence_rule],
                 }
-                event = service.events().insert(calendarId=calender_id, body=event).execute()
-                # print('Event created: %s' % (event.get('htmlLink')))
-    except HttpError as error:
-        print(f"An error occurred: {error}")
+                if key is not None:
+                    event['id'] = calendarEventId(key, day, i)
+                events.append(event)
+
+    service, calender_id = connectToCalender(joining_yr=joining_yr, department=department)
+    existing = 0
+    if key is not None:
+        stored = storedCalendarEventIds(calender_id)
+        existing = len([event for event in events if event['id'] in stored])
+        events = [event for event in events if event['id'] not in stored]
+    requests = [service.events().insert(calendarId=calender_id, body=event) for event in events]
+    result = executeCalendarBatch(service, requests)
+
+    # 409: an earlier attempt created the event but did not get to store it
+    duplicates = [error for error in result['errors'] if error['status'] == 409 and 'id' in events[error['index']]]
+    for error in duplicates:
+        result['results'][error['index']] = {'id': events[error['index']]['id']}
+    result['errors'] = [error for error in result['errors'] if error not in duplicates]
+
+    # the occurrences of the new recurring events, so getEventID finds them without a sync
+    created = [event for event in result['results'] if event is not None]
+    instances = executeCalendarBatch(service, [service.events().instances(calendarId=calender_id, eventId=event['id'])
+                                               for event in created])
+    for page in instances['results']:
+        if page is not None:
+            storeCalendarEvents(calender_id, page['items'])
+    if instances['errors'] or any(page is not None and page.get('nextPageToken') for page in instances['results']):
+        invalidateCalendarStore(calender_id)
+    result['created'] = len([event for event in result['results'] if event is not None])
+    result['existing'] = existing
+    return result
 
 def getAllEvents():
     # THIS FUNCTION IS NOT NEEDED ANYMORE
@@ -132,40 +299,95 @@ def getAllEvents():
             break
 
 
-#this function has no followup written
+# CalendarEvent row of a single (already expanded) api event, None for cancelled or all-day events
+def calendarEventRow(calender_id, event):
+    start = event.get('start', {}).get('dateTime')
+    if event.get('status') == 'cancelled' or not start:
+        return None
+    end = event.get('end', {}).get('dateTime', start)
+    return CalendarEvent(calendar_id=calender_id, event_id=event['id'], summary=event.get('summary', ''),
+                         date=start[:10], start_time=start[11:16], end_time=end[11:16])
+
+# writes events we created or changed ourselves straight into the local copy,
+# so looking them up again does not need a sync
+def storeCalendarEvents(calender_id, events):
+    rows = [calendarEventRow(calender_id, event) for event in events]
+    with transaction.atomic():
+        CalendarEvent.objects.filter(calendar_id=calender_id, event_id__in=[event['id'] for event in events]).delete()
+        CalendarEvent.objects.bulk_create([row for row in rows if row is not None])
+
+def forgetCalendarEvent(calender_id, event_id):
+    CalendarEvent.objects.filter(calendar_id=calender_id, event_id=event_id).delete()
+
+# copies new/changed/deleted events of a calendar into CalendarEvent using sync tokens,
+# only the first sync (or one after the token expires) pages through the whole calendar
+def syncCalendarEvents(service, calender_id):
+    state, _ = CalendarSyncState.objects.get_or_create(calendar_id=calender_id)
+    page_token = None
+    changed = {}
+    cancelled = set()
+    try:
+        while True:
+            params = {'calendarId': calender_id, 'pageToken': page_token, 'singleEvents': True}
+            if state.sync_token:
+                params['syncToken'] = state.sync_token
+            events = service.events().list(**params).execute()
+            for event in events['items']:
+                row = calendarEventRow(calender_id, event)
+                if row is None:
+                    cancelled.add(event['id'])
+                    changed.pop(event['id'], None)
+                    continue
+                cancelled.discard(event['id'])
+                changed[event['id']] = row
+            page_token = events.get('nextPageToken')
+            if not page_token:
+                break
+    except HttpError as error:
+        # 410 Gone: the sync token expired, start again with a full sync
+        if error.resp.status == 410 and state.sync_token:
+            state.sync_token = None
+            state.save()
+            return syncCalendarEvents(service, calender_id)
+        raise
+
+    with transaction.atomic():
+        stored = CalendarEvent.objects.filter(calendar_id=calender_id)
+        if not state.sync_token:
+            # full sync replaces whatever was mirrored before
+            stored.delete()
+        else:
+            stored.filter(event_id__in=list(cancelled) + list(changed.keys())).delete()
+        CalendarEvent.objects.bulk_create(changed.values())
+        state.sync_token = events.get('nextSyncToken')
+        state.last_synced = timezone.now()
+        state.save()
+
+# syncs the cohort calendar if the local copy is older than CALENDAR_SYNC_INTERVAL seconds
+def refreshCalendarStore(joining_yr, department):
+    calender_id = getCalenderId(joining_yr, department)
+    state = CalendarSyncState.objects.filter(calendar_id=calender_id).first()
+    interval = timedelta(seconds=getattr(settings, 'CALENDAR_SYNC_INTERVAL', 60))
+    if state is None or state.last_synced is None or timezone.now() - state.last_synced > interval:
+        service, calender_id = connectToCalender(joining_yr, department)
+        syncCalendarEvents(service, calender_id)
+    return calender_id
+
+# marks the local copy as stale so the next read picks up our own writes
+def invalidateCalendarStore(calender_id):
+    CalendarSyncState.objects.filter(calendar_id=calender_id).update(last_synced=None)
+
+
 def getEventsOnCond(date,course_code,joining_yr,department):
     #Function is to get the slots(starting time) for given date and course_code
     #inputs include date, course_code
     #output is list
 
-#     sem = 0
-#     department = 'cse'
-    
-#     date = datetime.strptime(date, '%Y-%m-%d').date()
-    # print('date1')
-    # print(date)
     date = datetime.strptime(date, '%d-%m-%Y').date()
-    # print(date)
-    service, calender_id = connectToCalender(joining_yr, department)
-    page_token = None
-    slots_today=[]
-    # print('inside get event on cond')
-    
-    while True:
-        events = service.events().list(calendarId=calender_id,
-                                       pageToken=page_token, singleEvents=True).execute()
-        for event in events['items']:
-            if date != None:
-                if event['start']['dateTime'][:10] == str(date)[:10] and event['summary']==course_code:
-                            # print(event['start']['dateTime'])
-                            slots_today.append(event['start']['dateTime'][11:16])
-        page_token = events.get('nextPageToken')
-        slots_today.sort()
-        # print(slots_today)
-        if not page_token:
-            break
-    return slots_today
-
+    calender_id = refreshCalendarStore(joining_yr, department)
+    slots_today = CalendarEvent.objects.filter(calendar_id=calender_id, date=date, summary=course_code) \
+        .order_by('start_time').values_list('start_time', flat=True)
+    return list(slots_today)
 
 
 def deleteAllEvents(joining_yr, department):
@@ -230,7 +452,7 @@ def deleteAllEvents(joining_yr, department):
 #         calendarId=calender_id, eventId=event_id, body=event).execute()
 #     print(updated_event['updated'])
 
-# to get the event id of individual slot in a day 
+# to get the event id of individual slot in a day, looked up in the local copy of the calendar
 def getEventID(date, time_slot, joining_yr, department):
 
     # input
@@ -239,40 +461,15 @@ def getEventID(date, time_slot, joining_yr, department):
     date = str(date)[:10]
 
     # print(time_slot)
-    # change time from '09:20-10:10' format to '<date>T09:20:00'
-    start_datetime = date+'T'+time_slot[:5]
-    end_datetime = date+'T'+time_slot[6:]
-    # print(start_datetime, end_datetime)
-
-    service, calender_id = connectToCalender(joining_yr, department)
-    # get event_id
-    page_token = None
-    event_id = None
-    while True:
-        # print("123")
-        # print(service)
-        events = service.events().list(calendarId=calender_id,
-                                       pageToken=page_token, singleEvents=True).execute()
-        for event in events['items']:
-            # print(event['id'],event['summary'])
-            # print(event['start'])
-            # print(1)
-            # print(event['start']['dateTime'][:16])
-            # print('P',event['start']['dateTime'][:10],'P',str(date)[:10],'P')
-            if event['start']['dateTime'][:16] == start_datetime:
-                # print(event['start'])
-                event_id = event['id']
-                # print(event_id)
-                break
-        if event_id != None:
-            break
-        page_token = events.get('nextPageToken')
-        if not page_token:
-            break
-    return event_id
-
-# cancel class
-def cancelEvent(date, time_slot, joining_yr, department):
+    # '09:20-10:10' -> '09:20'
+    calender_id = refreshCalendarStore(joining_yr, department)
+    event = CalendarEvent.objects.filter(calendar_id=calender_id, date=date, start_time=time_slot[:5]) \
+        .values_list('event_id', flat=True).first()
+    return event
+
+# cancel class. with missing_ok a class that is not there any more (a retry of a cancel that
+# went through) is not an error
+def cancelEvent(date, time_slot, joining_yr, department, missing_ok=False):
     # input
     # date = datetime.today()
     # joining_yr='2021'
@@ -283,10 +480,14 @@ def cancelEvent(date, time_slot, joining_yr, department):
     service, calender_id = connectToCalender(joining_yr, department)
     event_id = getEventID(date, time_slot, joining_yr, department)
     print(event_id)
-    service.events().delete(calendarId=calender_id, eventId=event_id).execute()
-
-# add new class or change existing class 
-def addOrChangeEvent(date, time_slot, new_summary, joining_yr, department):
+    if event_id is None:
+        if missing_ok:
+            return
+        raise ValueError('No class found at ' + str(date) + ' ' + time_slot)
+    deleteCalendarEvent(service, calender_id, event_id)
+
+# add new class or change existing class. with a key a new class gets its id from calendarEventId
+def addOrChangeEvent(date, time_slot, new_summary, joining_yr, department, key=None):
     # input
     # date = datetime.today()
     # joining_yr='2021'
@@ -311,47 +512,28 @@ def addOrChangeEvent(date, time_slot, new_summary, joining_yr, department):
         updated_event = service.events().update(
             calendarId=calender_id, eventId=event_id, body=event).execute()
         print(updated_event['updated'])
+        storeCalendarEvents(calender_id, [updated_event])
     else:
         # create event
-        print("no event_id")
-        print(type(date))
-        try:
-            print('inside try')
-            timezone_offset = timedelta(hours=-7)
-            print('before event')
-            # print(str(datetime.combine(date, datetime.strptime(
-            # times[0], '%H:%M:%S').time()).isoformat()))
-            # print(date,times[0],times[1])
-            # print(datetime.strptime(times[0], '%H:%M'))
-            # print(datetime.strptime(times[0], '%H:%M').time())
-            # print(str(datetime.combine(date, datetime.strptime(times[0], '%H:%M').time())))
-            # print(datetime.combine(date, datetime.strptime(times[0], '%H:%M').time()).isoformat())
-            start_datetime = str(datetime.combine(
-                date, datetime.strptime(times[0], '%H:%M').time()).isoformat())
-            end_datetime = str(datetime.combine(
-                date, datetime.strptime(times[1], '%H:%M').time()).isoformat())
-            print(start_datetime)
-            print(end_datetime)
-
-            event = {
-                'summary': new_summary,
-                'start': {'dateTime': start_datetime, 'timeZone': 'Asia/Kolkata', },
-                'end': {'dateTime': end_datetime, 'timeZone': 'Asia/Kolkata', },
-            }
-            print("works till here")
-            print(event)
-            print(service)
-            event = service.events().insert(calendarId=calender_id, body=event).execute()
-            print('Event created: %s' % (event.get('htmlLink')))
-
-
-            # getEventsOnCond(date)
-            
-        except HttpError as error:
-            print(f"An error occurred: {error}")
-
-# reschedule class from _ to _
-def rescheduleEvent(date, time_slot, new_date, new_time_slot, joining_yr, department):
+        start_datetime = str(datetime.combine(
+            date, datetime.strptime(times[0], '%H:%M').time()).isoformat())
+        end_datetime = str(datetime.combine(
+            date, datetime.strptime(times[1], '%H:%M').time()).isoformat())
+        event = {
+            'summary': new_summary,
+            'start': {'dateTime': start_datetime, 'timeZone': 'Asia/Kolkata', },
+            'end': {'dateTime': end_datetime, 'timeZone': 'Asia/Kolkata', },
+        }
+        if key is not None:
+            event['id'] = calendarEventId(key, 'add')
+        # errors are raised, so the calendar job is retried
+        event = insertCalendarEvent(service, calender_id, event)
+        print('Event created: %s' % (event.get('htmlLink')))
+        storeCalendarEvents(calender_id, [event])
+
+# reschedule class from _ to _. with a key the class at the new slot gets its id from calendarEventId,
+# so a retry after the class was moved finds it there instead of failing or creating it twice
+def rescheduleEvent(date, time_slot, new_date, new_time_slot, joining_yr, department, key=None):
     # input
     # date = datetime.today()
     # joining_yr='2021'
@@ -368,6 +550,11 @@ def rescheduleEvent(date, time_slot, new_date, new_time_slot, joining_yr, depart
     service, calender_id = connectToCalender(joining_yr, department)
     event_id = getEventID(date, time_slot, joining_yr, department)
     print(1, event_id)
+    new_id = calendarEventId(key, 'reschedule') if key is not None else None
+    if event_id is None:
+        if new_id is not None and new_id in storedCalendarEventIds(calender_id):
+            return
+        raise ValueError('No class found at ' + str(date) + ' ' + time_slot)
     event = service.events().get(calendarId=calender_id, eventId=event_id).execute()
 
     new_slot_event_id = getEventID(new_date, new_time_slot, joining_yr, department)
@@ -383,27 +570,23 @@ def rescheduleEvent(date, time_slot, new_date, new_time_slot, joining_yr, depart
         new_event = service.events().update(calendarId=calender_id,
                                             eventId=new_slot_event_id, body=new_event).execute()
         print(new_event['updated'])
+        storeCalendarEvents(calender_id, [new_event])
     else:
         # the new_slot is empty
-        # create event
-        print("no event_id")
-        try:
-            timezone_offset = timedelta(hours=-7)
-            event = {
-                'summary': event['summary'],
-                'start': {'dateTime': str(datetime.combine(new_date, datetime.strptime(new_time_slot[:5], '%H:%M').time()).isoformat()), 'timeZone': 'Asia/Kolkata', },
-                'end': {'dateTime': str(datetime.combine(new_date, datetime.strptime(new_time_slot[6:], '%H:%M').time()).isoformat()), 'timeZone': 'Asia/Kolkata', },
-            }
-            print("works till here")
-            print(event)
-            print(service)
-            event = service.events().insert(calendarId=calender_id, body=event).execute()
-            print('Event created: %s' % (event.get('htmlLink')))
-        except HttpError as error:
-            print(f"An error occurred: {error}")
+        # create event, errors are raised so the old class is only deleted once the new one exists
+        new_event = {
+            'summary': event['summary'],
+            'start': {'dateTime': str(datetime.combine(new_date, datetime.strptime(new_time_slot[:5], '%H:%M').time()).isoformat()), 'timeZone': 'Asia/Kolkata', },
+            'end': {'dateTime': str(datetime.combine(new_date, datetime.strptime(new_time_slot[6:], '%H:%M').time()).isoformat()), 'timeZone': 'Asia/Kolkata', },
+        }
+        if new_id is not None:
+            new_event['id'] = new_id
+        new_event = insertCalendarEvent(service, calender_id, new_event)
+        print('Event created: %s' % (new_event.get('htmlLink')))
+        storeCalendarEvents(calender_id, [new_event])
 
     # delete old slot
-    service.events().delete(calendarId=calender_id, eventId=event_id).execute()
+    deleteCalendarEvent(service, calender_id, event_id)
 
 #get day schedule for faculty from given course list
 def getDaySchedule():
@@ -529,10 +712,12 @@ def reschedule_class(request):
         print('Reschedule from', from_date,
               from_time_slot, 'to', to_date, to_time_slot)
 
-        rescheduleEvent(from_date, from_time_slot, to_date,
-                        to_time_slot, joining_yr, department)
+        getCalenderId(joining_yr, department)
+        job = enqueueCalendarJob('reschedule', {'from_date': from_date, 'from_time_slot': from_time_slot,
+                                                'to_date': to_date, 'to_time_slot': to_time_slot,
+                                                'joining_yr': joining_yr, 'department': department})
 
-        return Response({'message': 'Class rescheduled successfully'}, status=201)
+        return Response({'message': 'Class reschedule queued', 'job_id': job.id}, status=201)
     except Exception as e:
         return Response({'error': str(e)}, status=400)
 
@@ -556,8 +741,10 @@ def add_or_change_class(request):
 #     department = 'cse'
     try:
         print('added_or_changed', date, time_slot, course_code)
-        addOrChangeEvent(date, time_slot, course_code, joining_yr, department)
-        return Response({'message': 'Class added or changed successfully'}, status=201)
+        getCalenderId(joining_yr, department)
+        job = enqueueCalendarJob('add_or_change', {'date': date, 'time_slot': time_slot, 'course_code': course_code,
+                                                   'joining_yr': joining_yr, 'department': department})
+        return Response({'message': 'Class add or change queued', 'job_id': job.id}, status=201)
     except Exception as e:
         return Response({'error': str(e)}, status=400)
 
@@ -577,11 +764,31 @@ def cancel_class(request):
 #     department = 'cse'
     try:
         print('cancelled', date, time_slot)
-        cancelEvent(date, time_slot, joining_yr, department)
-        return Response({'message': 'Class cancelled successfully'}, status=201)
+        getCalenderId(joining_yr, department)
+        job = enqueueCalendarJob('cancel', {'date': date, 'time_slot': time_slot,
+                                            'joining_yr': joining_yr, 'department': department})
+        return Response({'message': 'Class cancellation queued', 'job_id': job.id}, status=201)
     except Exception as e:
         return Response({'error': str(e)}, status=400)
 
+@api_view(['GET'])
+def getCalendarJobStatus(request):
+    try:
+        job_id = int(request.GET.get('job_id'))
+    except (TypeError, ValueError):
+        return Response({'error': 'job_id must be a number'}, status=400)
+    job = CalendarJob.objects.filter(id=job_id).first()
+    if job is None:
+        return Response({'error': 'Job not found'}, status=404)
+    return Response({'job_id': job.id, 'action': job.action, 'status': job.status, 'attempts': job.attempts,
+                     'max_attempts': job.max_attempts, 'run_after': job.run_after, 'last_error': job.last_error,
+                     'result': job.result, 'created_at': job.created_at, 'finished_at': job.finished_at})
+
+
+@api_view(['GET'])
+def getCalendarJobMetrics(request):
+    return Response(calendarJobMetrics())
+
 def validate_time_slot(time_slot):
     try:
         # Split the time slot into start and end times
@@ -604,25 +811,50 @@ def validate_time_slot(time_slot):
 
     return False
 
+# writes the absentees of several classes (sessions) of one course in one transaction:
+# one F() update for the class count, one delete of the sessions whose list changed and one bulk insert.
+# a session is (date, time_slot, absentees_list, count), count == 0 means the class is new
+def saveAttendanceSessions(course_id, department, sessions):
+    new_classes = len([session for session in sessions if session[3] == 0])
+    with transaction.atomic():
+        if new_classes:
+            CurrentCourses.objects.filter(department=department,course_code=course_id).update(
+                total_classes=F('total_classes')+new_classes)
+
+        existing = {}
+        existing_entries = Absentees.objects.filter(course_code=course_id, date__in=set(session[0] for session in sessions)) \
+            .values_list('date', 'time_slot', 'roll_no')
+        for entry_date, entry_time_slot, roll_no in existing_entries:
+            existing.setdefault((entry_date, entry_time_slot), set()).add(roll_no)
+
+        changed = Q(pk__in=[])
+        new_entries = []
+        deltas = {}
+        for session_date, time_slot, absentees_list, count in sessions:
+            old = existing.get((session_date, time_slot), set())
+            if old and old == set(absentees_list):
+                continue
+            if old:
+                changed |= Q(date=session_date, time_slot=time_slot)
+                for roll_no in old:
+                    deltas[roll_no] = deltas.get(roll_no, 0) - 1
+            for roll_no in absentees_list:
+                deltas[roll_no] = deltas.get(roll_no, 0) + 1
+            new_entries.extend(Absentees(course_code=course_id,date=session_date,roll_no=roll_no,time_slot=time_slot)
+                               for roll_no in absentees_list)
+        with summaryKeptByCaller():
+            Absentees.objects.filter(changed, course_code=course_id).delete()
+        Absentees.objects.bulk_create(new_entries)
+        updateAttendanceSummary(course_id, department, deltas)
+
+# the body is one class (date, time_slot, absentees_list, count) or, to sync many classes
+# at once, a list of them in "sessions" next to course_id and department
 @api_view(['POST'])
 def insertAttendance(request):
-    print("insert insert attendance")
-    print(request.data)
-    date = request.data["date"]
     course_id = request.data["course_id"]
-    absentees_list = request.data["absentees_list"] # the date and course_id are same and absentees list contains all the roll numbers of students that are absent 
-    time_slot = request.data["time_slot"]
     department = request.data["department"]
     print("department and course id is ",department,course_id)
-    #checking validity of date
-    try:
-        date = datetime.strptime(date, '%Y-%m-%d').date()
-    except ValueError:
-        return Response(
-            {"error": "Invalid date format. Use YYYY-MM-DD."},
-            status=status.HTTP_400_BAD_REQUEST
-        )
-    
+
     #checking validity of course_id
     try:
         if (not course_id[0].isalpha()) or (not course_id[1].isalpha()) or (course_id[2] <'0' or course_id[2]>'9') or (course_id[3] <'0' or course_id[3]>'9')or (course_id[4] <'0' or course_id[4]>'9'):
@@ -633,30 +865,41 @@ def insertAttendance(request):
             status=status.HTTP_404_NOT_FOUND
         )
 
-    #validating time slot
-    try:
+    raw_sessions = request.data["sessions"] if "sessions" in request.data else [request.data]
+    sessions = []
+    seen = set()
+    for index, session in enumerate(raw_sessions):
+        #checking validity of date
+        try:
+            session_date = datetime.strptime(session["date"], '%Y-%m-%d').date()
+        except ValueError:
+            return Response(
+                {"error": "Invalid date format. Use YYYY-MM-DD.", "session": index},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        #validating time slot
+        time_slot = session["time_slot"]
         if not validate_time_slot(time_slot):
-            raise ValueError("Invalid time slot")
-    except ValueError as e:
-        return Response(
-            {"error": str(e)},
-            status=status.HTTP_400_BAD_REQUEST
-        )
-    
-    if request.data["count"] == 0:
-        total_classes = CurrentCourses.objects.filter(department=department,course_code=course_id)[0].total_classes
-        CurrentCourses.objects.filter(department=department,course_code=course_id).update(total_classes=total_classes+1)
-        
-    existing_entry = Absentees.objects.filter(course_code=course_id,date=date,time_slot=time_slot)
-    if existing_entry and  len(existing_entry)!=len(request.data["absentees_list"]):
-
-        for entry in existing_entry:
-            entry.delete()
-    elif existing_entry and  len(existing_entry)==len(request.data["absentees_list"]):
-        return Response({})
-    for roll_no in absentees_list:
-        new_entry = Absentees(course_code=course_id,date=date,roll_no=roll_no,time_slot=time_slot)
-        new_entry.save()
+            return Response(
+                {"error": "Invalid time slot", "session": index},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if "count" not in session:
+            return Response(
+                {"error": "count is required", "session": index},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        # the same class twice would insert its absentees twice
+        if (session_date, time_slot) in seen:
+            return Response(
+                {"error": "The same date and time slot is given twice", "session": index},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        seen.add((session_date, time_slot))
+        sessions.append((session_date, time_slot, session["absentees_list"], session["count"]))
+
+    saveAttendanceSessions(course_id, department, sessions)
     return Response({})
     
 
@@ -667,11 +910,12 @@ def  getCoursesForFaculty(request):
     # print(request.GET.get('faculty_name'))
     faculty_name = request.GET.get("faculty_name")
 
-    corresponding_courses = CurrentCourses.objects.filter(faculty_name=faculty_name)
+    corresponding_courses = CurrentCourses.objects.filter(faculty_name=faculty_name).select_related('course')
     course_list=[]
     for obj in corresponding_courses:
         course_code = obj.course_code
-        course_name = CourseList.objects.filter(course_code=course_code)[0].course_name
+        course = obj.catalog_course()
+        course_name = course.course_name if course else ''
         course_list.append([course_code,course_name,obj.department])
     
     print("&&&",course_list)
@@ -739,8 +983,24 @@ def getAttendanceDetailsForStudent(request):
     print('dates of abseonts',dates_of_absent)
     print('coirse',course_code)
     no_of_total_classes=CurrentCourses.objects.filter(course_code=course_code,department=department)[0].total_classes
+    absent_count=AttendanceSummary.objects.filter(roll_no=roll_no,course_code=course_code,department=department) \
+        .values_list('absent_count', flat=True).first() or 0
 
-    return Response({'dates_of_absent':dates_of_absent,'total_classes':no_of_total_classes})
+    return Response({'dates_of_absent':dates_of_absent,'total_classes':no_of_total_classes,'absent_count':absent_count})
+
+# absences and total classes of every current course of a student, read from AttendanceSummary
+@api_view(['GET'])
+def getAttendanceSummaryForStudent(request):
+    roll_no=request.GET.get("roll_no")
+    department=request.GET.get("department")
+    semester=request.GET.get("semester")
+
+    absent_count = AttendanceSummary.objects.filter(roll_no=roll_no, course_code=OuterRef('course_code'),
+                                                    department=OuterRef('department')).values('absent_count')
+    courses = CurrentCourses.objects.filter(department=department, semester=semester) \
+        .annotate(absent_count=Coalesce(Subquery(absent_count), 0)) \
+        .order_by('course_code').values('course_code', 'total_classes', 'absent_count')
+    return Response({'attendance': list(courses)})
 
 
 
@@ -778,89 +1038,80 @@ def logoutUser(request):
     logout(request)
     return Response({'authenticated':False})
 
+# both user details views read the login type and profile through the profile cache (see profile_cache.py)
 @api_view(['GET'])
 def getUserDetails(request):
     email = request.GET.get('username')
     print("email is",email)
-    type_of_user = Login.objects.filter(email = request.GET.get('username'))[0].type_of_user
+    profile = profile_cache.get(email)
+    if profile is None:
+        return Response({'error': 'No user with this username'}, status=404)
+    type_of_user = profile['type_of_user']
+    person = profile['fields']
     if type_of_user=='student' or type_of_user=='student_cr':
-        student = StudentInfo.objects.filter(email=email)[0]
-        roll_no = student.roll_no
-        name = student.name
-        department = student.department.lower()
-        semester = student.semester
-        joining_year = student.joining_year
-
-
-        return Response({'type_of_user':type_of_user,'roll_no':roll_no,'student_name':name,'department':department,'semester':semester,'joining_year':joining_year, 'email': email, 'username': email})
+        return Response({'type_of_user':type_of_user,'roll_no':person['roll_no'],'student_name':person['name'],'department':person['department'].lower(),'semester':person['semester'],'joining_year':person['joining_year'], 'email': email, 'username': email})
     elif type_of_user=='faculty':
-        teacher = FacultyInfo.objects.filter(email=email)[0]
-        name = teacher.name
-        return Response({'type_of_user':type_of_user,'faculty_name':name,'faculty_id':teacher.faculty_id, 'email': email, 'username': email})
+        return Response({'type_of_user':type_of_user,'faculty_name':person['name'],'faculty_id':person['faculty_id'], 'email': email, 'username': email})
     elif type_of_user == 'admin':
-        staff = AdministrationInfo.objects.filter(email=email)[0]
-        name = staff.name
-        position = staff.position
-        staff_id = staff.staff_id
-        return Response({'type_of_user': type_of_user, 'staff_name': name, 'position': position, 'staff_id': staff_id, 'email': email, 'username': email})
+        return Response({'type_of_user': type_of_user, 'staff_name': person['name'], 'position': person['position'], 'staff_id': person['staff_id'], 'email': email, 'username': email})
 
 # snigdha
 @api_view(['GET'])
 def getUserAllDetails(request):
     email = request.GET.get('username')
     print("email is", email)
-    type_of_user = Login.objects.filter(
-        email=request.GET.get('username'))[0].type_of_user
+    profile = profile_cache.get(email)
+    if profile is None:
+        return Response({'error': 'No user with this username'}, status=404)
+    type_of_user = profile['type_of_user']
+    person = profile['fields']
     if type_of_user == 'student' or type_of_user == 'student_cr':
-        student = StudentInfo.objects.filter(email=email)[0]
-        name = student.name
-        roll_no = student.roll_no
-        joining_year = student.joining_year
-        semester = student.semester
-        department = student.department
-        gender = student.gender
-        blood_group = student.blood_group
-        contact_number = student.contact_number
-        # email=
-        address = student.address
-        return Response({'type_of_user': type_of_user, 'student_name': name, 'roll_no': roll_no, 'joining_year': joining_year, 'department': department, 'semester': semester, 'gender': gender, 'blood_group': blood_group, 'contact_number': contact_number, 'email': email, 'address': address})
+        return Response({'type_of_user': type_of_user, 'student_name': person['name'], 'roll_no': person['roll_no'], 'joining_year': person['joining_year'], 'department': person['department'], 'semester': person['semester'], 'gender': person['gender'], 'blood_group': person['blood_group'], 'contact_number': person['contact_number'], 'email': email, 'address': person['address']})
     elif type_of_user == 'faculty':
-        print("faculty email sent: ", email)
-        teacher = FacultyInfo.objects.filter(email=email)[0]
-        name = teacher.name
-        return Response({'type_of_user': type_of_user, 'faculty_id': teacher.faculty_id, 'faculty_name': teacher.name, 'position': teacher.position, 'designation': teacher.designation, 'email': teacher.email, 'description': teacher.description})
+        return Response({'type_of_user': type_of_user, 'faculty_id': person['faculty_id'], 'faculty_name': person['name'], 'position': person['position'], 'designation': person['designation'], 'email': person['email'], 'description': person['description']})
     elif type_of_user == 'admin':
-        print("admin email sent: ", email)
-        staff = AdministrationInfo.objects.filter(email=email)[0]
-        name = staff.name
-        position = staff.position
-        staff_id = staff.staff_id
-        return Response({'type_of_user': type_of_user, 'admin_name': name, 'position': position, 'admin_id': staff_id, 'email': email, 'username': email})
+        return Response({'type_of_user': type_of_user, 'admin_name': person['name'], 'position': person['position'], 'admin_id': person['staff_id'], 'email': email, 'username': email})
+
+# hit/miss counters of the profile cache in this process
+@api_view(['GET'])
+def getProfileCacheStats(request):
+    return Response(profile_cache.stats())
+
+# profile, courses, timetable and todos of the logged in user in one response, cached per user
+# until one of them changes (see session_bootstrap.py)
+@api_view(['GET'])
+def getSessionBootstrap(request):
+    email = request.GET.get('username')
+    if not email:
+        return Response({'error': 'username is required'}, status=400)
+    data = cachedSessionBootstrap(email)
+    if data is None:
+        return Response({'error': 'No user with this username'}, status=404)
+    return Response(data)
+
+# validates the whole upload, then replaces the course's results in one transaction,
+# so a bad record leaves the stored results untouched. see result_upload.py for the accepted formats.
+# ?mode=upsert only writes the records that are new or changed and keeps the rest
+def uploadResults(request, kind):
+    mode = request.GET.get('mode', 'replace')
+    if mode not in ('replace', 'upsert'):
+        return Response({'error': 'mode must be replace or upsert'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        records = readResultRecords(request)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if not records:
+        return Response({'error': 'No records to upload'}, status=status.HTTP_400_BAD_REQUEST)
+    objects, errors = validateResultRecords(kind, records)
+    if errors:
+        return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+    if mode == 'upsert':
+        return Response(upsertResults(kind, objects))
+    return Response({'created': replaceResults(kind, objects)})
 
 @api_view(['POST'])
 def addResult(request) :
-    records=request.data
-    course_code=records[0]['course_code']
-    Result.objects.filter(course_code=course_code).delete()
-
-    for record in records :
-        print(record)
-        course_code=record['course_code']
-        faculty=record['faculty']
-        ct_1=record['ct_1']
-        ct_2=record['ct_2']
-        assignments=record['assignments']
-        end_sem=record['end_sem']
-        grade=record['grade']
-        roll_no=record['roll_no']
-
-        try:
-            obj=Result(course_code=course_code,faculty=faculty,ct_1=ct_1,ct_2=ct_2,assignments=assignments,end_sem=end_sem,grade=grade,roll_no=roll_no)
-            obj.full_clean()
-            obj.save()
-        except ValidationError as e:
-            return Response({'errors': e.message_dict}, status=status.HTTP_400_BAD_REQUEST)  # e.message_dict has field-specific errors
-    return Response({})
+    return uploadResults(request, 'theory')
 
 
 @api_view(['GET'])
@@ -873,6 +1124,47 @@ def getResultForStudentForCourse(request) :
 
     return Response({'ct_1' : result_object.ct_1,'ct_2' : result_object.ct_2,'assignments':result_object.assignments,'end_sem' : result_object.end_sem,'grade' : result_object.grade})
 
+# 200 with an ETag of the data, or an empty 304 when the client already holds that version
+def etagResponse(request, data):
+    etag = quote_etag(hashlib.md5(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest())
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(data)
+    response['ETag'] = etag
+    return response
+
+# results of a student joined with the course catalog, one query per result table,
+# optionally only the courses of one semester
+def transcriptResults(model, roll_no, department, semester, fields):
+    course = CourseList.objects.filter(course_code=OuterRef('course_code'), department__iexact=department)
+    results = model.objects.filter(roll_no=roll_no).annotate(
+        course_name=Subquery(course.values('course_name')[:1]),
+        semester=Subquery(course.values('semester')[:1]),
+        course_type=Subquery(course.values('course_type')[:1]))
+    if semester is not None:
+        results = results.filter(semester=semester)
+    return list(results.order_by('semester', 'course_code')
+                .values('course_code', 'course_name', 'semester', 'course_type', 'faculty', *fields))
+
+# every theory and lab result of ?roll_no= (optionally ?semester=) for the transcript screen
+@api_view(['GET'])
+def getTranscriptForStudent(request):
+    roll_no = request.GET.get('roll_no')
+    try:
+        semester = int(request.GET['semester']) if request.GET.get('semester') else None
+    except ValueError:
+        return Response({'error': 'semester must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+    department = StudentInfo.objects.filter(roll_no=roll_no).values_list('department', flat=True).first()
+    if department is None:
+        return Response({'error': 'No student with this roll number'}, status=status.HTTP_404_NOT_FOUND)
+    return etagResponse(request, {
+        'roll_no': roll_no,
+        'semester': semester,
+        'theory': transcriptResults(Result, roll_no, department, semester, ['ct_1', 'ct_2', 'assignments', 'end_sem', 'grade']),
+        'lab': transcriptResults(LabResult, roll_no, department, semester, ['internal_marks', 'end_lab', 'grade']),
+    })
+
 @api_view(['GET'])
 
 def getTodosForUser(request) :
@@ -898,65 +1190,108 @@ def getCalendarId(request):
     return Response({'calendar_id': calendar_id})
 
 
+# the cohort's week is encoded once and cached (timetable_cache.py), then served as is with an ETag and
+# Last-Modified. no-cache makes browsers revalidate, which is a 304 without queries while nothing changed
 @api_view(['GET'])
 def getTimetableForStudent(request):
-    semester = request.GET.get('semester')
     department = request.GET.get('department')
-    department=department.lower()
-    timetable_objects = TimeTable.objects.filter(
-        semester=semester, department=department)
-
-    timetable_data = []
-    for timetable_object in timetable_objects:
-        timetable_data.append({
-            'day': timetable_object.day,
-            'slot_1': timetable_object.slot_1,
-            'slot_2': timetable_object.slot_2,
-            'slot_3': timetable_object.slot_3,
-            'slot_4': timetable_object.slot_4,
-            'slot_5': timetable_object.slot_5,
-            'slot_6': timetable_object.slot_6,
-            'slot_7': timetable_object.slot_7
-        })
-
-    timetable_data= sorted(timetable_data, key=lambda x: ["monday", "tuesday", "wednesday", "thursday", "friday"].index(x['day'].lower()))
-    return Response({"timetable_data":timetable_data})
+    try:
+        semester = int(request.GET.get('semester'))
+    except (TypeError, ValueError):
+        semester = None
+    if semester is None or not department:
+        return Response({'error': 'semester and department are required.'}, status=status.HTTP_400_BAD_REQUEST)
+    payload = timetable_payloads.get(semester, department)
+    response = get_conditional_response(request, etag=payload['etag'], last_modified=payload['last_modified'])
+    if response is None:
+        response = HttpResponse(payload['body'], content_type='application/json')
+    response['ETag'] = payload['etag']
+    response['Last-Modified'] = http_date(payload['last_modified'])
+    response['Cache-Control'] = 'no-cache'
+    return response
 
     # return Response({'day': timetable_object.day, 'slot_1': timetable_object.slot_1, 'slot_2': timetable_object.slot_2, 'slot_3': timetable_object.slot_3, 'slot_4': timetable_object.slot_4, 'slot_5': timetable_object.slot_5, 'slot_6': timetable_object.slot_6, 'slot_7': timetable_object.slot_7})
 
 
 
+# matches names, ids and emails through the full-text index (see search_index.py), best match first,
+# paged with ?limit= and ?offset=
 @api_view(['GET'])
 def search(request):
     search_query = request.GET.get('searchText')
     if search_query and len(search_query) >= 5:
-        student_results = StudentInfo.objects.filter(
-            name__icontains=search_query)
-        faculty_results = FacultyInfo.objects.filter(
-            name__icontains=search_query)
-        admin_results = AdministrationInfo.objects.filter(
-            name__icontains=search_query)
-        # Combine search results into a single list
-        # search_results = list(student_results.values()) + list(faculty_results.values())
+        try:
+            limit = int(request.GET.get('limit', settings.SEARCH_RESULTS_LIMIT))
+            offset = int(request.GET.get('offset', 0))
+        except ValueError:
+            return Response({'error': 'limit and offset must be numbers'}, status=400)
+        if limit < 1 or offset < 0:
+            return Response({'error': 'limit must be positive and offset must not be negative'}, status=400)
+
+        if searchIndexAvailable():
+            # ranked (kind, key) pairs from the index, then one primary key lookup per kind
+            matches = searchDirectory(search_query, limit=limit, offset=offset)
+            people = {}
+            for kind, (model, key_field, ident_field) in SEARCH_KINDS.items():
+                keys = [key for match_kind, key in matches if match_kind == kind]
+                if keys:
+                    people.update(((kind, str(key)), person) for key, person in model.objects.in_bulk(keys, field_name=key_field).items())
+            results = [people[match] for match in matches if match in people]
+        else:
+            results = list(StudentInfo.objects.filter(name__icontains=search_query)) + \
+                list(FacultyInfo.objects.filter(name__icontains=search_query)) + \
+                list(AdministrationInfo.objects.filter(name__icontains=search_query))
+            results = results[offset:offset + limit]
+
         search_list = []
-        for search_obj in student_results:
-            search_list.append({'name': search_obj.name, 'roll_no': search_obj.roll_no, 'department': search_obj.department,
-                               'semester': search_obj.semester, 'joining_year': search_obj.joining_year, 'email': search_obj.email})
-        for search_obj in faculty_results:
-            search_list.append({'name': search_obj.name, 'faculty_id': search_obj.faculty_id, 'position': search_obj.position,
-                               'description': search_obj.description, 'designation': search_obj.designation, 'email': search_obj.email})
-        for search_obj in admin_results:
-            search_list.append({'name': search_obj.name, 'position': search_obj.position,
-                               'staff_id': search_obj.staff_id, 'email': search_obj.email})
+        for search_obj in results:
+            if isinstance(search_obj, StudentInfo):
+                search_list.append({'name': search_obj.name, 'roll_no': search_obj.roll_no, 'department': search_obj.department,
+                                   'semester': search_obj.semester, 'joining_year': search_obj.joining_year, 'email': search_obj.email})
+            elif isinstance(search_obj, FacultyInfo):
+                search_list.append({'name': search_obj.name, 'faculty_id': search_obj.faculty_id, 'position': search_obj.position,
+                                   'description': search_obj.description, 'designation': search_obj.designation, 'email': search_obj.email})
+            else:
+                search_list.append({'name': search_obj.name, 'position': search_obj.position,
+                                   'staff_id': search_obj.staff_id, 'email': search_obj.email})
         return Response({'search_list': search_list})
     else:
         return Response({'error': 'Please enter a search query with a minimum of 5 characters'}, status=400)
 
+# typeahead for the search box, answered from the in-memory prefix index (see directory_prefix.py) so it
+# can fire on every keystroke, ?searchText= is the prefix and ?limit= the number of suggestions
+@api_view(['GET'])
+def autocomplete(request):
+    prefix = (request.GET.get('searchText') or '').strip()
+    if not prefix:
+        return Response({'error': 'Please enter a search query'}, status=400)
+    try:
+        limit = min(int(request.GET.get('limit', 10)), 50)
+    except ValueError:
+        return Response({'error': 'limit must be a number'}, status=400)
+    suggestions = []
+    for person in directory_prefixes.complete(prefix, limit=max(limit, 1)):
+        model, key_field, ident_field = SEARCH_KINDS[person['kind']]
+        suggestions.append({'kind': person['kind'], 'name': person['name'], ident_field: person['id'], 'email': person['email']})
+    return Response({'suggestions': suggestions})
+
 # i wrote this function to validate batch in fee defaulters
 def validate_batch_format(batch):
     # Check the length and format of the batch
     return bool(re.match(r'^\d{4}-\d{4}$', batch)) 
 
+# fee defaulters with the student's name, email and contact number looked up by primary key
+# in the same query, ordered for keyset pagination
+def feeDefaultersWithStudents(**filters):
+    student = StudentInfo.objects.filter(roll_no=OuterRef('roll_no'))
+    return FeeDefaulters.objects.filter(**filters) \
+        .annotate(name=Subquery(student.values('name')[:1]),
+                  email=Subquery(student.values('email')[:1]),
+                  contact_number=Subquery(student.values('contact_number')[:1])) \
+        .order_by('department', 'batch', 'roll_no') \
+        .values('department', 'batch', 'roll_no', 'name', 'email', 'contact_number')
+
+# optional ?limit= returns a page, the next page starts after the returned next_after roll number
 @api_view(['GET'])
 def getFeeDefaulters(request):
     department = request.GET.get('department')
@@ -964,16 +1299,56 @@ def getFeeDefaulters(request):
     # Validate the batch format
     if not validate_batch_format(batch):
         return Response({'error': 'Invalid batch format. Batch must be in the format XXXX-XXXX, where X is a digit and has exactly one hyphen.'}, status=400)
-    
+    try:
+        limit = int(request.GET['limit']) if 'limit' in request.GET else None
+    except ValueError:
+        return Response({'error': 'limit must be a number'}, status=400)
+    if limit is not None and limit < 1:
+        return Response({'error': 'limit must be at least 1'}, status=400)
+
+    defaulters = feeDefaultersWithStudents(department=department, batch=batch)
+    if request.GET.get('after'):
+        defaulters = defaulters.filter(roll_no__gt=request.GET.get('after'))
+    if limit is not None:
+        defaulters = defaulters[:limit + 1]
+
     student_list = []
-    students = FeeDefaulters.objects.filter(department=department, batch=batch)
-    print(students)
-    for search_obj in students:
-        # student_list.append({'roll_no':search_obj.roll_no})
-        defaulter = StudentInfo.objects.filter(roll_no=search_obj.roll_no)[0]
-        student_list.append({'roll_no': search_obj.roll_no, 'name': defaulter.name,
-                            'email': defaulter.email, 'contact_number': defaulter.contact_number})
-    return Response({'student_list': student_list})
+    for defaulter in defaulters:
+        student_list.append({'roll_no': defaulter['roll_no'], 'name': defaulter['name'],
+                            'email': defaulter['email'], 'contact_number': defaulter['contact_number']})
+    next_after = None
+    if limit is not None and len(student_list) > limit:
+        student_list = student_list[:limit]
+        next_after = student_list[-1]['roll_no'] if student_list else None
+    return Response({'student_list': student_list, 'next_after': next_after})
+
+
+# end of term report of all fee defaulters (optionally of one department / batch) as a csv
+# that is streamed from a single query, so memory and query count do not grow with the list
+@api_view(['GET'])
+def getFeeDefaultersReport(request):
+    filters = {}
+    if request.GET.get('department'):
+        filters['department'] = request.GET.get('department')
+    if request.GET.get('batch'):
+        filters['batch'] = request.GET.get('batch')
+
+    def rows():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        fields = ['department', 'batch', 'roll_no', 'name', 'email', 'contact_number']
+        writer.writerow(fields)
+        for defaulter in feeDefaultersWithStudents(**filters).iterator(chunk_size=2000):
+            writer.writerow([defaulter[field] for field in fields])
+            if buffer.tell() > 16384:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    response = StreamingHttpResponse(rows(), content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="fee_defaulters.csv"'
+    return response
 
 
 # @api_view(['GET'])
@@ -1265,18 +1640,20 @@ def addNewStudent(request):
     # return Response({'status': 'Saved Successfully'}, status=200)
 
     try:
-        # Validate the model instance
-        obj.full_clean()  # This will run all field validators and raise ValidationError if any fail.
-        obj.save()  # Save only if validation is successful
+        # the student, its login and its user are stored together or not at all
+        with transaction.atomic():
+            # Validate the model instance
+            obj.full_clean()  # This will run all field validators and raise ValidationError if any fail.
+            obj.save()  # Save only if validation is successful
 
-        login_obj = Login(email=email, type_of_user='student')
-        login_obj.save()
+            login_obj = Login(email=email, type_of_user='student')
+            login_obj.save()
 
-        username = email
-        password = email[:6]
-        if not User.objects.filter(username=username).exists():
-            user = User.objects.create_user(username=username, password=password)
-            user.save()
+            username = email
+            password = email[:6]
+            if not User.objects.filter(username=username).exists():
+                user = User.objects.create_user(username=username, password=password)
+                user.save()
 
         return Response({'status': 'Saved Successfully'}, status=200)
 
@@ -1284,6 +1661,9 @@ def addNewStudent(request):
         # Catch validation errors and return them as a response
         errors = {field: error for field, error in e.message_dict.items()}
         return Response({'status': 'Validation Error', 'errors': errors}, status=400)
+    except IntegrityError:
+        # Login.email is unique
+        return Response({'status': 'Validation Error', 'errors': {'email': ['A login with this email already exists.']}}, status=400)
 
 
 from django.utils import timezone
@@ -1291,148 +1671,22 @@ from datetime import date, timedelta
 
 
 
+# recomputes every student's semester from their joining year (see semester_rollover.py),
+# ?dry_run=1 only reports the counts per joining year
 @api_view(['POST'])
 def updateSemester(request):
-    print("hello i came inside")
-    students = StudentInfo.objects.all()
-    current_date = date.today()
-    current_year = current_date.year
-    current_month = current_date.month
-    for student in students:        
-        joining_year = student.joining_year
-
-        years_since_joining = (int(current_year) - int(joining_year)) + (current_month - 6) / 12
-        
-        if years_since_joining >= 4:
-            semester = 0
-        else:
-            semester = int(years_since_joining * 2) + 1
-
-        student.semester = semester
-        student.save()
-
-    return Response(f"Semester updated successfully. Current semester: {semester}")
+    dry_run = request.GET.get('dry_run', '').lower() in ('1', 'true', 'yes')
+    return Response(rolloverSemesters(dry_run=dry_run))
 
 
+# week of the faculty's classes from the slot index (see timetables.py). FacultyTimeTable is only
+# written when the week differs from the stored one
 @api_view(['GET'])
 def facultyTimetable(request):
     faculty_name = request.GET.get('faculty_name')  #as input
-    # faculty_name = 'Anoop Jacob Thomas'  # input
-    print(faculty_name)
-    days_courses = {}
-    corresponding_courses = CurrentCourses.objects.filter(
-        faculty_name=faculty_name)
-    course_codes = []
-    for obj in corresponding_courses:
-        course_codes.append(
-            [obj.semester, obj.department.lower(), obj.course_code])
-
-    print(">>", course_codes)
-    abc = []
-    # return Response({"course_list": course_list})
-    for course in course_codes:
-        student_semester = course[0]
-        student_department = course[1].lower()
-        course_code = course[2]
-        # print(course_code, department)
-
-        # Get student timetables for this course code and department
-        student_timetables = TimeTable.objects.filter(slot_1=course_code) | \
-            TimeTable.objects.filter(slot_2=course_code) | \
-            TimeTable.objects.filter(slot_3=course_code) | \
-            TimeTable.objects.filter(slot_4=course_code) | \
-            TimeTable.objects.filter(slot_5=course_code) | \
-            TimeTable.objects.filter(slot_6=course_code) | \
-            TimeTable.objects.filter(slot_7=course_code)
-        # print("->")
-        # print(student_timetables)
-        for timetable in student_timetables:
-            for i in range(1, 8):  # Loop through slots
-                slot_name = f"slot_{i}"
-                if getattr(timetable, slot_name) == course_code:
-                    course_code1 = course_code
-                else:
-                    course_code1 = ''
-                if getattr(timetable, slot_name) == course_code:
-                    print('1', timetable.day, slot_name, course_code)
-                    l = [timetable.day, slot_name, course_code]
-                    print(l)
-                    abc.append(l)
-                #     print(type(timetable.day))
-
-    print(abc)
-
-    for item in abc:
-        day = item[0]
-        slot_name = item[1]
-        course_code1 = item[2]
-        print(day)
-        if day in list(days_courses.keys()):
-            print('key there', item[0])
-            days_courses[day][slot_name] = course_code1
-        else:
-            print('key not there', day)
-            # days_courses[timetable.day] = [[slot_name, course_code1],]
-            sl = {
-                'slot_1': '',
-                'slot_2': '',
-                'slot_3': '',
-                'slot_4': '',
-                'slot_5': '',
-                'slot_6': '',
-                'slot_7': '',
-            }
-            days_courses[day] = sl
-            print(days_courses[day])
-            print(slot_name)
-            days_courses[day][slot_name] = course_code1
-            # print(days_courses[timetable.day])
-
-        print(days_courses)
-        print(list(days_courses.keys()))
-
-        # Create or update faculty timetables
-        cnt = 0
-        for day in list(days_courses.keys()):
-            # print(days_courses[day]['slot_1'])
-            FacultyTimeTable.objects.update_or_create(
-                name=faculty_name,
-                day=day,
-                defaults={
-                    'slot_1': days_courses[day]['slot_1'],
-                    'slot_2': days_courses[day]['slot_2'],
-                    'slot_3': days_courses[day]['slot_3'],
-                    'slot_4': days_courses[day]['slot_4'],
-                    'slot_5': days_courses[day]['slot_5'],
-                    'slot_6': days_courses[day]['slot_6'],
-                    'slot_7': days_courses[day]['slot_7']}
-            )
-            cnt += 1
-        print(cnt)
-
-    faculty_timetable_objects = FacultyTimeTable.objects.filter(
-        name=faculty_name)
-
-    print(faculty_timetable_objects)
-
-    faculty_timetable_data = []
-
-    for i in faculty_timetable_objects:
-        faculty_timetable_data.append({
-            'day': i.day,
-            'slot_1': i.slot_1,
-            'slot_2': i.slot_2,
-            'slot_3': i.slot_3,
-            'slot_4': i.slot_4,
-            'slot_5': i.slot_5,
-            'slot_6': i.slot_6,
-            'slot_7': i.slot_7
-        })
-
-    print("faculty_timetable_data", faculty_timetable_data)
-
-    faculty_timetable_data= sorted(faculty_timetable_data, key=lambda x: ["monday", "tuesday", "wednesday", "thursday", "friday"].index(x['day'].lower()))
-
+    grid = facultyWeek(faculty_name)
+    syncFacultyTimeTable(faculty_name, grid)
+    faculty_timetable_data = grid.rows(free='')
     return Response({"faculty_timetable_data": faculty_timetable_data})
 
 
@@ -1605,87 +1859,217 @@ def getTimeSlotForFaculty(request):
 #         print(serializer.errors)
 #         return Response(serializer.errors, status=400)
     
+# joining year of the cohort that is currently in the given semester
+def getJoiningYearForSemester(semester):
+    yrs = ['2021', '2022', '2023', '2024']
+    joining_yr=None
+    if semester==1 or semester==2:
+        joining_yr=yrs[3]
+    elif semester==3 or semester==4:
+        joining_yr=yrs[2]
+    elif semester==5 or semester==6:
+        joining_yr=yrs[1]
+    elif semester==7 or semester==8:
+        joining_yr=yrs[0]
+    return joining_yr
+
+# whether the serializer rejected an entry because its (semester, department, day) is stored already
+def timetableExists(errors):
+    for entry_errors in (errors if isinstance(errors, list) else [errors]):
+        if any(getattr(error, 'code', None) == 'unique' for error in entry_errors.get('non_field_errors', [])):
+            return True
+    return False
+
+# the body is one day of a timetable, or a list of days (e.g. a whole week of a cohort)
+# which is saved together and queued for the calendar as one job per cohort
 @api_view(['POST'])
 def addTimetable(request):
-    serializer = TimeTableSerializer(data=request.data)
+    many = isinstance(request.data, list)
+    serializer = TimeTableSerializer(data=request.data, many=many)
     if serializer.is_valid():
-        semester = serializer.validated_data.get('semester')
-        # joining_yr = serializer.validated_data.get('joining_yr')
-        department = serializer.validated_data.get('department')
-        day = serializer.validated_data.get('day')
-
-        
-        yrs = ['2021', '2022', '2023', '2024']
-        joining_yr=None
-        if semester==1 or semester==2:
-            joining_yr=yrs[3]
-        elif semester==3 or semester==4:
-            joining_yr=yrs[2]
-        elif semester==5 or semester==6:
-            joining_yr=yrs[1]
-        elif semester==7 or semester==8:
-            joining_yr=yrs[0]
-        # Check if the combination of semester, department, and day already exists
-        if TimeTable.objects.filter(semester=semester, department=department, day=day).exists():
+        entries = serializer.validated_data if many else [serializer.validated_data]
+        cohorts = {}
+        for entry in entries:
+            semester = entry.get('semester')
+            department = entry.get('department')
+            day = entry.get('day')
+            joining_yr = getJoiningYearForSemester(semester)
+            # Check if the combination of semester, department, and day already exists
+            if TimeTable.objects.filter(semester=semester, department=department, day=day).exists():
+                return Response({'error': 'Timetable already exists for this semester, department, and day.'}, status=status.HTTP_400_BAD_REQUEST)
+
+            departments=['CSE','ECE']
+            if department not in departments:
+                return Response({'error': 'Invalid Department.'}, status=status.HTTP_400_BAD_REQUEST)
+
+            if joining_yr==None:
+                return Response(serializer.initial_data, status=400)
+            cohorts.setdefault((joining_yr, department), []).append(
+                (day, [entry.get(f'slot_{i}') for i in range(1, 8)]))
+
+        if many and len(set((entry['semester'], entry['department'], entry['day']) for entry in entries)) != len(entries):
+            return Response({'error': 'Timetable contains the same semester, department, and day twice.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        clashes = timetableClashes(entries)
+        if clashes:
+            return Response({'error': 'Timetable clashes with classes already scheduled.', 'clashes': clashes}, status=status.HTTP_400_BAD_REQUEST)
+
+        # the calendar events are created by the calendar worker, one job (one batch) per cohort.
+        # the days and their jobs are stored together, a day another request stored meanwhile stores neither
+        job_ids = []
+        try:
+            with transaction.atomic():
+                serializer.save()
+                for (joining_yr, department), days in cohorts.items():
+                    job = enqueueCalendarJob('add_timetable', {'joining_yr': joining_yr, 'department': department, 'days': days})
+                    job_ids.append(job.id)
+        except IntegrityError:
             return Response({'error': 'Timetable already exists for this semester, department, and day.'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        departments=['CSE','ECE']
-        if department not in departments:
-            return Response({'error': 'Invalid Department.'}, status=status.HTTP_400_BAD_REQUEST)
-    
-        serializer.save()
-        # day = serializer.data.get('slot_4')
-        # print(len(day))
-        # validated_data = serializer.validated_data
-        # ###
-        if joining_yr!=None:
-            calenderMainTableAdd(joining_yr, department, serializer.data.get('day'), serializer.data.get('slot_1'), serializer.data.get('slot_2'), serializer.data.get('slot_3'),serializer.data.get('slot_4'), serializer.data.get('slot_5'), serializer.data.get('slot_6'), serializer.data.get('slot_7'))
-        else:
-            return Response(serializer.data, status=400)
-        
-        return Response(serializer.data, status=201)
+
+        data = serializer.data
+        if many:
+            return Response({'timetable': data, 'job_ids': job_ids}, status=201)
+        return Response(dict(data, job_id=job_ids[0]), status=201)
+    elif timetableExists(serializer.errors):
+        return Response({'error': 'Timetable already exists for this semester, department, and day.'}, status=status.HTTP_400_BAD_REQUEST)
     else:
         return Response(serializer.errors, status=400)
 
 
+# checks a department's proposed timetable (a list of addTimetable entries) in one pass, without saving.
+# stored days the proposal redefines are left out, so a changed timetable does not clash with itself
+@api_view(['POST'])
+def checkTimetableClashes(request):
+    serializer = TimeTableSerializer(data=request.data, many=True, context={'redefine': True})
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=400)
+    clashes = timetableClashes(serializer.validated_data, replace=True)
+    return Response({'clashes': clashes, 'valid': not clashes})
+
+
+# generates conflict-free timetables for every cohort (semester) of a department from CurrentCourses.
+# the body has department and optionally semesters, loads ({course_code: classes a week}),
+# unavailable ({faculty_name: [[day, slot], ..]}), blocked ([[day, slot], ..] for every cohort) and save.
+# the solver's progress is streamed as json lines, the last one is 'solved' (with the timetable) or 'failed'.
+# with save the timetables are stored, only into cohorts that have none yet, and queued for the calendar
+@api_view(['POST'])
+def generateTimetable(request):
+    department = request.data.get('department')
+    if not department:
+        return Response({'error': 'department is required.'}, status=status.HTTP_400_BAD_REQUEST)
+    loads = request.data.get('loads') or {}
+    if not isinstance(loads, dict) or not all(type(load) is int and load > 0 for load in loads.values()):
+        return Response({'error': 'loads must give each course a positive whole number of classes a week.'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    try:
+        problem = timetableProblem(department, request.data.get('semesters'), loads,
+                                   request.data.get('unavailable'), request.data.get('blocked'))
+    except (KeyError, IndexError, TypeError, ValueError, AttributeError):
+        return Response({'error': 'Invalid slot constraints.'}, status=status.HTTP_400_BAD_REQUEST)
+    if not problem.courses:
+        return Response({'error': 'No current courses for this department.'}, status=status.HTTP_404_NOT_FOUND)
+    save = bool(request.data.get('save'))
+    if save and TimeTable.objects.filter(department__iexact=department, semester__in=[semester for semester, _ in problem.cohorts]).exists():
+        return Response({'error': 'Timetable already exists for this semester and department.'}, status=status.HTTP_400_BAD_REQUEST)
+    solver = TimetableSolver(problem)
+
+    def events():
+        for event in solver.run():
+            if event['event'] == 'solved':
+                grids = solver.grids()
+                event['timetable'] = [{'semester': semester, 'department': cohort_department, 'days': grid.rows()}
+                                      for (semester, cohort_department), grid in grids.items()]
+                if save:
+                    try:
+                        event['job_ids'] = saveGeneratedTimetable(grids)
+                    except IntegrityError:
+                        # the status line is sent already, the client learns it from the last event
+                        event = {'event': 'failed', 'reason': 'A timetable was stored for one of these cohorts '
+                                                              'while solving, nothing was saved.'}
+            yield json.dumps(event) + '\n'
+
+    return StreamingHttpResponse(events(), content_type='application/x-ndjson')
+
+
+# stores generated cohort weeks as TimeTable rows and queues them for the calendar like addTimetable
+# raises IntegrityError when one of the cohorts got a timetable since the request started
+def saveGeneratedTimetable(grids):
+    job_ids = []
+    with transaction.atomic():
+        for (semester, department), grid in grids.items():
+            # addTimetable stores the department as given, which the unique constraint tells apart
+            if TimeTable.objects.filter(semester=semester, department__iexact=department).exists():
+                raise IntegrityError(f'timetable of semester {semester} {department} exists')
+            days = []
+            for row in grid.rows():
+                TimeTable(semester=semester, department=department, **row).save()
+                days.append((row['day'], [row[slot] for slot in SLOTS]))
+            joining_yr = getJoiningYearForSemester(semester)
+            if joining_yr is not None:
+                job_ids.append(enqueueCalendarJob('add_timetable', {'joining_yr': joining_yr, 'department': department, 'days': days}).id)
+    return job_ids
+
+
+# students of the course's semester whose attendance is below threshold (a fraction, 0.8 = 80%),
+# as [roll_no, name, attendance %]. the absences come from AttendanceSummary in the same query
+def attendanceShortageList(course_code, department, threshold):
+    total_classes = CurrentCourses.objects.filter(course_code=course_code,department=department)[0].total_classes
+    semester = CourseList.objects.filter(course_code=course_code,department=department)[0].semester
+    if not total_classes:
+        return []
+
+    absences = AttendanceSummary.objects.filter(course_code=course_code, department=department,
+                                                roll_no=OuterRef('roll_no')).values('absent_count')
+    attendance = ExpressionWrapper(
+        Value(1.0) - Cast(Coalesce(Subquery(absences), 0), FloatField()) / Value(float(total_classes)),
+        output_field=FloatField())
+    students = StudentInfo.objects.filter(semester=semester, department=department) \
+        .annotate(attendance=attendance).filter(attendance__lt=threshold) \
+        .order_by('roll_no').values_list('roll_no', 'name', 'attendance')
+    return [[roll_no, name, attendance * 100] for roll_no, name, attendance in students]
+
+
 @api_view(['GET'])
 def getStudentsWithAttendanceShortage(request):
     course_code = request.GET.get('course_code')
     department  = request.GET.get('department')
-    total_classes = CurrentCourses.objects.filter(course_code=course_code,department=department)[0].total_classes
-    semester = CourseList.objects.filter(course_code=course_code,department=department)[0].semester
+    try:
+        threshold = float(request.GET.get('threshold', getattr(settings, 'ATTENDANCE_SHORTAGE_THRESHOLD', 0.8)))
+    except ValueError:
+        return Response({'error': 'threshold must be a number between 0 and 1'}, status=status.HTTP_400_BAD_REQUEST)
+    if not 0 <= threshold <= 1:
+        return Response({'error': 'threshold must be a number between 0 and 1'}, status=status.HTTP_400_BAD_REQUEST)
 
-    students_list = StudentInfo.objects.filter(semester = semester,department = department)
-    shortage_list=[]
-    for student in students_list:
-        absent_days = len(Absentees.objects.filter(course_code=course_code,roll_no = student.roll_no))
-        if 1-(absent_days/total_classes) <0.8:
-            shortage_list.append([student.roll_no,student.name,(1-(absent_days/total_classes))*100])
+    shortage_list = attendanceShortageList(course_code, department, threshold)
     return Response({"shortage_list":shortage_list})
 
 @api_view(['POST'])
 def addResultLab(request) :
-    records=request.data
-    course_code=records[0]['course_code']
-    LabResult.objects.filter(course_code=course_code).delete()
-
-    for record in records :
-        print(record)
-        course_code=record['course_code']
-        faculty=record['faculty']
-        internal_marks=record['internal_marks']
-        end_lab=record['end_lab']
-        grade=record['grade']
-        roll_no=record['roll_no']
+    return uploadResults(request, 'lab')
 
-        try:
-            obj=LabResult(course_code=course_code,faculty=faculty,internal_marks=internal_marks,end_lab=end_lab,grade=grade,roll_no=roll_no)
-            obj.full_clean()
-            obj.save()
-        except ValidationError as e:
-            return Response({'errors':e.message_dict},status.HTTP_400_BAD_REQUEST)
-    return Response({})
 
+# mark statistics of ?course_code=, or of every course of ?department= (optionally one ?semester=).
+# ?kind=lab reads the lab results. cached until the next grade upload for one of the courses
+@api_view(['GET'])
+def getCourseStatistics(request):
+    kind = request.GET.get('kind', 'theory')
+    if kind not in ('theory', 'lab'):
+        return Response({'error': 'kind must be theory or lab'}, status=status.HTTP_400_BAD_REQUEST)
+    course_code = request.GET.get('course_code')
+    department = request.GET.get('department')
+    if course_code:
+        course_codes = [course_code]
+    elif department:
+        courses = CourseList.objects.filter(department__iexact=department)
+        if request.GET.get('semester'):
+            try:
+                courses = courses.filter(semester=int(request.GET['semester']))
+            except ValueError:
+                return Response({'error': 'semester must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+        course_codes = list(courses.values_list('course_code', flat=True).distinct())
+    else:
+        return Response({'error': 'Pass a course_code or a department'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(cachedCourseStats(kind, course_codes))
 
 @api_view(['GET'])
 def getCourseType(request) :
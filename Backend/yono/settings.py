@@ -135,3 +135,67 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 MEDIA_URL = '/media/'
+
+# seconds a synced copy of a cohort calendar (CalendarEvent) is trusted before
+# getEventsOnCond asks google for the changes again
+CALENDAR_SYNC_INTERVAL = 60
+
+# google calendar accepts at most 50 calls in one batch request, CALENDAR_BATCH_URI
+# overrides the batch endpoint (e.g. to point at a local fake server)
+CALENDAR_BATCH_SIZE = 50
+CALENDAR_BATCH_URI = None
+
+# retries of queued calendar jobs (CalendarJob): attempts before giving up and the
+# first backoff delay in seconds, doubled on every further attempt
+CALENDAR_JOB_MAX_ATTEMPTS = 5
+CALENDAR_JOB_BACKOFF = 30
+# seconds a worker may run a job; a job still 'running' after that (the worker stopped) is queued again
+CALENDAR_JOB_LEASE = 600
+
+# default attendance (fraction of classes attended) below which a student is listed by
+# getStudentsWithAttendanceShortage, the request can override it with ?threshold=
+ATTENDANCE_SHORTAGE_THRESHOLD = 0.8
+
+# page size of the search endpoint when the request does not pass ?limit=
+SEARCH_RESULTS_LIMIT = 50
+
+# 'default' lives in each process. 'shared' is read by every worker of this host, for entries a write in
+# one process has to drop in all of them; point it at redis or memcached when the workers run on several hosts
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': BASE_DIR / 'cache'},
+}
+
+# CACHES alias of the version that tells the workers their autocomplete prefix index is stale
+DIRECTORY_PREFIX_CACHE_BACKEND = 'shared'
+
+# seconds a user's getSessionBootstrap response stays cached in the SESSION_BOOTSTRAP_CACHE_BACKEND
+# alias of CACHES, writes to the data in it drop it earlier
+SESSION_BOOTSTRAP_CACHE_BACKEND = 'shared'
+SESSION_BOOTSTRAP_CACHE_TIMEOUT = 300
+
+# profiles resolved by getUserDetails/getUserAllDetails are cached per process in an LRU of
+# PROFILE_CACHE_SIZE entries for PROFILE_CACHE_TTL seconds. set PROFILE_CACHE_BACKEND to one of the
+# CACHES aliases to share them between processes instead
+PROFILE_CACHE_SIZE = 10000
+PROFILE_CACHE_TTL = 600
+PROFILE_CACHE_BACKEND = None
+
+# seconds getCourseStatistics results stay cached (in each process), a grade change for the course drops
+# them earlier in every worker through the course versions in the COURSE_STATS_CACHE_BACKEND alias
+COURSE_STATS_CACHE_BACKEND = 'shared'
+COURSE_STATS_CACHE_TIMEOUT = 600
+
+# classes a week generateTimetable gives a course of CourseList.course_type theory or lab (a lab class
+# takes two slots in a row) when the request does not pass its own load for the course
+TIMETABLE_WEEKLY_LOAD = {'theory': 4, 'lab': 1}
+# the timetable solver starts over after this many backtracks, at most this many times,
+# and gives up after TIMETABLE_SOLVER_TIME_LIMIT seconds
+TIMETABLE_SOLVER_RESTART_AFTER = 2000
+TIMETABLE_SOLVER_MAX_RESTARTS = 20
+TIMETABLE_SOLVER_TIME_LIMIT = 10
+
+# getTimetableForStudent payloads are kept in the TIMETABLE_CACHE_BACKEND alias of CACHES (and per process)
+# until a TimeTable change, or TIMETABLE_CACHE_TIMEOUT seconds so the ones a change superseded go away
+TIMETABLE_CACHE_BACKEND = 'shared'
+TIMETABLE_CACHE_TIMEOUT = 86400
@@ -31,20 +31,28 @@ urlpatterns = [
     path('api/logoutUser/',logoutUser,name="logoutUser"),
     path('api/getUserDetails/',getUserDetails,name="getUserDetails"),
     path('api/getAttendanceDetailsForStudent/',getAttendanceDetailsForStudent,name="getAttendanceDetailsForStudent"),
+    path('api/getAttendanceSummaryForStudent/',getAttendanceSummaryForStudent,name="getAttendanceSummaryForStudent"),
     path('api/addResult/',addResult,name="Add Result"),
     path('api/getStudentsFromCourseCodeForResult/',getStudentsFromCourseCodeForResult,name='getStudentsFromCourseCodeForResult'),
     path('api/getResultForStudentForCourse/',getResultForStudentForCourse,name="getResultForStudentForCourse"),
+    path('api/getTranscriptForStudent/',getTranscriptForStudent,name="getTranscriptForStudent"),
     path('api/getTodosForUser/',getTodosForUser,name='getTodosForUser'),
     path('api/addTimetable/', addTimetable, name='addTimetable'),
+    path('api/checkTimetableClashes/', checkTimetableClashes, name='checkTimetableClashes'),
+    path('api/generateTimetable/', generateTimetable, name='generateTimetable'),
     path('api/reschedule_class/', reschedule_class, name='reschedule_class'),
     path('api/add_or_change_class/', add_or_change_class,name='add_or_change_class'),
     path('api/cancel_class/', cancel_class, name='cancel_class'),
     path('api/getTimetableForStudent/',getTimetableForStudent,name="getTimetableForStudent"),
     path('api/getCalendarId/',getCalendarId,name="getCalendarId"),
+    path('api/getCalendarJobStatus/',getCalendarJobStatus,name="getCalendarJobStatus"),
+    path('api/getCalendarJobMetrics/',getCalendarJobMetrics,name="getCalendarJobMetrics"),
 
     # mahitha
     path('api/search/',search,name="search"),
+    path('api/autocomplete/',autocomplete,name="autocomplete"),
     path('api/getFeeDefaulters/',getFeeDefaulters,name="getFeeDefaulters"),
+    path('api/getFeeDefaultersReport/',getFeeDefaultersReport,name="getFeeDefaultersReport"),
     path('api/sendMessage/',sendMessage,name="sendMessage"),
     path('api/getMessages/',getMessages,name="getMessages"),
     path('api/acceptMessage/',acceptMessage,name="acceptMessage"),
@@ -57,6 +65,8 @@ urlpatterns = [
     path('api/addNewStudent/',addNewStudent,name="addNewStudent"),
     path('api/updateSemester/',updateSemester,name="updateSemester"),
     path('api/getUserAllDetails/', getUserAllDetails, name='getUserAllDetails'),
+    path('api/getSessionBootstrap/', getSessionBootstrap, name='getSessionBootstrap'),
+    path('api/getProfileCacheStats/', getProfileCacheStats, name='getProfileCacheStats'),
 
     path('api/facultyTimetable/', facultyTimetable, name='facultyTimetable'),
     path('api/getFacultySchedule/', getFacultySchedule, name='getFacultySchedule'),
@@ -65,6 +75,7 @@ urlpatterns = [
     path('api/getStudentsWithAttendanceShortage/',getStudentsWithAttendanceShortage,name='getStudentsWithAttendanceShortage'),
 path('api/getLabResultForStudentForCourse/', getLabResultForStudentForCourse, name='getLabResultForStudentForCourse'),
     path('api/getCourseType/', getCourseType, name='getCourseType'),
+    path('api/getCourseStatistics/', getCourseStatistics, name='getCourseStatistics'),
     path('api/addResultLab/', addResultLab, name='addResultLab'),
 ]
 